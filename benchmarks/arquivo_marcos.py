@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Arquivo de Marcos - FatigueSensor
+==============================================
+
+Compara o `LandmarkArchive` com o armazenamento direto dos marcos, sobre a
+série de um `SyntheticLandmarkStream` (movimento da cabeça, piscadas,
+bocejos e ausência da face):
+
+    - bytes por frame: arrays int64 (.npy, como `extract_face_landmarks`),
+      int16 absolutos com `np.savez_compressed` e `LandmarkArchive` com
+      alguns tamanhos de bloco
+    - frames/s de gravação e de decodificação em streaming
+    - latência p50/p99 de `LandmarkArchiveReader.at()` em tempos aleatórios
+
+Uso:
+    python arquivo_marcos.py [--duration 600] [--motion 20] [--noise 0.5]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import LandmarkArchive, LandmarkArchiveReader, SyntheticLandmarkStream
+
+CONSULTAS = 2000
+
+
+def gerar_serie(args):
+    """
+    Timestamps, retângulos, marcos e métricas de cada frame do stream
+    """
+    stream = SyntheticLandmarkStream(
+        duration=args.duration, fps=args.fps, seed=0, noise=args.noise, motion=args.motion
+    )
+    for start in range(10, int(args.duration) - 5, 20):
+        stream.add_event("closure", float(start), 1.5)
+    for start in range(25, int(args.duration) - 5, 45):
+        stream.add_event("yawn", float(start))
+    for start in range(60, int(args.duration) - 5, 120):
+        stream.add_event("absent", float(start), 3.0)
+
+    serie = []
+    for index, timestamp in enumerate(stream.timestamps):
+        landmarks = stream.landmarks(index)
+        if landmarks is None:
+            serie.append((timestamp, None, None, None))
+        else:
+            serie.append(
+                (timestamp, stream.face_box_at(index), landmarks, stream.metrics(index))
+            )
+    return serie
+
+
+def medir_direto(serie, directory):
+    """
+    Bytes por frame guardando os arrays sem o formato de arquivo
+    """
+    landmarks = np.array(
+        [lm if lm is not None else np.zeros((68, 2), int) for _, _, lm, _ in serie]
+    )
+    raw_path = os.path.join(directory, "marcos.npy")
+    np.save(raw_path, landmarks)
+    compressed_path = os.path.join(directory, "marcos_int16.npz")
+    np.savez_compressed(compressed_path, landmarks=landmarks.astype(np.int16))
+    return (
+        os.path.getsize(raw_path) / len(serie),
+        os.path.getsize(compressed_path) / len(serie),
+    )
+
+
+def medir_arquivo(serie, path, block_frames):
+    """
+    Tamanho, gravação, decodificação e acesso aleatório do LandmarkArchive
+    """
+    start = time.perf_counter()
+    with LandmarkArchive(path, block_frames=block_frames) as archive:
+        for timestamp, box, landmarks, metrics in serie:
+            archive.append(timestamp, box, landmarks, metrics)
+    write_fps = len(serie) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    reader = LandmarkArchiveReader(path)
+    decoded = sum(len(block) for block in reader.iter_blocks())
+    decode_fps = decoded / (time.perf_counter() - start)
+
+    # Acesso aleatório com um leitor novo (sem bloco em cache)
+    reader = LandmarkArchiveReader(path)
+    first, last = reader.duration
+    latencies = []
+    for timestamp in np.random.default_rng(0).uniform(first, last, CONSULTAS):
+        start = time.perf_counter()
+        reader.at(timestamp)
+        latencies.append(time.perf_counter() - start)
+    reader.close()
+    p50, p99 = np.percentile(latencies, (50, 99)) * 1000.0
+
+    return os.path.getsize(path) / len(serie), write_fps, decode_fps, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do arquivo de marcos")
+    parser.add_argument("--duration", type=float, default=600)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--motion", type=float, default=20.0)
+    parser.add_argument("--noise", type=float, default=0.5)
+    args = parser.parse_args()
+
+    serie = gerar_serie(args)
+    print(f"{len(serie)} frames ({args.duration:.0f} s a {args.fps:.0f} FPS)\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        raw, compressed = medir_direto(serie, directory)
+        print(f"{'formato':<28} {'B/frame':>8} {'redução':>8}")
+        print(f"{'int64 (.npy)':<28} {raw:8.1f} {1.0:7.1f}x")
+        print(f"{'int16 + savez_compressed':<28} {compressed:8.1f} {raw / compressed:7.1f}x")
+
+        print(
+            f"\n{'LandmarkArchive':<28} {'B/frame':>8} {'redução':>8} "
+            f"{'grava/s':>9} {'decodifica/s':>13} {'at p50 ms':>10} {'at p99 ms':>10}"
+        )
+        for block_frames in (64, 256, 1024):
+            path = os.path.join(directory, f"marcos_{block_frames}.lmk")
+            size, write_fps, decode_fps, p50, p99 = medir_arquivo(
+                serie, path, block_frames
+            )
+            print(
+                f"{f'blocos de {block_frames}':<28} {size:8.1f} {raw / size:7.1f}x "
+                f"{write_fps:9.0f} {decode_fps:13.0f} {p50:10.3f} {p99:10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
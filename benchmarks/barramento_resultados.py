@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Barramento de Resultados - FatigueSensor
+=====================================================
+
+Mede o custo por frame de publicar a análise no barramento de memória
+compartilhada (`ResultBus`) e a latência até um leitor em outro processo
+(`ResultBusReader`) receber o registro.
+
+Uso:
+    python barramento_resultados.py [--records 100000] [--rate 30]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import FrameAnalysis, ResultBus, ResultBusReader
+
+BUS_NAME = "fatigue-sensor-bench"
+
+
+def leitor(count, ready, results):
+    """
+    Processo leitor: aguarda cada registro e mede a latência desde a publicação
+    """
+    reader = ResultBusReader(BUS_NAME)
+    ready.set()
+    latencies = []
+    while len(latencies) < count:
+        record = reader.wait_next(timeout=2.0, poll_interval=0.0001)
+        if record is None:
+            break
+        latencies.append(time.monotonic() - record["publish_time"])
+    results.put(latencies)
+    reader.close()
+
+
+def benchmark_publicacao(bus, records):
+    """
+    Mede o tempo médio de publish() em microssegundos
+    """
+    analysis = FrameAnalysis()
+    analysis.face_detected = True
+    analysis.ear = 0.3
+    analysis.fatigue_score = 0.2
+    start = time.perf_counter()
+    for i in range(records):
+        analysis.timestamp = i / 30.0
+        bus.publish(analysis, i)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def benchmark_latencia(bus, rate, count):
+    """
+    Publica `count` registros à taxa `rate` e coleta as latências do leitor
+    """
+    ready = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=leitor, args=(count, ready, results))
+    process.start()
+    ready.wait()
+
+    analysis = FrameAnalysis()
+    for i in range(count):
+        analysis.timestamp = i / rate
+        bus.publish(analysis, i)
+        time.sleep(1.0 / rate)
+
+    latencies = np.array(results.get(timeout=10)) * 1e6
+    process.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do barramento de resultados")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--rate", type=float, default=30.0)
+    parser.add_argument("--latency-samples", type=int, default=300)
+    args = parser.parse_args()
+
+    bus = ResultBus(BUS_NAME)
+    try:
+        per_record = benchmark_publicacao(bus, args.records)
+        print(f"Publicação: {per_record:.2f} µs por frame")
+        print(f"  ({per_record / (1e6 / 30) * 100:.3f}% de um frame a 30 FPS)")
+
+        latencies = benchmark_latencia(bus, args.rate, args.latency_samples)
+        print(f"\nLatência do leitor ({len(latencies)} registros a {args.rate:.0f} Hz):")
+        for p in (50, 90, 99):
+            print(f"  p{p}: {np.percentile(latencies, p):8.1f} µs")
+        print(f"  máx: {latencies.max():8.1f} µs")
+    finally:
+        bus.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Modelos de Marcos - FatigueSensor
+==============================================
+
+Compara o modelo de 68 pontos com o modelo reduzido de olhos e boca (32
+pontos, ver `tools/train_eyes_mouth_model.py`):
+
+    - Tamanho do arquivo e tempo de carga
+    - Memória residente (RSS) acrescentada pelo modelo
+    - Tempo de predição por face
+    - Diferença de EAR/MAR e erro dos pontos 36-67 em relação ao primeiro
+      modelo da lista (referência)
+
+Cada modelo é medido em um processo novo, para que carga e RSS não sejam
+afetados pelo cache de preditores nem pelo modelo anterior.
+
+Uso:
+    python modelo_marcos.py [--models ../shape_predictor_68_face_landmarks.dat
+                                      ../eyes_mouth_32.dat]
+                            [--video cabine.mp4] [--frames 200]
+
+Sem `--video`, usa frames de um `SyntheticLandmarkStream` (tempos válidos;
+a comparação de pontos só é representativa com faces reais).
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from main import (
+    FatigueDetector,
+    HogFaceDetector,
+    SyntheticLandmarkStream,
+    load_shape_predictor,
+)
+
+
+def ler_rss_mb():
+    """
+    RSS atual do processo em MB (Linux)
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def carregar_amostras(video, total):
+    """
+    Frames em cinza equalizados e o retângulo da face de cada um
+    """
+    if video is None:
+        stream = SyntheticLandmarkStream(duration=total / 30.0, motion=20.0, seed=0)
+        frames = [stream.render(i) for i in range(len(stream))]
+    else:
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < total:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+
+    detector = HogFaceDetector()
+    amostras = []
+    for frame in frames:
+        gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        faces = detector.detect(gray)
+        if len(faces):
+            amostras.append((gray, tuple(faces[0])))
+    return amostras
+
+
+def medir_modelo(model_path, video, total):
+    """
+    Executado em um processo novo: carga, RSS e predição de um modelo
+    """
+    rss_before = ler_rss_mb()
+    start = time.perf_counter()
+    predictor = load_shape_predictor(model_path)
+    load_time = time.perf_counter() - start
+    rss_model = ler_rss_mb() - rss_before
+
+    amostras = carregar_amostras(video, total)
+    detector = FatigueDetector(face_detector=HogFaceDetector(), predictor=predictor)
+
+    detector.extract_face_landmarks(*amostras[0])  # aquecimento
+    landmarks = []
+    start = time.perf_counter()
+    for gray, face in amostras:
+        landmarks.append(detector.extract_face_landmarks(gray, face))
+    predict_ms = (time.perf_counter() - start) * 1000.0 / len(amostras)
+
+    metrics = np.array([detector.calculate_face_metrics(points) for points in landmarks])
+    return {
+        "size_mb": os.path.getsize(model_path) / 1e6,
+        "load_s": load_time,
+        "rss_mb": rss_model,
+        "predict_ms": predict_ms,
+        "landmarks": np.array(landmarks)[:, 36:68],
+        "metrics": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de modelos de marcos")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=[
+            os.path.join(ROOT, "shape_predictor_68_face_landmarks.dat"),
+            os.path.join(ROOT, "eyes_mouth_32.dat"),
+        ],
+    )
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    resultados = {}
+    for path in args.models:
+        if not os.path.exists(path):
+            print(f"⚠ Modelo não encontrado: {path}")
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            resultados[path] = executor.submit(
+                medir_modelo, path, args.video, args.frames
+            ).result()
+
+    if not resultados:
+        print("✗ Nenhum modelo disponível")
+        sys.exit(1)
+
+    referencia = next(iter(resultados.values()))
+    print(
+        f"\n{'modelo':<40} {'MB':>6} {'carga s':>8} {'RSS MB':>7} "
+        f"{'ms/face':>8} {'ΔEAR':>7} {'ΔMAR':>7} {'erro px':>8}"
+    )
+    for path, r in resultados.items():
+        delta = np.abs(r["metrics"] - referencia["metrics"]).mean(axis=0)
+        erro = np.linalg.norm(r["landmarks"] - referencia["landmarks"], axis=2).mean()
+        print(
+            f"{os.path.basename(path):<40} {r['size_mb']:6.1f} {r['load_s']:8.2f} "
+            f"{r['rss_mb']:7.1f} {r['predict_ms']:8.3f} "
+            f"{(delta[0] + delta[1]) / 2:7.4f} {delta[2]:7.4f} {erro:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Detecção em Mosaico - FatigueSensor
+================================================
+
+Compara o `MultiStreamProcessor` com detecção facial por stream e com
+detecção em mosaico (uma única chamada para todos os streams), em streams
+sintéticos com faces desenhadas:
+
+    - frames/s agregados
+    - frames por segundo de CPU (throughput por núcleo)
+    - fração de frames com face detectada em cada modo
+
+Os marcos vêm de `SyntheticShapePredictor`, então o arquivo do modelo não é
+necessário; a detecção usa um backend real (`--backend`).
+
+Uso:
+    python mosaico.py [--streams 4] [--steps 100] [--backend hog]
+                      [--scale 0.5] [--workers 4]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import (
+    FatigueDetector,
+    MultiStreamProcessor,
+    StreamClock,
+    SyntheticLandmarkStream,
+    SyntheticShapePredictor,
+    create_face_detector,
+)
+
+FRAMES_POR_STREAM = 30
+
+
+def criar_streams(count, fps):
+    """
+    Streams 640x480 com faces em posições e sementes diferentes
+    """
+    streams = []
+    for i in range(count):
+        x = 120 + (i % 3) * 60
+        stream = SyntheticLandmarkStream(
+            duration=FRAMES_POR_STREAM / fps,
+            fps=fps,
+            seed=i,
+            face_box=(x, 100, 260, 260),
+            motion=15.0,
+            frame_size=(640, 480),
+        )
+        streams.append(stream)
+    return streams
+
+
+def criar_detector(backend, scale=1.0):
+    detector = create_face_detector(backend)
+    min_w, min_h = detector.min_size
+    detector.min_size = (int(min_w * scale), int(min_h * scale))
+    return detector
+
+
+def executar(streams, frames, steps, workers, backend, mosaic_scale=None):
+    """
+    Processa `steps` frames por stream e mede tempo de parede e de CPU
+    """
+    detectors = []
+    for stream in streams:
+        detector = FatigueDetector(
+            clock=StreamClock(),
+            face_detector=criar_detector(backend),
+            predictor=SyntheticShapePredictor(stream),
+        )
+        detector.sound_alerts = False
+        detectors.append(detector)
+
+    mosaic_detector = None
+    if mosaic_scale is not None:
+        mosaic_detector = criar_detector(backend, mosaic_scale)
+    processor = MultiStreamProcessor(
+        detectors,
+        max_workers=workers,
+        mosaic_detector=mosaic_detector,
+        mosaic_scale=mosaic_scale or 0.5,
+    )
+
+    detected = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for step in range(steps):
+        index = step % FRAMES_POR_STREAM
+        batch = [stream_frames[index] for stream_frames in frames]
+        timestamps = [step / streams[0].fps] * len(streams)
+        for _, analysis in processor.process(batch, timestamps, draw=False):
+            detected += analysis.face_detected
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    processor.shutdown()
+
+    total = steps * len(streams)
+    return total / wall, total / cpu, detected / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detecção em mosaico")
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--backend", default="hog", help="haar, lbp, hog ou dnn")
+    parser.add_argument("--scale", type=float, default=0.5, help="Redução no mosaico")
+    parser.add_argument("--workers", type=int, default=None, help="Threads (padrão: streams)")
+    parser.add_argument("--fps", type=float, default=30)
+    args = parser.parse_args()
+
+    workers = args.workers or args.streams
+    streams = criar_streams(args.streams, args.fps)
+    # Frames renderizados uma vez e reutilizados (a renderização fica fora da medida)
+    frames = [[s.render(i) for i in range(FRAMES_POR_STREAM)] for s in streams]
+
+    print(
+        f"{args.streams} streams 640x480, backend {args.backend}, "
+        f"{workers} threads, {os.cpu_count()} núcleos\n"
+    )
+    print(f"{'modo':<22} {'frames/s':>10} {'frames/s CPU':>13} {'com face':>9}")
+    base = None
+    for nome, scale in (
+        ("por stream", None),
+        (f"mosaico x{args.scale}", args.scale),
+        ("mosaico x1.0", 1.0),
+    ):
+        fps, cpu_fps, rate = executar(
+            streams, frames, args.steps, workers, args.backend, mosaic_scale=scale
+        )
+        base = base or cpu_fps
+        print(
+            f"{nome:<22} {fps:10.1f} {cpu_fps:13.1f} {rate:9.0%}"
+            f"  (x{cpu_fps / base:.2f} por núcleo)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Paralelismo - FatigueSensor
+========================================
+
+Mede a escalabilidade por núcleo da extração de marcos faciais em paralelo
+(várias faces no mesmo frame) e do processamento de vários streams no mesmo
+processo com `MultiStreamProcessor`.
+
+Uso:
+    python paralelismo.py [--faces 4] [--streams 4] [--frames 200]
+                          [--video arquivo.mp4]
+
+Sem `--video`, os frames são sintéticos (ruído); nesse caso o teste de
+streams mede apenas pré-processamento e detecção facial.
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import FatigueDetector, MultiStreamProcessor
+
+
+def carregar_frames(video_path, total, width=1280, height=720):
+    """
+    Carrega frames de um vídeo (em loop) ou gera frames sintéticos
+    """
+    if video_path is None:
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        return [base.copy() for _ in range(total)]
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < total:
+        ret, frame = cap.read()
+        if not ret:
+            if not frames:
+                raise RuntimeError(f"Não foi possível ler o vídeo: {video_path}")
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def benchmark_marcos(detector, gray, faces, frames, workers):
+    """
+    Mede frames/s da extração de marcos de `faces` regiões por frame
+    """
+    rects = [(100 + i * 260, 200, 240, 240) for i in range(faces)]
+
+    if workers <= 1:
+        start = time.perf_counter()
+        for _ in range(frames):
+            for rect in rects:
+                detector.extract_face_landmarks(gray, rect)
+        return frames / (time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        for _ in range(frames):
+            jobs = [
+                executor.submit(detector.extract_face_landmarks, gray, rect)
+                for rect in rects
+            ]
+            for job in jobs:
+                job.result()
+        return frames / (time.perf_counter() - start)
+
+
+def benchmark_streams(detectors, frames, workers):
+    """
+    Mede frames/s agregados processando um frame por stream a cada passo
+    """
+    streams = MultiStreamProcessor(detectors, max_workers=workers)
+    batch = len(detectors)
+    start = time.perf_counter()
+    for i in range(0, len(frames) - batch + 1, batch):
+        # Cópias: process_frame desenha sobre o frame recebido
+        streams.process([frame.copy() for frame in frames[i : i + batch]])
+    elapsed = time.perf_counter() - start
+    streams.shutdown()
+    return (len(frames) // batch) * batch / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de paralelismo")
+    parser.add_argument("--faces", type=int, default=4)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--video", default=None)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    print(f"Núcleos disponíveis: {cpus}")
+
+    frames = carregar_frames(args.video, args.frames)
+    gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
+
+    detector = FatigueDetector()
+    print(f"\n=== Marcos faciais: {args.faces} faces por frame ===")
+    base = None
+    for workers in (1, 2, 4, 8):
+        if workers > max(cpus, 1) * 2:
+            break
+        fps = benchmark_marcos(detector, gray, args.faces, args.frames, workers)
+        base = base or fps
+        print(f"workers={workers:<2} {fps:8.1f} frames/s  (x{fps / base:.2f})")
+
+    print(f"\n=== Streams: {args.streams} detectores no mesmo processo ===")
+    detectors = [FatigueDetector() for _ in range(args.streams)]
+    base = None
+    for workers in range(1, args.streams + 1):
+        fps = benchmark_streams(detectors, frames, workers)
+        base = base or fps
+        print(f"workers={workers:<2} {fps:8.1f} frames/s  (x{fps / base:.2f})")
+
+
+if __name__ == "__main__":
+    main()
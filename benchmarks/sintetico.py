@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark com Stream Sintético - FatigueSensor
+==============================================
+
+Mede o throughput da análise de fadiga sem câmera nem arquivo do modelo,
+usando um `SyntheticLandmarkStream` com eventos roteirizados:
+
+    1. `analyze_fatigue_indicators` sobre EAR/MAR verdadeiros
+    2. `calculate_face_metrics` + análise sobre os 68 marcos gerados
+    3. Pipeline completo (`process_frame`) com detector facial e preditor
+       substitutos, sobre frames renderizados
+
+Ao final, confere se as piscadas longas e os bocejos roteirizados foram
+contados pelo detector (verificação de corretude para CI).
+
+Uso:
+    python sintetico.py [--duration 300] [--fps 30] [--seed 0] [--noise 0.5]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import (
+    FatigueDetector,
+    StreamClock,
+    SyntheticFaceDetector,
+    SyntheticLandmarkStream,
+    SyntheticShapePredictor,
+)
+
+
+def criar_stream(args):
+    """
+    Stream com piscadas sorteadas, olhos fechados a cada 20 s e bocejo a cada 45 s
+    """
+    stream = SyntheticLandmarkStream(
+        duration=args.duration, fps=args.fps, seed=args.seed, noise=args.noise
+    )
+    for start in range(10, int(args.duration) - 5, 20):
+        stream.add_event("closure", float(start), 1.5)
+    for start in range(25, int(args.duration) - 5, 45):
+        stream.add_event("yawn", float(start))
+    return stream
+
+
+def novo_detector(stream):
+    detector = FatigueDetector(
+        clock=StreamClock(),
+        face_detector=SyntheticFaceDetector(stream),
+        predictor=SyntheticShapePredictor(stream),
+    )
+    detector.sound_alerts = False
+    return detector
+
+
+def benchmark_indicadores(stream):
+    """
+    Frames/s de `analyze_fatigue_indicators` com métricas pré-calculadas
+    """
+    detector = novo_detector(stream)
+    metrics = [stream.metrics(i) for i in range(len(stream))]
+    start = time.perf_counter()
+    for index, (ear_left, ear_right, mar) in enumerate(metrics):
+        detector.clock.update(index / stream.fps)
+        detector.analyze_fatigue_indicators(ear_left, ear_right, mar)
+    return len(metrics) / (time.perf_counter() - start), detector
+
+
+def benchmark_marcos(stream):
+    """
+    Frames/s de EAR/MAR a partir dos marcos + análise
+    """
+    detector = novo_detector(stream)
+    landmarks = [stream.landmarks(i) for i in range(len(stream))]
+    start = time.perf_counter()
+    for index, points in enumerate(landmarks):
+        if points is None:
+            continue
+        detector.clock.update(index / stream.fps)
+        detector.analyze_fatigue_indicators(*detector.calculate_face_metrics(points))
+    return len(landmarks) / (time.perf_counter() - start), detector
+
+
+def benchmark_pipeline(stream, detailed):
+    """
+    Frames/s de `process_frame`, descontado o tempo de renderização
+    """
+    detector = novo_detector(stream)
+    render_time = 0.0
+    pipeline_time = 0.0
+    for index in range(len(stream)):
+        start = time.perf_counter()
+        frame = stream.render(index, detailed=detailed)
+        middle = time.perf_counter()
+        detector.process_frame(frame, draw=False, timestamp=index / stream.fps)
+        pipeline_time += time.perf_counter() - middle
+        render_time += middle - start
+    return len(stream) / pipeline_time, len(stream) / render_time, detector
+
+
+def conferir(nome, detector, stream):
+    """
+    Compara os eventos contados pelo detector com o roteiro
+    """
+    esperado = (stream.count("closure"), stream.count("yawn"))
+    obtido = (detector.blink_counter, detector.yawn_counter)
+    ok = esperado == obtido
+    print(
+        f"{'✓' if ok else '✗'} {nome}: olhos fechados {obtido[0]}/{esperado[0]}, "
+        f"bocejos {obtido[1]}/{esperado[1]}"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark com stream sintético")
+    parser.add_argument("--duration", type=float, default=300)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.5)
+    args = parser.parse_args()
+
+    stream = criar_stream(args)
+    print(
+        f"Stream: {len(stream)} frames, {len(stream.events)} eventos "
+        f"({stream.count('closure')} olhos fechados, {stream.count('yawn')} bocejos)"
+    )
+
+    print("\n=== Throughput ===")
+    fps, det_indicadores = benchmark_indicadores(stream)
+    print(f"analyze_fatigue_indicators     {fps:10.0f} frames/s")
+    fps, det_marcos = benchmark_marcos(stream)
+    print(f"marcos -> EAR/MAR -> análise   {fps:10.0f} frames/s")
+    fps, render_fps, _ = benchmark_pipeline(stream, detailed=False)
+    print(f"process_frame (frame simples)  {fps:10.0f} frames/s  (render {render_fps:.0f}/s)")
+    fps, render_fps, det_pipeline = benchmark_pipeline(stream, detailed=True)
+    print(f"process_frame (face desenhada) {fps:10.0f} frames/s  (render {render_fps:.0f}/s)")
+
+    print("\n=== Corretude ===")
+    ok = all(
+        [
+            conferir("indicadores", det_indicadores, stream),
+            conferir("marcos", det_marcos, stream),
+            conferir("pipeline", det_pipeline, stream),
+        ]
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
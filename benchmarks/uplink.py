@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Uplink da Frota - FatigueSensor
+============================================
+
+Mede o custo do `FleetUplink` contra o coletor local
+(`tools/fleet_collector.py`, iniciado em um processo separado):
+
+    1. Hora de motorista: análise de um `SyntheticLandmarkStream` de
+       `--hours` horas com piscadas longas, bocejos e alertas roteirizados;
+       mostra eventos, lotes e bytes enviados por hora de motorista e o
+       custo de `observe()` por frame
+    2. Vazão sustentada: `--flood` eventos gerados o mais rápido possível;
+       mostra eventos/s confirmados pelo coletor
+
+Ao final, confere se o coletor recebeu cada evento exatamente uma vez
+(também com falhas simuladas via `--fail-rate`).
+
+Uso:
+    python uplink.py [--hours 1] [--flood 200000] [--fail-rate 0.0]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from main import (
+    FatigueDetector,
+    FleetUplink,
+    StreamClock,
+    SyntheticFaceDetector,
+    SyntheticLandmarkStream,
+    SyntheticShapePredictor,
+)
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_coletor(port, fail_rate):
+    """
+    Coletor em um processo separado; aguarda até responder
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(ROOT, "tools", "fleet_collector.py"),
+            "--port",
+            str(port),
+            "--output",
+            "",
+            "--fail-rate",
+            str(fail_rate),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            ler_stats(port)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Coletor não iniciou")
+
+
+def ler_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as r:
+        return json.loads(r.read())
+
+
+def novo_uplink(port, spool, **options):
+    return FleetUplink(
+        f"http://127.0.0.1:{port}/eventos",
+        spool_dir=spool,
+        device_id="bench",
+        driver_id="motorista",
+        retry_delay=0.05,
+        max_retry_delay=0.5,
+        **options,
+    )
+
+
+def hora_de_motorista(args, uplink):
+    """
+    Eventos e bytes enviados para `args.hours` horas de direção
+    """
+    duration = args.hours * 3600
+    stream = SyntheticLandmarkStream(duration=duration, fps=30, seed=0)
+    for start in range(30, int(duration) - 5, 90):
+        stream.add_event("closure", float(start), 1.5)
+    for start in range(60, int(duration) - 5, 240):
+        stream.add_event("yawn", float(start))
+
+    detector = FatigueDetector(
+        clock=StreamClock(),
+        face_detector=SyntheticFaceDetector(stream),
+        predictor=SyntheticShapePredictor(stream),
+    )
+    detector.sound_alerts = False
+
+    # analyze_fatigue_indicators + transições de alerta, como em process_frame
+    observe_time = 0.0
+    for index, (ear_left, ear_right, mar) in enumerate(
+        stream.metrics(i) for i in range(len(stream))
+    ):
+        detector.clock.update(index / stream.fps)
+        analysis = detector.analyze_fatigue_indicators(ear_left, ear_right, mar)
+        analysis.timestamp = detector.clock.now()
+        detector.alert_active = analysis.fatigue_detected
+        start = time.perf_counter()
+        uplink.observe(analysis, detector.alert_active)
+        observe_time += time.perf_counter() - start
+    pending = uplink.close(timeout=30)
+    return uplink, observe_time / len(stream) * 1e6, pending
+
+
+def vazao(args, uplink):
+    """
+    Eventos/s do add_event até a confirmação do coletor
+    """
+    start = time.perf_counter()
+    for i in range(args.flood):
+        uplink.add_event("blink", i / 30.0, ear=0.21)
+    pending = uplink.close(timeout=60)
+    elapsed = time.perf_counter() - start
+    return uplink, args.flood / elapsed, pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do uplink da frota")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--flood", type=int, default=200000)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = porta_livre()
+    coletor = iniciar_coletor(port, args.fail_rate)
+    try:
+        with tempfile.TemporaryDirectory() as spool:
+            # Criados em sequência, no mesmo segundo: as sessões não podem
+            # colidir na chave (device, session, seq) do coletor. Spools
+            # separados para que cada uplink envie (e conte) só os seus lotes
+            uplink_hora = novo_uplink(port, os.path.join(spool, "hora"))
+            uplink_vazao = novo_uplink(
+                port, os.path.join(spool, "vazao"), max_batch_events=1000
+            )
+
+            print("=== Hora de motorista ===")
+            uplink, observe_us, pending = hora_de_motorista(args, uplink_hora)
+            horas = args.hours
+            print(f"eventos              {uplink.events / horas:10.0f} por hora")
+            print(f"lotes                {uplink.batches_sent / horas:10.0f} por hora")
+            print(f"JSON sem compressão  {uplink.bytes_raw / horas / 1e3:10.1f} KB por hora")
+            print(f"enviado (gzip)       {uplink.bytes_sent / horas / 1e3:10.1f} KB por hora")
+            print(f"observe()            {observe_us:10.2f} µs por frame")
+            print(f"falhas de envio      {uplink.send_failures:10d}  (no spool: {pending})")
+            enviados = uplink.events
+
+            print("\n=== Vazão sustentada ===")
+            uplink, events_per_second, pending_flood = vazao(args, uplink_vazao)
+            print(f"eventos confirmados  {events_per_second:10.0f} por segundo")
+            print(f"lotes                {uplink.batches_sent:10d}")
+            print(f"falhas de envio      {uplink.send_failures:10d}  (no spool: {pending_flood})")
+            enviados += uplink.events
+
+        stats = ler_stats(port)
+    finally:
+        coletor.terminate()
+        coletor.wait()
+
+    print("\n=== Corretude ===")
+    ok = stats["events"] == enviados and pending == 0 and pending_flood == 0
+    print(
+        f"{'✓' if ok else '✗'} coletor recebeu {stats['events']}/{enviados} eventos "
+        f"({stats['duplicates']} lotes duplicados descartados, "
+        f"{stats['failed']} falhas simuladas)"
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
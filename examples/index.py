@@ -20,6 +20,7 @@ from configuracao_personalizada import exemplo_configuracao_personalizada
 from monitoramento_metricas import exemplo_monitoramento_metricas
 from configuracao_ambiente import exemplo_configuracao_ambiente
 from tratamento_erros import exemplo_tratamento_erros
+from integracao_asyncio import exemplo_integracao_asyncio
 
 
 def main():
@@ -51,6 +52,11 @@ def main():
             exemplo_tratamento_erros,
             "tratamento_erros.py",
         ),
+        "6": (
+            "Integração com asyncio",
+            exemplo_integracao_asyncio,
+            "integracao_asyncio.py",
+        ),
     }
 
     print("\nExemplos disponíveis:")
@@ -83,7 +89,7 @@ def main():
 
         while True:
             try:
-                print("\nEscolha um exemplo para executar (1-5) ou 'q' para sair:")
+                print("\nEscolha um exemplo para executar (1-6) ou 'q' para sair:")
                 escolha = input(">>> ").strip()
 
                 if escolha.lower() in ["q", "quit", "sair"]:
@@ -97,7 +103,7 @@ def main():
                     print("\n" + "=" * 50)
                     print("Exemplo finalizado!")
                 else:
-                    print(f"❌ Opção '{escolha}' inválida. Digite 1-5 ou 'q'.")
+                    print(f"❌ Opção '{escolha}' inválida. Digite 1-6 ou 'q'.")
 
             except KeyboardInterrupt:
                 print("\n\nSaindo...")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exemplo Integração com asyncio - FatigueSensor
+=============================================
+
+Este arquivo demonstra como usar o FatigueSensor dentro de uma
+aplicação asyncio (ex.: agente de telemetria) sem bloquear o
+event loop.
+
+Autor: [Nome do Estudante]
+Data: Junho 2025
+"""
+
+import asyncio
+import sys
+
+sys.path.append("..")
+from main import AsyncFatigueDetector
+
+
+async def heartbeat():
+    """
+    Tarefa concorrente que representa o I/O de rede do agente.
+    """
+    while True:
+        await asyncio.sleep(1.0)
+        print("💓 Agente responsivo")
+
+
+async def monitorar(frames=300):
+    """
+    Analisa frames da câmera e imprime os alertas, ao lado do heartbeat.
+    """
+    tarefa_rede = asyncio.create_task(heartbeat())
+    try:
+        async with AsyncFatigueDetector(max_pending=2) as detector:
+            analisados = 0
+            async for analysis in detector.stream(detector.camera_frames(0)):
+                analisados += 1
+                if analysis.fatigue_detected:
+                    print(f"⚠️  Fadiga detectada (score {analysis.fatigue_score:.2f})")
+                if analisados >= frames:
+                    break
+            print(f"Frames analisados: {analisados}")
+    finally:
+        tarefa_rede.cancel()
+
+
+def exemplo_integracao_asyncio():
+    """
+    Exemplo de uso do detector em uma aplicação asyncio.
+    """
+    print("=== Exemplo 6: Integração com asyncio ===")
+    print("Analisando 300 frames da câmera sem bloquear o event loop...")
+
+    try:
+        asyncio.run(monitorar())
+    except KeyboardInterrupt:
+        print("\nSistema interrompido pelo usuário")
+    except Exception as e:
+        print(f"Erro: {e}")
+
+
+if __name__ == "__main__":
+    exemplo_integracao_asyncio()
@@ -12,7 +12,6 @@ Data: Junho 2025
 """
 
 import sys
-import time
 
 sys.path.append("..")
 from main import FatigueDetector
@@ -37,7 +36,7 @@ def exemplo_monitoramento_metricas():
         print(f"Histórico MAR: {len(detector.mar_history)} frames")
 
         # Calcular taxas (exemplo com valores simulados)
-        detector.start_time = time.time() - 60  # Simula 1 minuto de execução
+        detector.start_time = detector.clock.now() - 60  # Simula 1 minuto de execução
         detector.blink_counter = 18  # 18 piscadas em 1 minuto
         detector.yawn_counter = 3  # 3 bocejos em 1 minuto
 
@@ -30,7 +30,7 @@ def exemplo_tratamento_erros():
         print("Verificando componentes do sistema...")
 
         # Verifica se detectores foram inicializados
-        if hasattr(detector, "face_cascade") and hasattr(detector, "predictor"):
+        if hasattr(detector, "face_detector") and hasattr(detector, "predictor"):
             print("✅ Detectores faciais carregados")
         else:
             print("❌ Erro: Detectores não carregados")
@@ -45,9 +45,3408 @@ import time
 import threading
 import pygame
 from scipy.spatial import distance as dist
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from collections import Counter, deque
 import argparse
+import array
+import asyncio
+import bisect
+import cProfile
+import gzip
+import json
+import os
+import pickle
+import platform
+import pstats
+import queue
+import random
+import re
 import sys
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+
+
+# Cache de preditores de marcos por caminho do modelo. O shape_predictor do
+# dlib é somente leitura após carregado, então uma única instância pode ser
+# compartilhada por vários detectores (streams) e threads do mesmo processo.
+_predictor_cache = {}
+_predictor_cache_lock = threading.Lock()
+
+# Modelos de marcos suportados: número de pontos -> índice, no esquema de 68
+# pontos do dlib, do primeiro ponto predito. O modelo reduzido de olhos e boca
+# prediz apenas os pontos 36-67, os únicos usados no EAR e no MAR.
+LANDMARK_MODEL_LAYOUTS = {68: 0, 32: 36}
+
+
+def load_shape_predictor(model_path):
+    """
+    Carrega (uma única vez por processo) o preditor de marcos faciais do dlib
+
+    Args:
+        model_path (str): Caminho do arquivo .dat do modelo
+
+    Returns:
+        dlib.shape_predictor: Preditor compartilhado
+    """
+    with _predictor_cache_lock:
+        predictor = _predictor_cache.get(model_path)
+        if predictor is None:
+            predictor = dlib.shape_predictor(model_path)
+            _predictor_cache[model_path] = predictor
+        return predictor
+
+
+class MonotonicClock:
+    """
+    Relógio para entrada sem timestamps: tempo monotônico do sistema, em
+    segundos, lido no momento da análise.
+
+    Não é afetado por ajustes do relógio de parede (NTP, fuso horário). Ao
+    receber o primeiro frame com timestamp, o `FatigueDetector` troca este
+    relógio por um `StreamClock` (ver `process_frame`).
+    """
+
+    def now(self):
+        """
+        Instante atual em segundos
+        """
+        return time.monotonic()
+
+    def update(self, timestamp):
+        """
+        Ignorado: o tempo avança sozinho
+        """
+
+
+class StreamClock:
+    """
+    Relógio guiado pelos timestamps do stream (PTS) de arquivos ou replays.
+
+    O tempo só avança quando um frame informa seu timestamp, de modo que uma
+    gravação pode ser analisada tão rápido quanto a CPU permitir, com taxas
+    (piscadas e bocejos por minuto) idênticas às da execução em tempo real.
+
+    Args:
+        start (float): Instante inicial em segundos
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+
+    def now(self):
+        """
+        Timestamp do último frame, em segundos
+        """
+        return self._now
+
+    def update(self, timestamp):
+        """
+        Avança o relógio para o timestamp do frame atual
+        """
+        self._now = timestamp
+
+
+class OneEuroFilter:
+    """
+    Filtro One-Euro para suavização de sinais ruidosos em tempo real.
+
+    Filtro passa-baixa adaptativo: com o sinal estável usa frequência de corte
+    baixa (remove ruído); quando o sinal varia rápido, a frequência de corte
+    aumenta proporcionalmente à derivada (reduz atraso).
+
+    Referência: Casiez, Roussel e Vogel, "1€ Filter" (CHI 2012).
+
+    Args:
+        min_cutoff (float): Frequência de corte mínima em Hz
+        beta (float): Ganho da frequência de corte em função da derivada
+        d_cutoff (float): Frequência de corte para a derivada em Hz
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.5, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """
+        Descarta o estado do filtro
+        """
+        self.value = None
+        self.derivative = 0.0
+        self._last_time = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, timestamp):
+        """
+        Filtra uma nova amostra
+
+        Args:
+            value (float): Valor medido
+            timestamp (float): Instante da medição em segundos
+
+        Returns:
+            float: Valor filtrado
+        """
+        if self.value is None:
+            self.value = value
+            self._last_time = timestamp
+            return value
+
+        dt = max(timestamp - self._last_time, 1e-3)
+        self._last_time = timestamp
+
+        raw_derivative = (value - self.value) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.derivative = a_d * raw_derivative + (1 - a_d) * self.derivative
+
+        cutoff = self.min_cutoff + self.beta * abs(self.derivative)
+        a = self._alpha(cutoff, dt)
+        self.value = a * value + (1 - a) * self.value
+        return self.value
+
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo sobre um buffer circular NumPy.
+
+    Mantém soma e soma dos quadrados acumuladas, de modo que inserir um valor,
+    obter a média e a variância da janela são operações O(1) e sem alocação.
+    As somas são recalculadas a cada volta completa do buffer (custo
+    amortizado O(1)) para limitar o acúmulo de erro de arredondamento.
+
+    Args:
+        size (int): Número máximo de amostras na janela
+
+    Exemplo:
+        >>> window = RollingWindow(900)
+        >>> window.append(0.31)
+        >>> window.mean, window.variance
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._values = np.zeros(size, dtype=np.float64)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        """
+        Insere um valor, descartando o mais antigo se a janela estiver cheia
+        """
+        value = float(value)
+        if self._count == self.size:
+            old = float(self._values[self._index])
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+
+        self._values[self._index] = value
+        self._sum += value
+        self._sum_sq += value * value
+
+        self._index += 1
+        if self._index == self.size:
+            self._index = 0
+            self._sum = float(self._values.sum())
+            self._sum_sq = float(np.dot(self._values, self._values))
+
+    def clear(self):
+        """
+        Esvazia a janela
+        """
+        self._values.fill(0.0)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    @property
+    def mean(self):
+        """
+        Média dos valores da janela (0.0 se vazia)
+        """
+        if self._count == 0:
+            return 0.0
+        return self._sum / self._count
+
+    @property
+    def variance(self):
+        """
+        Variância populacional dos valores da janela (0.0 se vazia)
+        """
+        if self._count == 0:
+            return 0.0
+        mean = self._sum / self._count
+        return max(self._sum_sq / self._count - mean * mean, 0.0)
+
+    def values(self):
+        """
+        Cópia dos valores da janela em ordem cronológica
+        """
+        if self._count < self.size:
+            return self._values[: self._count].copy()
+        return np.roll(self._values, -self._index)
+
+
+# Layout de um registro de análise por frame, usado na exportação em lote
+FRAME_ANALYSIS_DTYPE = np.dtype(
+    [
+        ("timestamp", np.float64),
+        ("face_detected", np.bool_),
+        ("ear", np.float64),
+        ("mar", np.float64),
+        ("blink_detected", np.bool_),
+        ("yawn_detected", np.bool_),
+        ("blink_rate", np.float64),
+        ("yawn_frequency", np.float64),
+        ("perclos", np.float64),
+        ("ear_mean", np.float64),
+        ("ear_variance", np.float64),
+        ("mar_mean", np.float64),
+        ("yawn_duty_cycle", np.float64),
+        ("fatigue_score", np.float64),
+        ("fatigue_detected", np.bool_),
+    ]
+)
+
+
+class FrameAnalysis:
+    """
+    Resultado da análise de um frame.
+
+    Registro tipado com `__slots__`: acesso a campos por atributo, sem
+    dicionário por instância. O `FatigueDetector` reutiliza a mesma instância
+    a cada frame, portanto quem precisar guardar o resultado além do frame
+    atual deve usar `copy()`.
+
+    Para compatibilidade, também aceita acesso por chave (`analysis["ear"]`
+    e `analysis.get("ear", 0)`).
+
+    Campos:
+        timestamp (float): Instante do frame em segundos (relógio do detector)
+        face_detected (bool): True se alguma face foi analisada no frame
+        ear (float): EAR médio dos dois olhos
+        mar (float): MAR da boca
+        blink_detected (bool): True se piscada foi detectada neste frame
+        yawn_detected (bool): True se bocejo foi detectado neste frame
+        blink_rate (float): Taxa de piscadas por minuto
+        yawn_frequency (float): Frequência de bocejos por minuto
+        perclos (float): Fração da janela com olhos fechados
+        ear_mean (float): EAR médio na janela
+        ear_variance (float): Variância do EAR na janela
+        mar_mean (float): MAR médio na janela
+        yawn_duty_cycle (float): Fração da janela com MAR acima do limiar
+        fatigue_score (float): Score de fadiga (0.0-1.0)
+        fatigue_detected (bool): True se fadiga foi detectada
+    """
+
+    __slots__ = FRAME_ANALYSIS_DTYPE.names
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Restaura os valores padrão (frame sem face)
+        """
+        self.timestamp = 0.0
+        self.face_detected = False
+        self.ear = 0.0
+        self.mar = 0.0
+        self.blink_detected = False
+        self.yawn_detected = False
+        self.blink_rate = 0.0
+        self.yawn_frequency = 0.0
+        self.perclos = 0.0
+        self.ear_mean = 0.0
+        self.ear_variance = 0.0
+        self.mar_mean = 0.0
+        self.yawn_duty_cycle = 0.0
+        self.fatigue_score = 0.0
+        self.fatigue_detected = False
+
+    def copy(self):
+        """
+        Cópia independente do registro
+        """
+        other = FrameAnalysis.__new__(FrameAnalysis)
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def as_dict(self):
+        """
+        Converte o registro em dicionário
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def write_to(self, row):
+        """
+        Copia os campos para uma linha de um array estruturado
+        (`FRAME_ANALYSIS_DTYPE`)
+        """
+        for name in self.__slots__:
+            row[name] = getattr(self, name)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"FrameAnalysis({fields})"
+
+
+class FrameAnalysisLog:
+    """
+    Exportação em lote das análises por frame em um array estruturado NumPy.
+
+    O array é pré-alocado e dobra de capacidade quando cheio (custo
+    amortizado O(1) por frame). `to_array()` retorna uma view sem cópia.
+
+    Args:
+        capacity (int): Capacidade inicial em frames
+
+    Exemplo:
+        >>> log = FrameAnalysisLog()
+        >>> detector.analysis_log = log
+        >>> ...
+        >>> log.save("analise.npy")
+    """
+
+    def __init__(self, capacity=4096):
+        self._rows = np.zeros(capacity, dtype=FRAME_ANALYSIS_DTYPE)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, analysis):
+        """
+        Adiciona o registro de um frame
+        """
+        if self._count == len(self._rows):
+            grown = np.zeros(len(self._rows) * 2, dtype=FRAME_ANALYSIS_DTYPE)
+            grown[: self._count] = self._rows
+            self._rows = grown
+        analysis.write_to(self._rows[self._count])
+        self._count += 1
+
+    def extend(self, rows):
+        """
+        Adiciona registros já no formato `FRAME_ANALYSIS_DTYPE` (ex.: de um
+        checkpoint)
+        """
+        needed = self._count + len(rows)
+        if needed > len(self._rows):
+            grown = np.zeros(max(needed, len(self._rows) * 2), dtype=FRAME_ANALYSIS_DTYPE)
+            grown[: self._count] = self._rows[: self._count]
+            self._rows = grown
+        self._rows[self._count : needed] = rows
+        self._count = needed
+
+    def to_array(self):
+        """
+        View dos registros gravados (sem cópia)
+        """
+        return self._rows[: self._count]
+
+    def save(self, path):
+        """
+        Salva os registros em um arquivo .npy
+        """
+        np.save(path, self.to_array())
+
+
+def _cache_line_dtype(fields, line=64):
+    """
+    Dtype estruturado com campos alinhados ao próprio tamanho e `itemsize`
+    múltiplo de `line`: em um array, cada registro começa em uma linha de
+    cache e nenhum campo de 8 bytes fica desalinhado
+    """
+    aligned = np.dtype(fields, align=True)
+    return np.dtype(
+        {
+            "names": aligned.names,
+            "formats": [aligned.fields[name][0] for name in aligned.names],
+            "offsets": [aligned.fields[name][1] for name in aligned.names],
+            "itemsize": -(-aligned.itemsize // line) * line,
+        },
+        align=True,
+    )
+
+
+# Layout dos registros publicados no barramento de memória compartilhada.
+# Alinhado: o `seq` de 8 bytes de cada slot é lido e escrito sem divisão
+# (acessos desalinhados não são atômicos em ARM e podem cruzar linhas de
+# cache), e cada slot começa em uma linha de cache
+RESULT_BUS_RECORD_DTYPE = _cache_line_dtype(
+    [
+        ("seq", np.uint64),
+        ("frame_index", np.uint64),
+        ("publish_time", np.float64),
+    ]
+    + FRAME_ANALYSIS_DTYPE.descr
+)
+
+# Cabeçalho do segmento (64 bytes)
+RESULT_BUS_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", np.uint32),
+        ("capacity", np.uint32),
+        ("record_size", np.uint32),
+        ("writer_pid", np.uint32),
+        ("write_seq", np.uint64),
+        ("padding", "S32"),
+    ]
+)
+
+RESULT_BUS_MAGIC = b"FATIGUE1"
+RESULT_BUS_VERSION = 4
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach_shared_memory(name):
+    """
+    Abre um segmento de memória compartilhada existente sem registrá-lo no
+    resource_tracker (que o removeria quando o processo leitor terminasse)
+
+    Antes do Python 3.13 não há `track=False`, e desfazer o registro depois
+    não é seguro: um leitor criado por fork ou spawn do publicador usa o
+    mesmo resource_tracker, e o `unregister` apagaria o registro do
+    publicador. Por isso o registro é suprimido durante a abertura.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _process_alive(pid):
+    """
+    Verifica se existe um processo com o PID informado
+    """
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, mas pertence a outro usuário
+    return True
+
+
+class ResultBus:
+    """
+    Publica a análise de cada frame em um buffer circular em memória compartilhada.
+
+    Processos locais (painel, ponte CAN, gravador) leem os resultados com
+    `ResultBusReader`, sem sockets e sem cópias: os registros são uma view
+    NumPy sobre o segmento em /dev/shm.
+
+    Protocolo (escritor único, sem locks):
+        - Registros de tamanho fixo (`RESULT_BUS_RECORD_DTYPE`) em `capacity`
+          slots, cada um alinhado a 64 bytes (após o cabeçalho de 64 bytes)
+        - O n-ésimo registro (n >= 1) vai para o slot (n - 1) % capacity
+        - Cada slot funciona como um seqlock: o campo `seq` recebe 2n - 1
+          (ímpar, escrita em andamento) antes dos dados e 2n (par) depois
+        - `write_seq` no cabeçalho guarda o último n publicado
+        - O leitor valida um slot lendo `seq` antes e depois da cópia
+        - `writer_pid` no cabeçalho identifica o publicador: um segmento com
+          o mesmo nome só é substituído se esse processo não existe mais
+
+    Args:
+        name (str): Nome do segmento (arquivo em /dev/shm)
+        capacity (int): Número de registros no buffer circular
+
+    Raises:
+        FileExistsError: Se o segmento pertence a um publicador ativo ou não
+            é um barramento de resultados
+
+    Exemplo:
+        >>> detector.result_bus = ResultBus("fatigue-sensor")
+        >>> # Em outro processo:
+        >>> reader = ResultBusReader("fatigue-sensor")
+        >>> record = reader.latest()
+    """
+
+    def __init__(self, name="fatigue-sensor", capacity=1024):
+        size = RESULT_BUS_HEADER_DTYPE.itemsize + capacity * RESULT_BUS_RECORD_DTYPE.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Só remove o segmento deixado por uma execução interrompida
+            self._check_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.name = name
+        self.capacity = capacity
+        self._header = np.ndarray(1, dtype=RESULT_BUS_HEADER_DTYPE, buffer=self.shm.buf)
+        self._records = np.ndarray(
+            capacity,
+            dtype=RESULT_BUS_RECORD_DTYPE,
+            buffer=self.shm.buf,
+            offset=RESULT_BUS_HEADER_DTYPE.itemsize,
+        )
+        self._records.fill(0)
+        self._header[0] = (
+            RESULT_BUS_MAGIC,
+            RESULT_BUS_VERSION,
+            capacity,
+            RESULT_BUS_RECORD_DTYPE.itemsize,
+            os.getpid(),
+            0,
+            b"",
+        )
+
+        # Registro de preparação: os campos são montados aqui e copiados para
+        # o slot de uma vez
+        self._staging = np.zeros(1, dtype=RESULT_BUS_RECORD_DTYPE)
+        self._seq_column = self._records["seq"]
+        self._write_seq = 0
+
+    @staticmethod
+    def _check_stale(name):
+        """
+        Remove um segmento existente com o mesmo nome se o publicador que o
+        criou não está mais em execução
+
+        Raises:
+            FileExistsError: Se o publicador ainda existe ou o segmento não é
+                um barramento de resultados
+        """
+        existing = _attach_shared_memory(name)
+        header = None
+        if existing.size >= RESULT_BUS_HEADER_DTYPE.itemsize:
+            # Cópia: nenhuma view pode manter o buffer exportado no close()
+            header = np.ndarray(1, dtype=RESULT_BUS_HEADER_DTYPE, buffer=existing.buf)
+            header = header.copy()[0]
+        existing.close()
+
+        if header is None or header["magic"] != RESULT_BUS_MAGIC:
+            raise FileExistsError(f"Segmento '{name}' não é um barramento de resultados")
+        # Versões anteriores não gravam o PID: sempre abandonadas
+        writer_pid = int(header["writer_pid"])
+        if header["version"] == RESULT_BUS_VERSION and _process_alive(writer_pid):
+            raise FileExistsError(f"Barramento '{name}' em uso pelo processo {writer_pid}")
+
+        # Aberto com registro no resource_tracker, que o unlink() desfaz
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+
+    def publish(self, analysis, frame_index):
+        """
+        Publica a análise de um frame
+
+        Args:
+            analysis (FrameAnalysis): Resultado do frame
+            frame_index (int): Índice do frame no stream
+        """
+        n = self._write_seq + 1
+        slot = (n - 1) % self.capacity
+
+        staging = self._staging[0]
+        analysis.write_to(staging)
+        staging["frame_index"] = frame_index
+        staging["seq"] = 2 * n - 1
+
+        self._seq_column[slot] = 2 * n - 1
+        staging["publish_time"] = time.monotonic()
+        self._records[slot] = staging
+        self._seq_column[slot] = 2 * n
+
+        self._header["write_seq"] = n
+        self._write_seq = n
+
+    def close(self):
+        """
+        Libera e remove o segmento de memória compartilhada
+        """
+        del self._header, self._records, self._seq_column
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ResultBusReader:
+    """
+    Lê os resultados publicados por um `ResultBus` em outro processo.
+
+    `records` é uma view NumPy direta (sem cópia) sobre os slots do segmento;
+    `latest()` e `read_new()` devolvem cópias validadas pelo seqlock, o que
+    garante que nenhum registro parcialmente escrito é entregue.
+
+    Args:
+        name (str): Nome do segmento usado pelo publicador
+
+    Raises:
+        FileNotFoundError: Se o segmento não existe (publicador não iniciado)
+        ValueError: Se o segmento não tem o formato esperado
+    """
+
+    def __init__(self, name="fatigue-sensor"):
+        self.shm = _attach_shared_memory(name)
+        self._header = np.ndarray(1, dtype=RESULT_BUS_HEADER_DTYPE, buffer=self.shm.buf)
+        header = self._header[0]
+        if (
+            header["magic"] != RESULT_BUS_MAGIC
+            or header["version"] != RESULT_BUS_VERSION
+            or header["record_size"] != RESULT_BUS_RECORD_DTYPE.itemsize
+        ):
+            self.shm.close()
+            raise ValueError(f"Segmento '{name}' não é um barramento de resultados")
+
+        self.capacity = int(header["capacity"])
+        self.records = np.ndarray(
+            self.capacity,
+            dtype=RESULT_BUS_RECORD_DTYPE,
+            buffer=self.shm.buf,
+            offset=RESULT_BUS_HEADER_DTYPE.itemsize,
+        )
+        self._seq_column = self.records["seq"]
+        self.last_seq = 0
+        self.dropped = 0  # Registros sobrescritos antes de serem lidos
+
+    @property
+    def write_seq(self):
+        """
+        Número do último registro publicado
+        """
+        return int(self._header["write_seq"][0])
+
+    def _read_slot(self, n):
+        """
+        Copia o registro n se ele ainda estiver íntegro no slot
+        """
+        slot = (n - 1) % self.capacity
+        if self._seq_column[slot] != 2 * n:
+            return None
+        record = self.records[slot].copy()
+        if self._seq_column[slot] != 2 * n:
+            return None
+        return record
+
+    def latest(self):
+        """
+        Último registro publicado (cópia), ou None se ainda não há registros
+        """
+        for _ in range(3):
+            n = self.write_seq
+            if n == 0:
+                return None
+            record = self._read_slot(n)
+            if record is not None:
+                return record
+        return None
+
+    def read_new(self):
+        """
+        Registros publicados desde a última chamada, em ordem
+
+        Registros que o publicador já sobrescreveu são contados em `dropped`.
+
+        Returns:
+            list: Registros (cópias) ainda não lidos
+        """
+        n = self.write_seq
+        first = max(self.last_seq + 1, n - self.capacity + 1)
+        self.dropped += first - (self.last_seq + 1)
+
+        records = []
+        for seq in range(first, n + 1):
+            record = self._read_slot(seq)
+            if record is None:
+                self.dropped += 1
+            else:
+                records.append(record)
+        self.last_seq = n
+        return records
+
+    def wait_next(self, timeout=1.0, poll_interval=0.0005):
+        """
+        Aguarda (por polling) um registro mais novo que o último lido
+
+        Args:
+            timeout (float): Tempo máximo de espera em segundos
+            poll_interval (float): Intervalo entre verificações em segundos
+
+        Returns:
+            Registro mais recente (cópia), ou None em caso de timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.write_seq <= self.last_seq:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+        self.last_seq = self.write_seq
+        return self.latest()
+
+    def close(self):
+        """
+        Desanexa o segmento (não o remove)
+        """
+        del self._header, self.records, self._seq_column
+        self.shm.close()
+
+
+class EvidenceRecorder:
+    """
+    Grava clipes de evidência com os segundos antes e depois de um alerta.
+
+    Os frames recentes ficam em um buffer circular em memória, comprimidos em
+    JPEG para limitar o uso de memória. A captura só copia o frame para uma
+    fila curta: a compressão roda em uma thread própria, que também mantém o
+    buffer e monta os clipes. Os alertas ficam em uma fila à parte, sem
+    limite, marcados com o número de frames enfileirados até então: nunca
+    bloqueiam a captura nem são descartados, e cada um é aplicado antes do
+    primeiro frame posterior a ele.
+    Quando um alerta dispara, o clipe reúne os frames anteriores ao alerta
+    mais `post_seconds` de frames seguintes e é entregue a uma segunda
+    thread, que grava o vídeo em disco sem atrasar a compressão, a captura
+    ou a análise.
+
+    Os clipes se chamam `alerta_AAAAMMDD_HHMMSS_mmm_NNNN.mp4` (instante do
+    alerta com milissegundos e número sequencial do gravador), então alertas
+    no mesmo segundo não sobrescrevem uns aos outros.
+
+    Args:
+        output_dir (str): Diretório onde os clipes são gravados
+        pre_seconds (float): Segundos mantidos antes do alerta
+        post_seconds (float): Segundos gravados após o alerta
+        fps (float): Taxa de frames esperada (dimensiona o buffer)
+        quality (int): Qualidade JPEG dos frames no buffer (0-100)
+
+    Exemplo:
+        >>> detector.evidence_recorder = EvidenceRecorder("evidencias")
+    """
+
+    def __init__(
+        self, output_dir="evidencias", pre_seconds=10, post_seconds=5, fps=30, quality=70
+    ):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.quality = quality
+        self.post_frames = max(1, int(post_seconds * fps))
+        self.clips_saved = 0
+        self.clips_dropped = 0
+        self.frames_dropped = 0
+
+        self._frames = deque(maxlen=max(1, int(pre_seconds * fps)))
+        self._buffer_bytes = 0
+        self._clip = None
+        self._clip_bytes = 0
+        self._clip_started = None
+        self._clip_sequence = 0
+        self._post_remaining = 0
+
+        # Alertas pendentes: (frames enfileirados antes do alerta, instante)
+        self._triggers = deque()
+        self._pushed = 0
+
+        # Frames a comprimir: até meio segundo em atraso; com a fila cheia o
+        # frame é descartado em vez de bloquear a captura
+        self._input = queue.Queue(maxsize=max(2, int(fps / 2)))
+        self._compressor = threading.Thread(
+            target=self._compress_loop, name="fatigue-evidence-jpeg", daemon=True
+        )
+        self._compressor.start()
+
+        # Fila limitada: se o disco não acompanhar, clipes são descartados em
+        # vez de acumular memória ou bloquear a captura
+        self._queue = queue.Queue(maxsize=4)
+        self._worker = threading.Thread(
+            target=self._encode_loop, name="fatigue-evidence", daemon=True
+        )
+        self._worker.start()
+
+    @property
+    def memory_bytes(self):
+        """
+        Memória ocupada pelos JPEGs do buffer e do clipe em andamento
+        """
+        return self._buffer_bytes + self._clip_bytes
+
+    def push(self, frame, timestamp):
+        """
+        Adiciona um frame ao buffer (cópia; a compressão JPEG é feita na
+        thread de compressão)
+
+        Args:
+            frame: Frame BGR a ser guardado
+            timestamp (float): Instante do frame em segundos
+        """
+        try:
+            self._input.put_nowait((self._pushed, timestamp, frame.copy()))
+        except queue.Full:
+            self.frames_dropped += 1
+            return
+        self._pushed += 1
+
+    def trigger(self, timestamp):
+        """
+        Inicia um clipe de evidência (chamado quando o alerta dispara)
+
+        Um novo alerta durante um clipe em andamento estende a gravação.
+
+        Args:
+            timestamp (float): Instante do alerta em segundos
+        """
+        # Fila sem limite (deque é segura entre threads): não bloqueia nem
+        # descarta, mesmo com a compressão atrasada
+        self._triggers.append((self._pushed, time.time()))
+
+    def _compress_loop(self):
+        """
+        Thread de compressão: JPEG dos frames, buffer circular e clipes
+        """
+        while True:
+            item = self._input.get()
+            if item is None:
+                break
+            sequence, timestamp, frame = item
+            self._apply_triggers(sequence)
+            self._add_frame(timestamp, frame)
+        self._apply_triggers(self._pushed)
+
+    def _apply_triggers(self, sequence):
+        """
+        Inicia os clipes dos alertas disparados antes do frame `sequence`
+        """
+        while self._triggers and self._triggers[0][0] <= sequence:
+            _, wall_time = self._triggers.popleft()
+            self._start_clip(wall_time)
+
+    def _add_frame(self, timestamp, frame):
+        ok, jpeg = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        )
+        if not ok:
+            return
+
+        if len(self._frames) == self._frames.maxlen:
+            evicted = self._frames[0][1].nbytes
+            self._buffer_bytes -= evicted
+            if self._clip is not None:
+                # O frame descartado continua referenciado pelo clipe
+                self._clip_bytes += evicted
+        self._frames.append((timestamp, jpeg))
+        self._buffer_bytes += jpeg.nbytes
+
+        if self._clip is not None:
+            self._clip.append((timestamp, jpeg))
+            self._post_remaining -= 1
+            if self._post_remaining <= 0:
+                self._finish_clip()
+
+    def _start_clip(self, wall_time):
+        if self._clip is not None:
+            self._post_remaining = self.post_frames
+            return
+
+        # Os frames anteriores ao alerta são compartilhados com o buffer
+        # (sem copiar os JPEGs)
+        self._clip = list(self._frames)
+        self._clip_bytes = 0
+        self._clip_sequence += 1
+        millis = int(wall_time * 1000) % 1000
+        self._clip_started = (
+            time.strftime("%Y%m%d_%H%M%S", time.localtime(wall_time))
+            + f"_{millis:03d}_{self._clip_sequence:04d}"
+        )
+        self._post_remaining = self.post_frames
+
+    def _finish_clip(self):
+        try:
+            self._queue.put_nowait((self._clip_started, self._clip))
+        except queue.Full:
+            self.clips_dropped += 1
+            print("⚠ Aviso: clipe de evidência descartado (gravação atrasada)")
+        self._clip = None
+        self._clip_bytes = 0
+
+    def _encode_loop(self):
+        """
+        Thread de codificação: decodifica os JPEGs e grava o vídeo do clipe
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            started, clip = item
+            try:
+                self._write_clip(started, clip)
+            except Exception as e:
+                print(f"Erro ao gravar clipe de evidência: {e}")
+
+    def _write_clip(self, started, clip):
+        if not clip:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"alerta_{started}.mp4")
+
+        # FPS real do clipe a partir dos timestamps (fallback: FPS configurado)
+        duration = clip[-1][0] - clip[0][0]
+        fps = (len(clip) - 1) / duration if duration > 0 else self.fps
+
+        first = cv2.imdecode(clip[0][1], cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        )
+        try:
+            writer.write(first)
+            for _, jpeg in clip[1:]:
+                writer.write(cv2.imdecode(jpeg, cv2.IMREAD_COLOR))
+        finally:
+            writer.release()
+
+        self.clips_saved += 1
+        print(
+            f"✓ Clipe de evidência salvo: {path} ({len(clip)} frames, "
+            f"buffer {self.memory_bytes / 1e6:.1f} MB)"
+        )
+
+    def close(self):
+        """
+        Comprime os frames pendentes, grava o clipe em andamento (se houver)
+        e finaliza as threads
+        """
+        self._input.put(None)
+        self._compressor.join()
+        if self._clip is not None:
+            self._finish_clip()
+        self._queue.put(None)
+        self._worker.join()
+
+
+class FleetUplink:
+    """
+    Envio de eventos e resumos por minuto para o backend da frota.
+
+    Alimentado a cada frame por `observe()` com a análise do frame
+    (`analyze_fatigue_indicators`) e o estado do alerta, gera eventos
+    (`blink`, `yawn`, `alert_start`, `alert_end`) e um resumo (`summary`) por
+    minuto de sessão. Alertas separados por menos de `alert_hold` segundos
+    são agregados em um só (o score oscila em torno do limiar e o estado do
+    alerta pode alternar a cada frame). Os eventos são agrupados em lotes, fechados a cada
+    minuto ou ao atingir `max_batch_events`, comprimidos com gzip e gravados
+    no spool em disco antes do envio. Uma thread em segundo plano envia os
+    lotes em ordem por HTTP POST e só os remove do spool após a confirmação
+    (2xx), com espera exponencial entre tentativas enquanto o coletor estiver
+    inacessível. Lotes deixados no spool (sem rede, queda do processo) são
+    enviados na próxima execução.
+
+    Os tempos dos eventos são segundos desde o primeiro frame da sessão
+    (`t`); o lote informa o instante de parede do início da sessão. Um lote
+    recusado pelo coletor (4xx) é descartado, e o spool é limitado a
+    `max_spool_bytes` descartando os lotes mais antigos.
+
+    Args:
+        endpoint (str): URL do coletor (ex.: http://127.0.0.1:8750/eventos)
+        spool_dir (str): Diretório do spool de lotes
+        device_id (str): Identificador do sensor (padrão: nome da máquina)
+        driver_id (str): Identificador do motorista, se conhecido
+        max_batch_events (int): Eventos por lote antes de fechar antes do minuto
+        max_spool_bytes (int): Tamanho máximo do spool em bytes
+        timeout (float): Timeout de cada envio em segundos
+        retry_delay (float): Espera inicial entre tentativas em segundos
+        max_retry_delay (float): Espera máxima entre tentativas em segundos
+        alert_hold (float): Segundos sem alerta para encerrar um alerta
+        session_start (float): Instante de parede (epoch) do primeiro frame
+                               (padrão: quando o primeiro frame é observado;
+                               informe em replays de gravações)
+
+    Exemplo:
+        >>> detector.uplink = FleetUplink("http://coletor:8750/eventos")
+        >>> detector.run()
+        >>> detector.uplink.close()
+    """
+
+    SUMMARY_SECONDS = 60.0
+    SPOOL_SUFFIX = ".json.gz"
+
+    def __init__(
+        self,
+        endpoint,
+        spool_dir="spool",
+        device_id=None,
+        driver_id=None,
+        max_batch_events=500,
+        max_spool_bytes=50_000_000,
+        timeout=10.0,
+        retry_delay=2.0,
+        max_retry_delay=300.0,
+        alert_hold=5.0,
+        session_start=None,
+    ):
+        self.endpoint = endpoint
+        self.spool_dir = spool_dir
+        self.device_id = device_id or platform.node()
+        self.driver_id = driver_id
+        self.max_batch_events = max_batch_events
+        self.max_spool_bytes = max_spool_bytes
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.alert_hold = alert_hold
+        self.session_start = session_start
+        # Parte aleatória: sessões criadas no mesmo segundo não colidem no
+        # spool nem na chave (device, session, seq) do coletor
+        self.session = time.strftime("%Y%m%d_%H%M%S") + f"_{uuid.uuid4().hex[:8]}"
+        os.makedirs(spool_dir, exist_ok=True)
+
+        # Estatísticas
+        self.events = 0
+        self.batches_sealed = 0
+        self.batches_sent = 0
+        self.batches_rejected = 0
+        self.batches_dropped = 0
+        self.bytes_raw = 0
+        self.bytes_sent = 0
+        self.send_failures = 0
+
+        # Estado da sessão (thread do detector)
+        self._t0 = None
+        self._last_t = None
+        self._alert_active = False
+        self._alert_started = None  # Início do alerta agregado em aberto
+        self._alert_ended = None  # Fim provisório (aguardando alert_hold)
+        self._pending = []
+        self._seq = 0
+        self._minute = None
+        self._reset_summary()
+
+        # Thread de envio
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._deadline = None
+        self._offline = False
+        self._sender = threading.Thread(
+            target=self._send_loop, name="fatigue-uplink", daemon=True
+        )
+        self._sender.start()
+
+    def _reset_summary(self):
+        self._frames = 0
+        self._face_frames = 0
+        self._blinks = 0
+        self._yawns = 0
+        self._alerts = 0
+        self._alert_seconds = 0.0
+        self._ear_sum = 0.0
+        self._perclos_max = 0.0
+        self._score_sum = 0.0
+        self._score_max = 0.0
+
+    def add_event(self, kind, t, **fields):
+        """
+        Adiciona um evento ao lote em andamento
+
+        Args:
+            kind (str): Tipo do evento
+            t (float): Segundos desde o início da sessão
+            **fields: Campos adicionais (números são arredondados)
+        """
+        event = {"type": kind, "t": round(t, 3)}
+        for name, value in fields.items():
+            event[name] = round(value, 4) if isinstance(value, float) else value
+        self._pending.append(event)
+        self.events += 1
+        if len(self._pending) >= self.max_batch_events:
+            self.seal()
+
+    def observe(self, analysis, alert_active):
+        """
+        Registra a análise de um frame (chamado pelo detector a cada frame)
+
+        Args:
+            analysis (FrameAnalysis): Resultado do frame
+            alert_active (bool): Estado do alerta após o frame
+        """
+        if self._t0 is None:
+            self._t0 = analysis.timestamp
+            if self.session_start is None:
+                self.session_start = time.time()
+        t = analysis.timestamp - self._t0
+        minute = int(t // self.SUMMARY_SECONDS)
+        if self._minute is None:
+            self._minute = minute
+        elif minute != self._minute:
+            self._close_minute()
+            self._minute = minute
+
+        self._frames += 1
+        if self._alert_active and self._last_t is not None:
+            self._alert_seconds += t - self._last_t
+        self._last_t = t
+        if analysis.face_detected:
+            self._face_frames += 1
+            self._ear_sum += analysis.ear
+            self._score_sum += analysis.fatigue_score
+            self._perclos_max = max(self._perclos_max, analysis.perclos)
+            self._score_max = max(self._score_max, analysis.fatigue_score)
+
+        if analysis.blink_detected:
+            self._blinks += 1
+            self.add_event("blink", t, ear=analysis.ear)
+        if analysis.yawn_detected:
+            self._yawns += 1
+            self.add_event("yawn", t, mar=analysis.mar)
+        if alert_active and not self._alert_active:
+            if self._alert_started is None:
+                self._alerts += 1
+                self._alert_started = t
+                self.add_event(
+                    "alert_start",
+                    t,
+                    score=analysis.fatigue_score,
+                    perclos=analysis.perclos,
+                    blink_rate=analysis.blink_rate,
+                    yawn_frequency=analysis.yawn_frequency,
+                )
+            self._alert_ended = None  # Dentro de alert_hold: mesmo alerta
+        elif self._alert_active and not alert_active:
+            self._alert_ended = t
+        elif self._alert_ended is not None and t - self._alert_ended >= self.alert_hold:
+            self._end_alert()
+        self._alert_active = alert_active
+
+    def _end_alert(self):
+        ended = self._alert_ended if self._alert_ended is not None else self._last_t
+        self.add_event("alert_end", ended, duration=ended - self._alert_started)
+        self._alert_started = None
+        self._alert_ended = None
+
+    def _close_minute(self):
+        """
+        Fecha o resumo do minuto em andamento e o lote
+        """
+        if self._frames == 0:
+            return
+        faces = max(self._face_frames, 1)
+        self.add_event(
+            "summary",
+            self._minute * self.SUMMARY_SECONDS,
+            frames=self._frames,
+            face_frames=self._face_frames,
+            blinks=self._blinks,
+            yawns=self._yawns,
+            alerts=self._alerts,
+            alert_seconds=self._alert_seconds,
+            ear_mean=self._ear_sum / faces,
+            perclos_max=self._perclos_max,
+            score_mean=self._score_sum / faces,
+            score_max=self._score_max,
+        )
+        self._reset_summary()
+        self.seal()
+
+    def seal(self):
+        """
+        Fecha o lote em andamento: comprime, grava no spool e acorda o envio
+        """
+        if not self._pending:
+            return
+        batch = {
+            "device": self.device_id,
+            "driver": self.driver_id,
+            "session": self.session,
+            "session_start": self.session_start,
+            "seq": self._seq,
+            "events": self._pending,
+        }
+        raw = json.dumps(batch, separators=(",", ":")).encode("utf-8")
+        data = gzip.compress(raw, compresslevel=9)
+        self._pending = []
+        self._seq += 1
+
+        name = f"{self.session}_{batch['seq']:08d}{self.SPOOL_SUFFIX}"
+        path = os.path.join(self.spool_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self.batches_sealed += 1
+            self.bytes_raw += len(raw)
+        self._trim_spool()
+        self._wake.set()
+
+    def spooled(self):
+        """
+        Lotes no spool aguardando envio, do mais antigo ao mais novo
+        """
+        names = sorted(
+            name for name in os.listdir(self.spool_dir) if name.endswith(self.SPOOL_SUFFIX)
+        )
+        return [os.path.join(self.spool_dir, name) for name in names]
+
+    def _trim_spool(self):
+        paths = self.spooled()
+        sizes = []
+        for path in paths:
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(0)  # Enviado e removido pela thread de envio
+        total = sum(sizes)
+        for path, size in zip(paths, sizes):
+            if total <= self.max_spool_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Enviado nesse meio tempo
+            total -= size
+            with self._lock:
+                self.batches_dropped += 1
+            print(f"⚠ Aviso: spool do uplink cheio, lote descartado: {path}")
+
+    def _send(self, path):
+        """
+        Envia um lote; retorna False se deve ser tentado de novo
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return True  # Descartado pelo limite do spool
+        request = urllib.request.Request(
+            self.endpoint,
+            data=data,
+            method="POST",
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                print(f"⚠ Aviso: lote recusado pelo coletor ({e.code}): {path}")
+                with self._lock:
+                    self.batches_rejected += 1
+                self._remove(path)
+                return True
+            self._report_offline(f"HTTP {e.code}")
+            return False
+        except (urllib.error.URLError, OSError) as e:
+            self._report_offline(e)
+            return False
+
+        self._remove(path)
+        with self._lock:
+            self.batches_sent += 1
+            self.bytes_sent += len(data)
+        if self._offline:
+            self._offline = False
+            print("✓ Uplink restabelecido")
+        return True
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Já removido pelo limite do spool
+
+    def _report_offline(self, error):
+        with self._lock:
+            self.send_failures += 1
+        if not self._offline:
+            self._offline = True
+            print(f"⚠ Uplink sem conexão, lotes mantidos no spool: {error}")
+
+    def _send_loop(self):
+        """
+        Thread de envio: esvazia o spool em ordem, com espera exponencial
+        """
+        failures = 0
+        while True:
+            self._wake.clear()
+            for path in self.spooled():
+                if not self._send(path):
+                    failures += 1
+                    break
+                failures = 0
+            else:
+                if self._stop.is_set():
+                    if not self.spooled():
+                        return
+                    continue  # Lote fechado por close() durante o envio
+                self._wake.wait()
+                continue
+
+            delay = self.retry_delay * 2 ** min(failures - 1, 20)
+            delay = min(self.max_retry_delay, delay) * random.uniform(0.5, 1.0)
+            if self._stop.is_set():
+                # Encerrando: novas tentativas até o prazo de close()
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                time.sleep(min(delay, remaining))
+            else:
+                self._stop.wait(delay)  # close() interrompe a espera
+
+    def close(self, timeout=10.0):
+        """
+        Fecha o minuto e o lote em andamento e tenta enviar o spool
+
+        Lotes não enviados em `timeout` segundos ficam no spool para a
+        próxima execução.
+
+        Returns:
+            int: Lotes que ficaram no spool
+        """
+        if self._sender.is_alive():
+            if self._alert_started is not None:
+                self._end_alert()
+                self._alert_active = False
+            self._close_minute()
+            self.seal()
+            self._deadline = time.monotonic() + timeout
+            self._stop.set()
+            self._wake.set()
+            self._sender.join(timeout + self.timeout)
+        return len(self.spooled())
+
+
+class FrameStore:
+    """
+    Frames de vídeo decodificados uma única vez e mapeados em memória.
+
+    Um vídeo (ex.: gravação H.264 da cabine) é decodificado por `build()` para
+    um arquivo bruto de frames em escala de cinza (opcionalmente reduzidos),
+    acompanhado de um índice de timestamps. Experimentos seguintes leem os
+    frames por índice direto do arquivo mapeado (`np.memmap`), sem cópia e com
+    acesso aleatório; execuções repetidas e workers em paralelo compartilham o
+    cache de páginas do sistema operacional em vez de decodificar de novo.
+
+    Estrutura do diretório:
+        frames.u8       Frames uint8 contíguos (N x altura x largura)
+        timestamps.npy  Timestamp (PTS) de cada frame em segundos
+        meta.json       Forma, FPS, fator de escala e vídeo de origem
+
+    Args:
+        path (str): Diretório criado por `FrameStore.build()`
+
+    Exemplo:
+        >>> store = FrameStore.build("cabine.mp4", "cache/cabine", scale=0.5)
+        >>> store = FrameStore("cache/cabine")
+        >>> gray = store[120]  # view somente leitura, sem cópia
+    """
+
+    FRAMES_FILE = "frames.u8"
+    TIMESTAMPS_FILE = "timestamps.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, self.META_FILE)) as f:
+            meta = json.load(f)
+
+        self.fps = meta["fps"]
+        self.scale = meta["scale"]
+        self.source = meta["source"]
+        self.frames = np.memmap(
+            os.path.join(path, self.FRAMES_FILE),
+            dtype=np.uint8,
+            mode="r",
+            shape=(meta["count"], meta["height"], meta["width"]),
+        )
+        self.timestamps = np.load(
+            os.path.join(path, self.TIMESTAMPS_FILE), mmap_mode="r"
+        )
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def index_at(self, timestamp):
+        """
+        Índice do primeiro frame com timestamp >= `timestamp`
+        """
+        return int(np.searchsorted(self.timestamps, timestamp))
+
+    @classmethod
+    def build(cls, video_path, path, scale=1.0):
+        """
+        Decodifica um vídeo uma única vez para um `FrameStore`
+
+        Args:
+            video_path (str): Vídeo de origem
+            path (str): Diretório de destino (criado se não existir)
+            scale (float): Fator de redução dos frames (1.0 = tamanho original)
+
+        Returns:
+            FrameStore: Armazenamento pronto para leitura
+
+        Raises:
+            IOError: Se o vídeo não puder ser aberto ou não tiver frames
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Não foi possível abrir o vídeo: {video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        os.makedirs(path, exist_ok=True)
+
+        timestamps = []
+        width = height = 0
+        gray = None
+        with open(os.path.join(path, cls.FRAMES_FILE), "wb") as out:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                # PTS do frame; alguns backends não informam e retornam 0
+                pts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if timestamps and pts <= timestamps[-1]:
+                    pts = len(timestamps) / fps
+                timestamps.append(pts)
+
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+                if scale != 1.0:
+                    small = cv2.resize(
+                        gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+                    )
+                else:
+                    small = gray
+                height, width = small.shape
+                out.write(small.tobytes())
+        cap.release()
+
+        if not timestamps:
+            raise IOError(f"Nenhum frame decodificado de: {video_path}")
+
+        np.save(
+            os.path.join(path, cls.TIMESTAMPS_FILE),
+            np.asarray(timestamps, dtype=np.float64),
+        )
+        with open(os.path.join(path, cls.META_FILE), "w") as f:
+            json.dump(
+                {
+                    "count": len(timestamps),
+                    "height": height,
+                    "width": width,
+                    "fps": fps,
+                    "scale": scale,
+                    "source": os.path.abspath(video_path),
+                },
+                f,
+                indent=2,
+            )
+        return cls(path)
+
+
+class VideoFrames:
+    """
+    Vídeo lido sequencialmente como sequência de frames para `analyze_offline`.
+
+    Alternativa ao `FrameStore` para gravações longas, que não cabem
+    decodificadas em disco. O acesso deve ser em ordem crescente de índice:
+    frames à frente são alcançados com `grab()` (sem decodificar a imagem),
+    o que permite retomar uma análise a partir de um checkpoint. O PTS de
+    cada frame lido fica em `timestamps`, com a mesma regra do
+    `FrameStore.build()` para backends que não informam o PTS.
+
+    O número de frames vem do contêiner e pode ser aproximado, para mais ou
+    para menos. Por isso `open_ended` é True: `analyze_offline` lê além de
+    `len()` até `grab()` falhar, e a leitura após o último frame levanta
+    IndexError, que encerra a análise.
+
+    Args:
+        path (str): Arquivo de vídeo
+
+    Raises:
+        IOError: Se o vídeo não puder ser aberto
+    """
+
+    open_ended = True
+
+    def __init__(self, path):
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise IOError(f"Não foi possível abrir o vídeo: {path}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.timestamps = array.array("d")
+
+    def __len__(self):
+        return self._count
+
+    def _advance(self):
+        if not self._cap.grab():
+            raise IndexError(f"Fim do vídeo em {len(self.timestamps)}: {self.path}")
+        pts = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if self.timestamps and pts <= self.timestamps[-1]:
+            pts = len(self.timestamps) / self.fps
+        self.timestamps.append(pts)
+
+    def __getitem__(self, index):
+        if index < len(self.timestamps):
+            raise IndexError(f"Frame {index} já lido: VideoFrames é sequencial")
+        while len(self.timestamps) <= index:
+            self._advance()
+        ret, frame = self._cap.retrieve()
+        if not ret:
+            raise IndexError(f"Falha ao decodificar o frame {index}: {self.path}")
+        return frame
+
+    def release(self):
+        """
+        Libera o vídeo
+        """
+        self._cap.release()
+
+
+class AnalysisCheckpoint:
+    """
+    Checkpoint periódico de `analyze_offline`, para retomar análises longas.
+
+    A cada `every` frames, grava o estado completo do detector (contadores,
+    janelas de histórico, filtros, gate, calibração e relógio; ver
+    `FatigueDetector.checkpoint_state`) e os registros de análise produzidos
+    desde o último checkpoint. Uma nova execução com o mesmo caminho e a
+    mesma fonte continua do frame seguinte ao checkpoint, e o resultado final
+    é idêntico, byte a byte, ao de uma execução sem interrupção.
+
+    O custo é limitado: os registros são anexados a um arquivo (cada registro
+    é gravado uma única vez) e o estado, de tamanho fixo, é substituído de
+    forma atômica. Uma queda durante a gravação mantém o checkpoint anterior
+    válido, e registros excedentes no arquivo são descartados ao retomar.
+
+    Arquivos:
+        <path>          Estado do detector e contagem de registros (pickle)
+        <path>.rows     Registros `FRAME_ANALYSIS_DTYPE` contíguos
+
+    Args:
+        path (str): Arquivo do checkpoint
+        every (int): Frames entre checkpoints
+        source_id (str): Identificação da fonte (ex.: caminho, tamanho e data);
+                         um checkpoint de outra fonte é descartado
+
+    Exemplo:
+        >>> checkpoint = AnalysisCheckpoint("noite.ckpt", source_id="noite.mp4")
+        >>> log = detector.analyze_offline(frames, checkpoint=checkpoint)
+        >>> log.save("noite.npy")
+        >>> checkpoint.remove()
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, every=1800, source_id=None):
+        self.path = path
+        self.rows_path = path + ".rows"
+        self.every = every
+        self.source_id = source_id
+        self._saved_rows = 0
+
+    def _discard(self, reason):
+        print(f"⚠ Checkpoint {self.path} ignorado: {reason}")
+        self.remove()
+        return 0
+
+    def resume(self, detector, log, total):
+        """
+        Restaura o detector e o log a partir do checkpoint, se existir
+
+        Args:
+            detector (FatigueDetector): Detector a restaurar
+            log (FrameAnalysisLog): Log vazio que recebe os registros salvos
+            total (int): Número de frames da fonte
+
+        Returns:
+            int: Índice do próximo frame a analisar (0 sem checkpoint)
+        """
+        self._saved_rows = 0
+        if not os.path.exists(self.path):
+            if os.path.exists(self.rows_path):
+                os.remove(self.rows_path)
+            return 0
+
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            return self._discard(f"ilegível ({e})")
+        if saved.get("version") != self.VERSION:
+            return self._discard("versão diferente")
+        if saved["source_id"] != self.source_id or saved["total"] != total:
+            return self._discard("fonte diferente")
+
+        if not os.path.exists(self.rows_path):
+            return self._discard("arquivo de registros ausente")
+        rows = np.fromfile(self.rows_path, dtype=FRAME_ANALYSIS_DTYPE, count=saved["rows"])
+        if len(rows) != saved["rows"]:
+            return self._discard("registros incompletos")
+        with open(self.rows_path, "r+b") as f:
+            f.truncate(rows.nbytes)
+
+        log.extend(rows)
+        detector.restore_state(saved["detector"])
+        self._saved_rows = saved["rows"]
+        print(f"✓ Retomando do frame {saved['next_index']} ({self.path})")
+        return saved["next_index"]
+
+    def due(self, index):
+        """
+        Indica se o frame `index` (recém-analisado) fecha um intervalo
+        """
+        return (index + 1) % self.every == 0
+
+    def save(self, detector, log, next_index, total):
+        """
+        Grava os registros novos e o estado do detector
+
+        Args:
+            detector (FatigueDetector): Detector analisando a fonte
+            log (FrameAnalysisLog): Log com todos os registros até aqui
+            next_index (int): Próximo frame a analisar
+            total (int): Número de frames da fonte
+        """
+        rows = log.to_array()
+        with open(self.rows_path, "ab") as f:
+            f.write(rows[self._saved_rows :].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        saved = {
+            "version": self.VERSION,
+            "source_id": self.source_id,
+            "total": total,
+            "next_index": next_index,
+            "rows": len(rows),
+            "detector": detector.checkpoint_state(),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._saved_rows = len(rows)
+
+    def remove(self):
+        """
+        Remove os arquivos do checkpoint (após salvar o resultado final)
+        """
+        for path in (self.path, self.rows_path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Registro por frame do arquivo de marcos (decodificado): 68 pontos no esquema
+# do dlib, em coordenadas absolutas como `extract_face_landmarks`
+LANDMARK_RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", np.float64),
+        ("face_detected", np.bool_),
+        ("face_box", np.int32, (4,)),
+        ("landmarks", np.int_, (68, 2)),
+        ("metrics", np.float32, (3,)),
+    ]
+)
+
+# Cabeçalho do arquivo, cabeçalho de cada bloco e rodapé (índice de busca)
+LANDMARK_ARCHIVE_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", np.uint32),
+        ("points", np.uint32),
+        ("block_frames", np.uint32),
+        ("reserved", np.uint32),
+    ]
+)
+LANDMARK_ARCHIVE_BLOCK_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("frames", np.uint32),
+        ("size", np.uint32),
+        ("first_time", np.float64),
+        ("last_time", np.float64),
+    ]
+)
+LANDMARK_ARCHIVE_INDEX_DTYPE = np.dtype(
+    [("offset", np.uint64)] + LANDMARK_ARCHIVE_BLOCK_DTYPE.descr[1:]
+)
+LANDMARK_ARCHIVE_FOOTER_DTYPE = np.dtype(
+    [("index_offset", np.uint64), ("blocks", np.uint32), ("magic", "S4")]
+)
+
+LANDMARK_ARCHIVE_MAGIC = b"FATLMK01"
+LANDMARK_ARCHIVE_VERSION = 1
+LANDMARK_ARCHIVE_BLOCK_MAGIC = b"BLK1"
+LANDMARK_ARCHIVE_FOOTER_MAGIC = b"IDX1"
+
+
+def _shuffle_bytes(values):
+    """
+    Agrupa o byte i de todos os valores (melhora a compressão de inteiros
+    pequenos e de floats próximos)
+    """
+    values = np.ascontiguousarray(values)
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle_bytes(buffer, offset, dtype, shape):
+    """
+    Inverso de `_shuffle_bytes` para `shape` valores de `dtype` a partir de
+    `offset`; retorna (array, próximo offset)
+    """
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    size = count * dtype.itemsize
+    raw = np.frombuffer(buffer, np.uint8, size, offset).reshape(dtype.itemsize, count)
+    return raw.T.copy().view(dtype).reshape(shape), offset + size
+
+
+class LandmarkArchive:
+    """
+    Gravação compacta da série de marcos faciais e métricas por frame.
+
+    Cada frame guarda o timestamp, o retângulo da face, os 68 marcos em
+    int16 relativos ao canto do retângulo e EAR esquerdo/direito/MAR em
+    float32. Os frames são agrupados em blocos independentes: retângulos e
+    marcos são codificados como diferença para o frame anterior (os pontos
+    se movem pouco entre frames), os bytes de cada campo são agrupados e o
+    bloco é comprimido com zlib. Um índice no final do arquivo (primeiro e
+    último timestamp e posição de cada bloco) permite acesso aleatório por
+    tempo descomprimindo um único bloco (ver `LandmarkArchiveReader`).
+
+    Comparado aos arrays 68x2 int64 de `extract_face_landmarks` (~1 KB por
+    frame), o arquivo ocupa da ordem de 10x menos; ver
+    `benchmarks/arquivo_marcos.py`.
+
+    Se o processo cair antes de `close()`, o índice não é gravado, mas os
+    blocos completos continuam legíveis (o leitor percorre os cabeçalhos).
+
+    Retângulos e marcos relativos fora da faixa do int16 (impossíveis em
+    resoluções de vídeo usuais) são saturados em vez de estourar; os frames
+    afetados são contados em `clipped`.
+
+    Args:
+        path (str): Arquivo de destino (sobrescrito)
+        block_frames (int): Frames por bloco (acesso aleatório x compressão)
+        level (int): Nível de compressão zlib (1-9)
+
+    Exemplo:
+        >>> detector.landmark_archive = LandmarkArchive("marcos.lmk")
+        >>> detector.analyze_offline(store)
+        >>> detector.landmark_archive.close()
+    """
+
+    POINTS = 68
+
+    def __init__(self, path, block_frames=256, level=6):
+        self.path = path
+        self.block_frames = block_frames
+        self.level = level
+        self.frames = 0
+        self.clipped = 0
+        self._block = np.zeros(block_frames, dtype=LANDMARK_RECORD_DTYPE)
+        self._count = 0
+        self._index = []
+
+        self._file = open(path, "wb")
+        header = np.zeros(1, dtype=LANDMARK_ARCHIVE_HEADER_DTYPE)
+        header["magic"] = LANDMARK_ARCHIVE_MAGIC
+        header["version"] = LANDMARK_ARCHIVE_VERSION
+        header["points"] = self.POINTS
+        header["block_frames"] = block_frames
+        self._file.write(header.tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, timestamp, face_box=None, landmarks=None, metrics=None):
+        """
+        Adiciona um frame
+
+        Args:
+            timestamp (float): Timestamp do frame em segundos
+            face_box: Retângulo (x, y, w, h) da face analisada (None sem face)
+            landmarks: Array 68x2 de marcos (None sem face)
+            metrics: (ear_esquerdo, ear_direito, mar) da face (None: gravadas
+                     como NaN)
+
+        Raises:
+            ValueError: Se há marcos sem o retângulo da face
+        """
+        if landmarks is not None and face_box is None:
+            raise ValueError("face_box é obrigatório quando há marcos")
+        # As linhas do bloco são reutilizadas: todo campo é escrito
+        row = self._block[self._count]
+        row["timestamp"] = timestamp
+        if landmarks is not None:
+            row["face_detected"] = True
+            row["face_box"] = face_box
+            row["landmarks"] = landmarks
+            row["metrics"] = metrics if metrics is not None else np.nan
+        else:
+            row["face_detected"] = False
+            row["face_box"] = 0
+            row["landmarks"] = 0
+            row["metrics"] = 0
+        self._count += 1
+        self.frames += 1
+        if self._count == self.block_frames:
+            self.flush()
+
+    def flush(self):
+        """
+        Comprime e grava o bloco em andamento (mesmo incompleto)
+        """
+        if self._count == 0:
+            return
+        rows = self._block[: self._count]
+        low, high = np.iinfo(np.int16).min, np.iinfo(np.int16).max
+        boxes = np.clip(rows["face_box"], low, high)
+        relative = rows["landmarks"] - boxes[:, None, :2]
+        clipped = (boxes != rows["face_box"]).any(axis=1)
+        clipped |= ((relative < low) | (relative > high)).any(axis=(1, 2))
+        self.clipped += int(clipped.sum())
+        boxes = boxes.astype(np.int16)
+        relative = np.clip(relative, low, high).astype(np.int16)
+        # Diferença para o frame anterior; o primeiro frame do bloco fica
+        # absoluto, então cada bloco decodifica sozinho
+        box_deltas = np.diff(boxes, axis=0, prepend=np.zeros((1, 4), np.int16))
+        point_deltas = np.diff(
+            relative, axis=0, prepend=np.zeros((1, self.POINTS, 2), np.int16)
+        )
+        payload = b"".join(
+            (
+                _shuffle_bytes(rows["timestamp"]),
+                rows["face_detected"].tobytes(),
+                _shuffle_bytes(box_deltas),
+                _shuffle_bytes(point_deltas),
+                _shuffle_bytes(rows["metrics"]),
+            )
+        )
+        data = zlib.compress(payload, self.level)
+
+        header = np.zeros(1, dtype=LANDMARK_ARCHIVE_BLOCK_DTYPE)
+        header["magic"] = LANDMARK_ARCHIVE_BLOCK_MAGIC
+        header["frames"] = self._count
+        header["size"] = len(data)
+        header["first_time"] = rows["timestamp"][0]
+        header["last_time"] = rows["timestamp"][-1]
+        offset = self._file.tell()
+        self._file.write(header.tobytes())
+        self._file.write(data)
+        self._index.append((offset,) + tuple(header[0])[1:])
+        self._count = 0
+
+    def close(self):
+        """
+        Grava o bloco pendente e o índice de busca e fecha o arquivo
+        """
+        if self._file.closed:
+            return
+        self.flush()
+        index = np.array(self._index, dtype=LANDMARK_ARCHIVE_INDEX_DTYPE)
+        footer = np.zeros(1, dtype=LANDMARK_ARCHIVE_FOOTER_DTYPE)
+        footer["index_offset"] = self._file.tell()
+        footer["blocks"] = len(index)
+        footer["magic"] = LANDMARK_ARCHIVE_FOOTER_MAGIC
+        self._file.write(index.tobytes())
+        self._file.write(footer.tobytes())
+        self._file.close()
+
+
+class LandmarkArchiveReader:
+    """
+    Leitura de um `LandmarkArchive`: acesso por tempo e decodificação em
+    streaming, bloco a bloco, para arrays `LANDMARK_RECORD_DTYPE`.
+
+    Apenas o índice fica em memória; cada consulta descomprime um bloco (o
+    último bloco decodificado é mantido para consultas próximas no tempo).
+
+    Args:
+        path (str): Arquivo gravado por `LandmarkArchive`
+
+    Raises:
+        ValueError: Se o arquivo não for um arquivo de marcos
+
+    Exemplo:
+        >>> reader = LandmarkArchiveReader("marcos.lmk")
+        >>> record = reader.at(3600.0)  # frame em (ou logo antes de) 1 h
+        >>> for block in reader.iter_blocks(start=600, end=900):
+        ...     ear = block["metrics"][:, :2].mean(axis=1)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = np.fromfile(self._file, LANDMARK_ARCHIVE_HEADER_DTYPE, 1)
+        if len(header) == 0 or header["magic"][0] != LANDMARK_ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError(f"Arquivo de marcos inválido: {path}")
+        self.block_frames = int(header["block_frames"][0])
+        self.recovered = False  # True se o índice foi reconstruído (sem close())
+        self.index = self._read_index()
+        self.first_times = self.index["first_time"]
+        self._cached = (None, None)
+
+    def _read_index(self):
+        size = os.fstat(self._file.fileno()).st_size
+        footer_size = LANDMARK_ARCHIVE_FOOTER_DTYPE.itemsize
+        if size >= LANDMARK_ARCHIVE_HEADER_DTYPE.itemsize + footer_size:
+            self._file.seek(size - footer_size)
+            footer = np.fromfile(self._file, LANDMARK_ARCHIVE_FOOTER_DTYPE, 1)
+            if footer["magic"][0] == LANDMARK_ARCHIVE_FOOTER_MAGIC:
+                self._file.seek(int(footer["index_offset"][0]))
+                return np.fromfile(
+                    self._file, LANDMARK_ARCHIVE_INDEX_DTYPE, int(footer["blocks"][0])
+                )
+
+        # Sem rodapé: percorre os blocos completos
+        self.recovered = True
+        entries = []
+        offset = LANDMARK_ARCHIVE_HEADER_DTYPE.itemsize
+        block_size = LANDMARK_ARCHIVE_BLOCK_DTYPE.itemsize
+        while offset + block_size <= size:
+            self._file.seek(offset)
+            header = np.fromfile(self._file, LANDMARK_ARCHIVE_BLOCK_DTYPE, 1)[0]
+            end = offset + block_size + int(header["size"])
+            if header["magic"] != LANDMARK_ARCHIVE_BLOCK_MAGIC or end > size:
+                break
+            entries.append((offset,) + tuple(header)[1:])
+            offset = end
+        return np.array(entries, dtype=LANDMARK_ARCHIVE_INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self.index["frames"].sum())
+
+    @property
+    def duration(self):
+        """
+        Intervalo (primeiro, último) de timestamps do arquivo
+        """
+        if len(self.index) == 0:
+            return 0.0, 0.0
+        return float(self.index["first_time"][0]), float(self.index["last_time"][-1])
+
+    def read_block(self, block):
+        """
+        Decodifica o bloco de índice `block`
+
+        Returns:
+            numpy.ndarray: Registros `LANDMARK_RECORD_DTYPE` do bloco
+        """
+        if self._cached[0] == block:
+            return self._cached[1]
+        entry = self.index[block]
+        self._file.seek(int(entry["offset"]) + LANDMARK_ARCHIVE_BLOCK_DTYPE.itemsize)
+        payload = zlib.decompress(self._file.read(int(entry["size"])))
+        count = int(entry["frames"])
+        points = LandmarkArchive.POINTS
+
+        rows = np.zeros(count, dtype=LANDMARK_RECORD_DTYPE)
+        rows["timestamp"], offset = _unshuffle_bytes(payload, 0, np.float64, (count,))
+        rows["face_detected"] = np.frombuffer(payload, np.bool_, count, offset)
+        offset += count
+        box_deltas, offset = _unshuffle_bytes(payload, offset, np.int16, (count, 4))
+        point_deltas, offset = _unshuffle_bytes(
+            payload, offset, np.int16, (count, points, 2)
+        )
+        rows["metrics"], offset = _unshuffle_bytes(payload, offset, np.float32, (count, 3))
+
+        # Soma acumulada em int16 reverte as diferenças (com o mesmo estouro)
+        boxes = np.cumsum(box_deltas, axis=0, dtype=np.int16)
+        rows["face_box"] = boxes
+        rows["landmarks"] = np.cumsum(point_deltas, axis=0, dtype=np.int16)
+        rows["landmarks"] += rows["face_box"][:, None, :2]
+
+        self._cached = (block, rows)
+        return rows
+
+    def iter_blocks(self, start=None, end=None):
+        """
+        Decodifica em sequência os blocos com frames no intervalo [start, end]
+
+        Args:
+            start (float): Timestamp inicial (padrão: início do arquivo)
+            end (float): Timestamp final (padrão: fim do arquivo)
+
+        Yields:
+            numpy.ndarray: Registros `LANDMARK_RECORD_DTYPE` no intervalo
+        """
+        first = 0
+        if start is not None:
+            first = max(bisect.bisect_right(self.first_times, start) - 1, 0)
+        for block in range(first, len(self.index)):
+            if end is not None and self.index["first_time"][block] > end:
+                break
+            rows = self.read_block(block)
+            if start is not None or end is not None:
+                times = rows["timestamp"]
+                low = times >= start if start is not None else True
+                high = times <= end if end is not None else True
+                rows = rows[low & high]
+            if len(rows):
+                yield rows
+
+    def read(self, start=None, end=None):
+        """
+        Todos os registros no intervalo [start, end] em um único array
+        """
+        blocks = list(self.iter_blocks(start, end))
+        if not blocks:
+            return np.zeros(0, dtype=LANDMARK_RECORD_DTYPE)
+        return np.concatenate(blocks)
+
+    def at(self, timestamp):
+        """
+        Registro do último frame com timestamp <= `timestamp`
+
+        Returns:
+            numpy.void: Registro `LANDMARK_RECORD_DTYPE`, ou None se
+            `timestamp` for anterior ao primeiro frame
+        """
+        block = bisect.bisect_right(self.first_times, timestamp) - 1
+        if block < 0:
+            return None
+        rows = self.read_block(block)
+        position = int(np.searchsorted(rows["timestamp"], timestamp, side="right")) - 1
+        return rows[position]
+
+    def close(self):
+        """
+        Fecha o arquivo
+        """
+        self._file.close()
+
+
+class P2Quantile:
+    """
+    Estimador de quantil em streaming pelo algoritmo P² (Jain e Chlamtac, 1985).
+
+    Mantém apenas 5 marcadores, independentemente do número de amostras:
+    memória O(1) e atualização O(1), sem guardar o histórico.
+
+    Args:
+        p (float): Quantil desejado (0.0-1.0), ex.: 0.5 para a mediana
+
+    Exemplo:
+        >>> median = P2Quantile(0.5)
+        >>> for value in values:
+        ...     median.add(value)
+        >>> median.value
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        """
+        Adiciona uma amostra
+        """
+        self.count += 1
+        q = self._heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self._positions
+
+        # Localiza a célula da amostra, ajustando os extremos
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Ajusta os marcadores centrais (interpolação parabólica ou linear)
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    @property
+    def value(self):
+        """
+        Estimativa atual do quantil (None sem amostras)
+        """
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            index = min(int(round(self.p * (self.count - 1))), self.count - 1)
+            return self._heights[index]
+        return self._heights[2]
+
+
+class DriverCalibrator:
+    """
+    Calibração online dos limiares de EAR e MAR para um motorista.
+
+    Durante os primeiros `duration` segundos com face detectada, aprende a
+    distribuição de EAR com olhos abertos e de MAR em repouso usando
+    estimadores de quantil P² (memória O(1) por sessão). Ao final, deriva
+    os limiares:
+
+        EAR_THRESHOLD = EAR_RATIO x mediana do EAR
+        MAR_THRESHOLD = max(MAR_P95_FACTOR x p95 do MAR, MAR_MEDIAN_FACTOR x mediana)
+
+    ambos limitados às faixas seguras abaixo. A mediana do EAR é robusta às
+    piscadas e o p95 do MAR tolera fala e bocejos ocasionais na calibração.
+
+    A duração soma só o tempo com face: o intervalo entre dois frames
+    observados conta até `MAX_FRAME_GAP` segundos, então períodos sem face
+    (em que `observe` não é chamado) não avançam a calibração.
+
+    Args:
+        duration (float): Duração da calibração em segundos com face
+        min_samples (int): Amostras mínimas antes de concluir
+    """
+
+    EAR_RATIO = 0.75
+    EAR_LIMITS = (0.12, 0.30)
+    MAR_P95_FACTOR = 1.3
+    MAR_MEDIAN_FACTOR = 1.8
+    MAR_LIMITS = (0.45, 0.90)
+    MAX_FRAME_GAP = 0.5
+
+    def __init__(self, duration=120.0, min_samples=300):
+        self.duration = duration
+        self.min_samples = min_samples
+        self.ear_median = P2Quantile(0.5)
+        self.mar_median = P2Quantile(0.5)
+        self.mar_p95 = P2Quantile(0.95)
+        self.face_time = 0.0
+        self.last_timestamp = None
+        self.done = False
+
+    def observe(self, ear, mar, timestamp):
+        """
+        Adiciona as métricas de um frame com face
+
+        Args:
+            ear (float): EAR médio dos dois olhos
+            mar (float): MAR da boca
+            timestamp (float): Instante do frame em segundos
+
+        Returns:
+            bool: True quando a calibração acabou de ser concluída
+        """
+        if self.done:
+            return False
+        if self.last_timestamp is not None:
+            gap = timestamp - self.last_timestamp
+            self.face_time += min(max(gap, 0.0), self.MAX_FRAME_GAP)
+        self.last_timestamp = timestamp
+
+        self.ear_median.add(ear)
+        self.mar_median.add(mar)
+        self.mar_p95.add(mar)
+
+        if (
+            self.face_time >= self.duration
+            and self.ear_median.count >= self.min_samples
+        ):
+            self.done = True
+            return True
+        return False
+
+    def thresholds(self):
+        """
+        Limiares derivados das estimativas atuais
+
+        Returns:
+            tuple: (ear_threshold, mar_threshold)
+        """
+        ear_low, ear_high = self.EAR_LIMITS
+        mar_low, mar_high = self.MAR_LIMITS
+        ear_threshold = self.EAR_RATIO * self.ear_median.value
+        mar_threshold = max(
+            self.MAR_P95_FACTOR * self.mar_p95.value,
+            self.MAR_MEDIAN_FACTOR * self.mar_median.value,
+        )
+        return (
+            min(max(ear_threshold, ear_low), ear_high),
+            min(max(mar_threshold, mar_low), mar_high),
+        )
+
+    @classmethod
+    def valid_profile(cls, profile):
+        """
+        Verifica se um perfil lido do cache tem limiares utilizáveis
+
+        Args:
+            profile: Conteúdo do JSON do perfil
+
+        Returns:
+            bool: True se os limiares existem, são numéricos e estão nas
+                  faixas seguras
+        """
+        if not isinstance(profile, dict):
+            return False
+        for key, (low, high) in (
+            ("ear_threshold", cls.EAR_LIMITS),
+            ("mar_threshold", cls.MAR_LIMITS),
+        ):
+            value = profile.get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return False
+            if not low <= value <= high:
+                return False
+        return True
+
+    def profile(self):
+        """
+        Perfil do motorista para o cache (limiares e estimativas)
+        """
+        ear_threshold, mar_threshold = self.thresholds()
+        return {
+            "ear_threshold": ear_threshold,
+            "mar_threshold": mar_threshold,
+            "ear_median": self.ear_median.value,
+            "mar_median": self.mar_median.value,
+            "mar_p95": self.mar_p95.value,
+            "samples": self.ear_median.count,
+            "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+
+class DriverProfileCache:
+    """
+    Cache em disco dos perfis de calibração, um arquivo JSON por motorista.
+
+    Args:
+        directory (str): Diretório dos perfis
+    """
+
+    def __init__(self, directory=os.path.join("~", ".cache", "fatigue-sensor", "profiles")):
+        self.directory = os.path.expanduser(directory)
+
+    def _path(self, driver_id):
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(driver_id))
+        return os.path.join(self.directory, f"{safe_id}.json")
+
+    def load(self, driver_id):
+        """
+        Perfil salvo do motorista, ou None se não existir ou for inválido
+        """
+        try:
+            with open(self._path(driver_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, driver_id, profile):
+        """
+        Salva o perfil do motorista (escrita atômica)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(driver_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class PipelineProfiler:
+    """
+    Perfilamento do loop de detecção durante uma janela de tempo configurável.
+
+    Modos:
+        - "sampling": uma thread amostra a pilha da thread do loop a cada
+          `interval` segundos (baixo overhead). Gera `<prefixo>.collapsed`
+          (formato de pilhas colapsadas, aceito por flamegraph.pl e speedscope)
+        - "cprofile": perfil determinístico com cProfile. Gera `<prefixo>.prof`
+          (pstats, aceito por snakeviz e speedscope)
+
+    Nos dois modos, `<prefixo>.txt` traz o resumo por função das chamadas
+    feitas a partir de `process_frame`. Chamadas nativas (OpenCV, dlib) são
+    contabilizadas na função Python que as chamou.
+
+    Sem profiler configurado, o loop não tem nenhum custo de perfilamento.
+
+    Args:
+        duration (float): Duração da janela em segundos
+        output (str): Prefixo dos arquivos gerados
+        mode (str): "sampling" ou "cprofile"
+        interval (float): Intervalo de amostragem em segundos (modo sampling)
+
+    Exemplo:
+        >>> detector.profiler = PipelineProfiler(30, "perfil")
+        >>> detector.run()
+    """
+
+    TARGET = "process_frame"
+    # Nomes exatos do loop por frame (sem casar preprocess_frame)
+    TARGET_NAMES = ("process_frame", "_process_frame")
+
+    def __init__(self, duration=30.0, output="perfil", mode="sampling", interval=0.005):
+        if mode not in ("sampling", "cprofile"):
+            raise ValueError(f"Modo de perfilamento desconhecido: {mode}")
+        self.duration = duration
+        self.output = output
+        self.mode = mode
+        self.interval = interval
+        self.active = False
+        self.finished = False
+        self._started_at = None
+        self._stacks = Counter()
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._profile = None
+
+    def start(self):
+        """
+        Inicia a janela de perfilamento na thread atual (a do loop)
+        """
+        if self.active or self.finished:
+            return
+        self.active = True
+        self._started_at = time.monotonic()
+
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+
+        self._target_thread = threading.get_ident()
+        self._stop_event.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="fatigue-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def tick(self):
+        """
+        Chamado a cada frame: encerra a janela quando a duração é atingida
+        """
+        if self.active and time.monotonic() - self._started_at >= self.duration:
+            self.stop()
+
+    def stop(self):
+        """
+        Encerra a janela (se ativa) e grava os arquivos de saída
+        """
+        if not self.active:
+            return
+        self.active = False
+        self.finished = True
+
+        if self.mode == "cprofile":
+            self._profile.disable()
+            self._profile.dump_stats(self.output + ".prof")
+            with open(self.output + ".txt", "w") as f:
+                stats = pstats.Stats(self._profile, stream=f)
+                # Filtro do pstats é regex sobre "arquivo:linha(função)"
+                stats.sort_stats("cumulative").print_callees(r"\(_?process_frame\)")
+                stats.print_stats(30)
+            print(f"✓ Perfil salvo em {self.output}.prof e {self.output}.txt")
+            return
+
+        self._stop_event.set()
+        self._sampler.join()
+        with open(self.output + ".collapsed", "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(self.output + ".txt", "w") as f:
+            f.write(self.summary())
+        print(f"✓ Perfil salvo em {self.output}.collapsed e {self.output}.txt")
+
+    @staticmethod
+    def _label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def summary(self):
+        """
+        Resumo das amostras: funções chamadas por `process_frame` e funções
+        com mais tempo próprio
+
+        Returns:
+            str: Relatório em texto
+        """
+        total = sum(self._stacks.values())
+        loop_samples = 0
+        callees = Counter()
+        self_time = Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(";")
+            self_time[frames[-1]] += count
+
+            # Primeira função abaixo do process_frame mais interno
+            names = [label.split(" ", 1)[0] for label in frames]
+            positions = [i for i, name in enumerate(names) if name in self.TARGET_NAMES]
+            if not positions:
+                continue
+            loop_samples += count
+            index = positions[-1] + 1
+            callees[frames[index] if index < len(frames) else "<próprio>"] += count
+
+        lines = [
+            f"Amostras: {total} (intervalo {self.interval * 1000:.1f} ms)",
+            f"Em {self.TARGET}: {loop_samples} ({loop_samples / max(total, 1):.1%})",
+            "",
+            f"Chamadas a partir de {self.TARGET} (tempo inclusivo):",
+        ]
+        for label, count in callees.most_common():
+            lines.append(f"  {count / max(loop_samples, 1):6.1%}  {count:6d}  {label}")
+        lines += ["", "Funções com mais tempo próprio:"]
+        for label, count in self_time.most_common(20):
+            lines.append(f"  {count / max(total, 1):6.1%}  {count:6d}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Latência por estágio de `process_frame`, em um buffer circular pré-alocado
+
+    Cada frame ocupa uma linha com a duração (em segundos) dos estágios
+    `STAGES`; frames reaproveitados pelo gate de movimento têm detecção e
+    marcos zerados. Nenhuma alocação ocorre durante a medição.
+
+    Args:
+        capacity (int): Número de frames mantidos
+
+    Exemplo:
+        >>> detector.stage_timer = StageTimer()
+        >>> detector.process_frame(frame)
+        >>> detector.stage_timer.percentiles()["detect"]
+    """
+
+    STAGES = ("preprocess", "detect", "landmarks", "analysis")
+
+    def __init__(self, capacity=4096):
+        self.times = np.zeros((capacity, len(self.STAGES)))
+        self.count = 0
+        self._row = self.times[0]
+        self._last = 0.0
+
+    def start(self):
+        """
+        Inicia a medição de um frame
+        """
+        self._row = self.times[self.count % len(self.times)]
+        self._row[:] = 0.0
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """
+        Encerra o estágio de índice `stage` (em `STAGES`)
+        """
+        now = time.perf_counter()
+        self._row[stage] += now - self._last
+        self._last = now
+
+    def finish(self):
+        """
+        Conclui a medição do frame
+        """
+        self.count += 1
+
+    def recent(self, frames=None):
+        """
+        Retorna as durações dos últimos frames, do mais antigo ao mais recente
+
+        Args:
+            frames (int): Quantidade de frames (padrão: todos os mantidos)
+
+        Returns:
+            numpy.ndarray: Array (frames, estágios) em segundos
+        """
+        capacity = len(self.times)
+        available = min(self.count, capacity)
+        frames = available if frames is None else min(frames, available)
+        end = self.count % capacity
+        indices = np.arange(end - frames, end) % capacity
+        return self.times[indices]
+
+    def percentiles(self, q=(50, 95, 99), frames=None):
+        """
+        Percentis de latência por estágio e do total, em milissegundos
+
+        Args:
+            q: Percentis desejados
+            frames (int): Considera apenas os últimos N frames
+
+        Returns:
+            dict: estágio -> lista de percentis (inclui "total")
+        """
+        times = self.recent(frames)
+        if len(times) == 0:
+            return {}
+        result = {
+            stage: (np.percentile(times[:, i], q) * 1000.0).tolist()
+            for i, stage in enumerate(self.STAGES)
+        }
+        result["total"] = (np.percentile(times.sum(axis=1), q) * 1000.0).tolist()
+        return result
+
+
+class CascadeFaceDetector:
+    """
+    Detector facial por cascata do OpenCV (Haar ou LBP)
+
+    Todos os backends de detecção facial expõem `detect(gray)`, que recebe o
+    frame em escala de cinza equalizado e retorna os retângulos (x, y, w, h).
+
+    Args:
+        path (str): Arquivo XML da cascata
+        scale_factor (float): Fator entre escalas da busca
+        min_neighbors (int): Vizinhos mínimos para aceitar uma detecção
+        min_size (tuple): Tamanho mínimo da face em pixels
+
+    Raises:
+        IOError: Se o OpenCV não tem cascatas ou o arquivo não carrega
+    """
+
+    def __init__(self, path, scale_factor=1.1, min_neighbors=5, min_size=(100, 100)):
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise IOError("OpenCV sem suporte a cascatas (CascadeClassifier)")
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise IOError(f"Não foi possível carregar a cascata: {path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, gray):
+        return self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size,
+        )
+
+
+class HogFaceDetector:
+    """
+    Detector facial HOG + SVM linear do dlib
+
+    Args:
+        upsample (int): Vezes que a imagem é ampliada antes da busca
+        min_size (tuple): Tamanho mínimo da face em pixels
+    """
+
+    def __init__(self, upsample=0, min_size=(100, 100)):
+        self.detector = dlib.get_frontal_face_detector()
+        self.upsample = upsample
+        self.min_size = min_size
+
+    def detect(self, gray):
+        min_w, min_h = self.min_size
+        faces = [
+            (max(r.left(), 0), max(r.top(), 0), r.width(), r.height())
+            for r in self.detector(gray, self.upsample)
+            if r.width() >= min_w and r.height() >= min_h
+        ]
+        return np.array(faces, dtype=np.int32).reshape(-1, 4)
+
+
+class DnnFaceDetector:
+    """
+    Detector facial SSD (ResNet-10, Caffe) executado pelo módulo DNN do OpenCV
+
+    Os arquivos do modelo devem estar em `model_dir`:
+        - deploy.prototxt
+        - res10_300x300_ssd_iter_140000.caffemodel
+
+    Args:
+        model_dir (str): Diretório do modelo
+        confidence (float): Confiança mínima de uma detecção
+        min_size (tuple): Tamanho mínimo da face em pixels
+        input_size (tuple): Resolução de entrada da rede
+
+    Raises:
+        IOError: Se os arquivos do modelo não existem
+    """
+
+    CONFIG = "deploy.prototxt"
+    MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
+
+    def __init__(self, model_dir="models", confidence=0.6, min_size=(100, 100), input_size=(300, 300)):
+        config = os.path.join(model_dir, self.CONFIG)
+        model = os.path.join(model_dir, self.MODEL)
+        for path in (config, model):
+            if not os.path.exists(path):
+                raise IOError(f"Modelo DNN não encontrado: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(config, model)
+        self.confidence = confidence
+        self.min_size = min_size
+        self.input_size = input_size
+
+    def detect(self, gray):
+        height, width = gray.shape[:2]
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR) if gray.ndim == 2 else gray
+        blob = cv2.dnn.blobFromImage(image, 1.0, self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.confidence]
+
+        boxes = np.clip(detections[:, 3:7], 0.0, 1.0) * (width, height, width, height)
+        boxes = boxes.astype(np.int32)
+        boxes[:, 2:] -= boxes[:, :2]
+        min_w, min_h = self.min_size
+        return boxes[(boxes[:, 2] >= min_w) & (boxes[:, 3] >= min_h)]
+
+
+FACE_DETECTOR_BACKENDS = ("haar", "lbp", "hog", "dnn")
+
+
+def create_face_detector(name, model_dir="models"):
+    """
+    Cria um backend de detecção facial pelo nome
+
+    Args:
+        name (str): "haar", "lbp", "hog" ou "dnn"
+        model_dir (str): Diretório de modelos locais (cascata LBP e rede DNN)
+
+    Returns:
+        Detector com o método `detect(gray)`
+
+    Raises:
+        IOError: Se o backend não está disponível nesta instalação
+        ValueError: Se o nome é desconhecido
+    """
+    cascades = getattr(getattr(cv2, "data", None), "haarcascades", "")
+    if name == "haar":
+        return CascadeFaceDetector(cascades + "haarcascade_frontalface_default.xml")
+    if name == "lbp":
+        # O pacote pip do OpenCV traz apenas as cascatas Haar; a LBP é procurada
+        # no diretório de modelos e ao lado das cascatas Haar
+        filename = "lbpcascade_frontalface_improved.xml"
+        candidates = [
+            os.path.join(model_dir, filename),
+            os.path.join(os.path.dirname(os.path.normpath(cascades)), "lbpcascades", filename),
+        ]
+        for path in candidates:
+            if os.path.exists(path):
+                return CascadeFaceDetector(path)
+        raise IOError(f"Cascata LBP não encontrada: {candidates[0]}")
+    if name == "hog":
+        return HogFaceDetector()
+    if name == "dnn":
+        return DnnFaceDetector(model_dir)
+    raise ValueError(f"Detector facial desconhecido: {name}")
+
+
+def _box_iou(a, b):
+    """
+    Interseção sobre união de dois retângulos (x, y, w, h)
+    """
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class FaceDetectorSelector:
+    """
+    Seleção automática do backend de detecção facial por benchmark
+
+    Mede cada backend disponível nos frames de amostra e compara suas caixas
+    com caixas de referência: rótulos fornecidos pelo usuário ou, sem eles,
+    a maior face de cada frame segundo o backend mais preciso disponível
+    (`REFERENCE_ORDER`). Cada frame conta no máximo uma face: acerto se
+    alguma caixa cobre a referência com IoU de ao menos `min_iou`, falso
+    positivo se há caixa que não cobre referência alguma. Escolhe o backend
+    mais rápido com taxa de acerto de ao menos `min_detection_rate` e taxa
+    de falsos positivos de no máximo `max_false_positive_rate` (pisos
+    absolutos). A escolha é guardada em cache por máquina (CPU, hostname e
+    versões de OpenCV/dlib), e execuções seguintes reutilizam o resultado
+    sem novo benchmark.
+
+    Args:
+        cache_path (str): Arquivo JSON do cache
+        model_dir (str): Diretório de modelos locais
+        min_detection_rate (float): Fração mínima dos frames com face de
+            referência em que o backend encontra essa face
+        max_false_positive_rate (float): Fração máxima de frames com caixa
+            que não corresponde à referência
+        min_iou (float): IoU mínimo para uma caixa cobrir a referência
+            (backends diferentes usam margens diferentes em volta da face)
+        backends: Backends avaliados (padrão: todos)
+
+    Exemplo:
+        >>> selector = FaceDetectorSelector()
+        >>> name = selector.cached() or selector.select(amostras)
+        >>> detector = FatigueDetector(face_detector=create_face_detector(name))
+    """
+
+    # Backends do mais ao menos preciso; o primeiro disponível fornece as
+    # caixas de referência quando não há amostras rotuladas
+    REFERENCE_ORDER = ("dnn", "hog", "lbp", "haar")
+
+    def __init__(
+        self,
+        cache_path=os.path.join("~", ".cache", "fatigue-sensor", "face_detector.json"),
+        model_dir="models",
+        min_detection_rate=0.9,
+        max_false_positive_rate=0.05,
+        min_iou=0.4,
+        backends=FACE_DETECTOR_BACKENDS,
+    ):
+        self.cache_path = os.path.expanduser(cache_path)
+        self.model_dir = model_dir
+        self.min_detection_rate = min_detection_rate
+        self.max_false_positive_rate = max_false_positive_rate
+        self.min_iou = min_iou
+        self.backends = backends
+        self.results = {}
+        self.reference = None
+
+    @staticmethod
+    def machine_id():
+        """
+        Identificador da máquina e das bibliotecas que afetam o desempenho
+        """
+        return "|".join(
+            [
+                platform.node(),
+                platform.machine(),
+                platform.processor(),
+                str(os.cpu_count()),
+                f"opencv-{cv2.__version__}",
+                f"dlib-{getattr(dlib, '__version__', '?')}",
+            ]
+        )
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def cached(self):
+        """
+        Backend escolhido anteriormente nesta máquina, ou None
+        """
+        entry = self._load_cache().get(self.machine_id())
+        return entry["backend"] if entry else None
+
+    def _score(self, found, reference):
+        """
+        Taxas de acerto e de falsos positivos de um backend
+
+        Args:
+            found: Por frame, caixas (x, y, w, h) encontradas pelo backend
+            reference: Por frame, caixa de referência ou None (sem face)
+
+        Returns:
+            dict: {"detection_rate": acertos / frames com face de referência,
+                   "false_positive_rate": frames com caixa espúria / frames}
+        """
+        faces = hits = false_positives = 0
+        for boxes, expected in zip(found, reference):
+            if expected is None:
+                false_positives += len(boxes) > 0
+                continue
+            faces += 1
+            overlaps = [_box_iou(box, expected) for box in boxes]
+            # No máximo uma face (e um falso positivo) por frame
+            hits += any(iou >= self.min_iou for iou in overlaps)
+            false_positives += any(iou < self.min_iou for iou in overlaps)
+        return {
+            "detection_rate": hits / faces if faces else 0.0,
+            "false_positive_rate": false_positives / len(found) if found else 0.0,
+        }
+
+    def benchmark(self, frames, reference=None):
+        """
+        Mede os backends disponíveis nos frames de amostra
+
+        Args:
+            frames: Frames BGR ou em escala de cinza (com o motorista em cena)
+            reference: Caixa (x, y, w, h) rotulada do motorista em cada frame,
+                ou None no frame sem face; sem rótulos, usa o backend mais
+                preciso disponível (`REFERENCE_ORDER`)
+
+        Returns:
+            dict: backend -> {"ms": tempo médio por frame,
+                              "detection_rate": fração das faces de referência
+                              encontradas,
+                              "false_positive_rate": fração de frames com
+                              caixa espúria}
+        """
+        grays = [
+            cv2.equalizeHist(
+                frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            )
+            for frame in frames
+        ]
+        self.results = {}
+        found = {}
+        for name in self.backends:
+            try:
+                detector = create_face_detector(name, self.model_dir)
+            except (IOError, cv2.error) as e:
+                print(f"⚠ Detector '{name}' indisponível: {e}")
+                continue
+
+            detector.detect(grays[0])  # aquecimento
+            boxes = []
+            start = time.perf_counter()
+            for gray in grays:
+                boxes.append(detector.detect(gray))
+            elapsed = time.perf_counter() - start
+            found[name] = [[tuple(int(v) for v in box) for box in b] for b in boxes]
+            self.results[name] = {"ms": elapsed * 1000.0 / len(grays)}
+
+        if reference is not None:
+            self.reference = "rótulos"
+        else:
+            self.reference = next((n for n in self.REFERENCE_ORDER if n in found), None)
+            # A maior face do frame é a do motorista
+            reference = [
+                max(boxes, key=lambda box: box[2] * box[3]) if boxes else None
+                for boxes in found.get(self.reference, [[]] * len(grays))
+            ]
+        for name, boxes in found.items():
+            self.results[name].update(self._score(boxes, reference))
+        return self.results
+
+    def select(self, frames, reference=None):
+        """
+        Executa o benchmark, escolhe o backend e grava a escolha no cache
+
+        Args:
+            frames: Frames de amostra (ver `benchmark`)
+            reference: Caixas rotuladas opcionais (ver `benchmark`)
+
+        Returns:
+            str: Nome do backend escolhido, ou None se não há face de
+                 referência nas amostras ou nenhum backend atinge os pisos
+        """
+        results = self.benchmark(frames, reference)
+        eligible = [
+            name
+            for name, r in results.items()
+            if r["detection_rate"] >= self.min_detection_rate
+            and r["false_positive_rate"] <= self.max_false_positive_rate
+        ]
+        if not eligible:
+            return None
+        choice = min(eligible, key=lambda name: results[name]["ms"])
+
+        cache = self._load_cache()
+        cache[self.machine_id()] = {
+            "backend": choice,
+            "reference": self.reference,
+            "results": results,
+            "frames": len(frames),
+            "min_detection_rate": self.min_detection_rate,
+            "max_false_positive_rate": self.max_false_positive_rate,
+            "min_iou": self.min_iou,
+        }
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+        return choice
+
+    def summary(self):
+        """
+        Resultados do último benchmark, do backend mais rápido ao mais lento
+        """
+        lines = [f"  referência: {self.reference or 'nenhuma'}"]
+        for name, result in sorted(self.results.items(), key=lambda item: item[1]["ms"]):
+            lines.append(
+                f"  {name:<5} {result['ms']:8.1f} ms/frame  "
+                f"acerto {result['detection_rate']:.0%}  "
+                f"falsos positivos {result['false_positive_rate']:.0%}"
+            )
+        return "\n".join(lines)
+
+
+def sample_frames(source, count=60):
+    """
+    Lê frames de amostra de uma câmera, vídeo ou FrameStore
+
+    Args:
+        source: Índice da câmera, caminho de vídeo ou diretório de FrameStore
+        count (int): Número de frames (espaçados ao longo de gravações)
+
+    Returns:
+        list: Frames lidos (pode ter menos que `count`)
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        store = FrameStore(source)
+        step = max(1, len(store) // count)
+        return [np.array(store[i]) for i in range(0, len(store), step)][:count]
+
+    cap = cv2.VideoCapture(source)
+    frames = []
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if not isinstance(source, int) else 0
+    step = max(1, total // count) if total > 0 else 1
+    while len(frames) < count:
+        if step > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, len(frames) * step)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _synthetic_face_template():
+    """
+    Modelo neutro dos 68 marcos do dlib em coordenadas normalizadas da face
+    (0..1 em x e y dentro do retângulo da face), sem olhos nem boca, que são
+    gerados a cada frame conforme a abertura desejada
+    """
+    points = np.zeros((68, 2))
+
+    # Contorno do rosto (0-16), de orelha a orelha passando pelo queixo
+    t = np.linspace(0, np.pi, 17)
+    points[0:17] = np.column_stack((0.5 - 0.45 * np.cos(t), 0.3 + 0.62 * np.sin(t)))
+
+    # Sobrancelhas (17-21 e 22-26)
+    arc = 0.04 * np.sin(np.linspace(0, np.pi, 5))
+    points[17:22] = np.column_stack((np.linspace(0.15, 0.42, 5), 0.28 - arc))
+    points[22:27] = np.column_stack((np.linspace(0.58, 0.85, 5), 0.28 - arc))
+
+    # Nariz: ponte (27-30) e base (31-35)
+    points[27:31] = np.column_stack((np.full(4, 0.5), np.linspace(0.35, 0.55, 4)))
+    points[31:36] = np.column_stack(
+        (np.linspace(0.42, 0.58, 5), [0.60, 0.61, 0.62, 0.61, 0.60])
+    )
+    return points
+
+
+class SyntheticLandmarkStream:
+    """
+    Stream sintético e determinístico de 68 marcos faciais, para testes de
+    carga e de corretude sem câmera nem rosto real
+
+    A abertura dos olhos (EAR) e da boca (MAR) segue um roteiro de eventos:
+        - "blink": piscada rápida (padrão 0.2 s)
+        - "closure": olhos fechados por um período longo (padrão 1.5 s)
+        - "yawn": bocejo (padrão 4 s)
+        - "absent": face fora do quadro (padrão 2 s)
+
+    Sem roteiro explícito, piscadas são sorteadas (processo de Poisson com
+    `blink_rate` por minuto). Os marcos recebem ruído gaussiano de `noise`
+    pixels e, opcionalmente, movimento de cabeça de `motion` pixels. Cada
+    frame é gerado de forma independente a partir de (seed, índice), então o
+    acesso aleatório é reprodutível.
+
+    Os frames renderizados (`render`) carregam o índice do frame codificado
+    nos primeiros pixels da imagem, o que permite que `SyntheticFaceDetector`
+    e `SyntheticShapePredictor` substituam os modelos reais no pipeline
+    completo (`FatigueDetector(face_detector=..., predictor=...)`).
+
+    Args:
+        duration (float): Duração do stream em segundos
+        fps (float): Taxa de frames
+        seed (int): Semente do gerador
+        noise (float): Desvio-padrão do ruído dos marcos, em pixels
+        blink_rate (float): Piscadas sorteadas por minuto (se `events` é None)
+        face_box (tuple): Retângulo (x, y, w, h) da face em repouso
+        motion (float): Amplitude do movimento de cabeça, em pixels
+        events: Roteiro como lista de (tipo, início, duração ou None)
+        frame_size (tuple): (largura, altura) dos frames renderizados
+
+    Exemplo:
+        >>> stream = SyntheticLandmarkStream(duration=60, events=[
+        ...     ("closure", 10.0, 2.0), ("yawn", 30.0, None)])
+        >>> detector = FatigueDetector(
+        ...     clock=StreamClock(),
+        ...     face_detector=SyntheticFaceDetector(stream),
+        ...     predictor=SyntheticShapePredictor(stream))
+        >>> log = detector.analyze_offline(stream)
+    """
+
+    EAR_OPEN = 0.30
+    EAR_CLOSED = 0.05
+    MAR_CLOSED = 0.35
+    MAR_YAWN = 0.95
+    DEFAULT_DURATIONS = {"blink": 0.2, "closure": 1.5, "yawn": 4.0, "absent": 2.0}
+    RAMPS = {"closure": 0.1, "yawn": 0.8}
+
+    # Índice do frame codificado nos pixels: 32 células de 4x4 na 1ª linha
+    INDEX_BITS = 32
+    INDEX_CELL = 4
+
+    _template = None
+
+    def __init__(
+        self,
+        duration=60.0,
+        fps=30.0,
+        seed=0,
+        noise=0.5,
+        blink_rate=15.0,
+        face_box=(440, 160, 400, 400),
+        motion=0.0,
+        events=None,
+        frame_size=(1280, 720),
+    ):
+        self.duration = duration
+        self.fps = fps
+        self.seed = seed
+        self.noise = noise
+        self.face_box = face_box
+        self.motion = motion
+        self.frame_size = frame_size
+        self.events = []
+        self._starts = []
+        self._max_duration = 0.0
+
+        if SyntheticLandmarkStream._template is None:
+            SyntheticLandmarkStream._template = _synthetic_face_template()
+
+        if events is None:
+            rng = np.random.default_rng(seed)
+            t = rng.exponential(60.0 / blink_rate) if blink_rate > 0 else duration
+            while t < duration:
+                self.add_event("blink", t, rng.uniform(0.1, 0.3))
+                t += rng.exponential(60.0 / blink_rate)
+        else:
+            for kind, start, length in events:
+                self.add_event(kind, start, length)
+
+    def add_event(self, kind, start, duration=None):
+        """
+        Acrescenta um evento ao roteiro
+
+        Args:
+            kind (str): "blink", "closure", "yawn" ou "absent"
+            start (float): Início em segundos
+            duration (float): Duração em segundos (padrão por tipo)
+
+        Returns:
+            SyntheticLandmarkStream: O próprio stream (permite encadear)
+        """
+        if kind not in self.DEFAULT_DURATIONS:
+            raise ValueError(f"Evento sintético desconhecido: {kind}")
+        if duration is None:
+            duration = self.DEFAULT_DURATIONS[kind]
+
+        position = bisect.bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self.events.insert(position, (kind, start, duration))
+        self._max_duration = max(self._max_duration, duration)
+        return self
+
+    def count(self, kind):
+        """
+        Número de eventos de um tipo no roteiro
+        """
+        return sum(1 for event in self.events if event[0] == kind)
+
+    def __len__(self):
+        return int(round(self.duration * self.fps))
+
+    def __getitem__(self, index):
+        """
+        Frame renderizado de índice `index` (permite `analyze_offline(stream)`)
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.render(index)
+
+    @property
+    def timestamps(self):
+        """
+        Timestamp de cada frame em segundos
+        """
+        return np.arange(len(self)) / self.fps
+
+    def _active_events(self, t):
+        end = bisect.bisect_right(self._starts, t)
+        begin = bisect.bisect_left(self._starts, t - self._max_duration)
+        for kind, start, duration in self.events[begin:end]:
+            if t < start + duration:
+                yield kind, start, duration
+
+    def _envelope(self, kind, start, duration, t):
+        # 0 fora do evento, 1 no platô, cosseno elevado nas rampas
+        ramp = min(self.RAMPS.get(kind, duration / 2.0), duration / 2.0)
+        elapsed = t - start
+        remaining = start + duration - t
+        edge = min(elapsed, remaining)
+        if edge >= ramp:
+            return 1.0
+        return 0.5 - 0.5 * np.cos(np.pi * edge / ramp)
+
+    def metrics_at(self, t):
+        """
+        Valores verdadeiros de EAR, MAR e presença da face no instante `t`
+
+        Returns:
+            tuple: (ear, mar, face_visível)
+        """
+        closed = 0.0
+        yawn = 0.0
+        visible = True
+        for kind, start, duration in self._active_events(t):
+            level = self._envelope(kind, start, duration, t)
+            if kind == "yawn":
+                yawn = max(yawn, level)
+            elif kind == "absent":
+                visible = False
+            else:
+                closed = max(closed, level)
+
+        ear = self.EAR_OPEN - (self.EAR_OPEN - self.EAR_CLOSED) * closed
+        mar = self.MAR_CLOSED + (self.MAR_YAWN - self.MAR_CLOSED) * yawn
+        return ear, mar, visible
+
+    def face_box_at(self, index):
+        """
+        Retângulo (x, y, w, h) da face no frame `index`, ou None se ausente
+        """
+        if not self.metrics_at(index / self.fps)[2]:
+            return None
+        x, y, w, h = self.face_box
+        if self.motion > 0:
+            t = index / self.fps
+            x += int(round(self.motion * np.sin(2 * np.pi * 0.10 * t)))
+            y += int(round(0.5 * self.motion * np.sin(2 * np.pi * 0.07 * t)))
+        return (x, y, w, h)
+
+    def landmarks(self, index):
+        """
+        Marcos faciais do frame `index`
+
+        Returns:
+            numpy.ndarray: Array 68x2 de inteiros, como `extract_face_landmarks`,
+                           ou None se a face está ausente
+        """
+        ear, mar, visible = self.metrics_at(index / self.fps)
+        if not visible:
+            return None
+
+        points = self._template.copy()
+
+        # Olhos (36-41 e 42-47): EAR = abertura / largura
+        width = 0.14
+        for first, cx in ((36, 0.32), (42, 0.68)):
+            half = ear * width / 2.0
+            points[first : first + 6] = [
+                (cx - width / 2, 0.40),
+                (cx - width / 6, 0.40 - half),
+                (cx + width / 6, 0.40 - half),
+                (cx + width / 2, 0.40),
+                (cx + width / 6, 0.40 + half),
+                (cx - width / 6, 0.40 + half),
+            ]
+
+        # Boca externa (48-59) e interna (60-67): MAR = abertura / largura
+        width = 0.30
+        cx, cy = 0.5, 0.74
+        half = mar * width / 2.0
+        inner = max(half - 0.03, 0.0)
+        points[48:68] = [
+            (cx - width / 2, cy),
+            (cx - width / 3, cy - 0.8 * half),
+            (cx - width / 6, cy - half),
+            (cx, cy - 0.95 * half),
+            (cx + width / 6, cy - half),
+            (cx + width / 3, cy - 0.8 * half),
+            (cx + width / 2, cy),
+            (cx + width / 3, cy + 0.8 * half),
+            (cx + width / 6, cy + half),
+            (cx, cy + half),
+            (cx - width / 6, cy + half),
+            (cx - width / 3, cy + 0.8 * half),
+            (cx - 0.4 * width, cy),
+            (cx - width / 6, cy - inner),
+            (cx, cy - inner),
+            (cx + width / 6, cy - inner),
+            (cx + 0.4 * width, cy),
+            (cx + width / 6, cy + inner),
+            (cx, cy + inner),
+            (cx - width / 6, cy + inner),
+        ]
+
+        x, y, w, h = self.face_box_at(index)
+        points = points * (w, h) + (x, y)
+        if self.noise > 0:
+            rng = np.random.default_rng([self.seed, index])
+            points += rng.normal(0.0, self.noise, points.shape)
+        return np.rint(points).astype(int)
+
+    def metrics(self, index):
+        """
+        EAR e MAR verdadeiros (sem ruído) do frame `index`
+
+        Returns:
+            tuple: (ear_esquerdo, ear_direito, mar), no formato de
+                   `FatigueDetector.calculate_face_metrics`
+        """
+        ear, mar, _ = self.metrics_at(index / self.fps)
+        return ear, ear, mar
+
+    def __iter__(self):
+        """
+        Itera sobre (timestamp, retângulo da face, marcos) de cada frame
+        """
+        for index in range(len(self)):
+            yield index / self.fps, self.face_box_at(index), self.landmarks(index)
+
+    def render(self, index, detailed=True):
+        """
+        Renderiza o frame `index` como imagem BGR
+
+        Args:
+            index (int): Índice do frame
+            detailed (bool): Se False, gera apenas fundo e índice codificado
+                             (mais rápido; suficiente para os substitutos)
+
+        Returns:
+            numpy.ndarray: Frame BGR (altura, largura, 3)
+        """
+        width, height = self.frame_size
+        frame = np.full((height, width, 3), 96, dtype=np.uint8)
+
+        landmarks = self.landmarks(index) if detailed else None
+        if landmarks is not None:
+            x, y, w, h = self.face_box_at(index)
+            center = (x + w // 2, y + h // 2)
+            cv2.ellipse(frame, center, (w // 2, h // 2), 0, 0, 360, (150, 180, 210), -1)
+            cv2.polylines(frame, [landmarks[17:22], landmarks[22:27]], False, (60, 60, 60), 3)
+            cv2.polylines(frame, [landmarks[27:31], landmarks[31:36]], False, (110, 130, 160), 2)
+            cv2.fillPoly(frame, [landmarks[36:42], landmarks[42:48]], (40, 40, 40))
+            cv2.fillPoly(frame, [landmarks[48:60]], (70, 70, 150))
+            cv2.fillPoly(frame, [landmarks[60:68]], (30, 30, 60))
+
+        self.encode_index(frame, index)
+        return frame
+
+    @classmethod
+    def encode_index(cls, frame, index):
+        """
+        Grava o índice do frame em células pretas/brancas no topo da imagem
+        """
+        cell = cls.INDEX_CELL
+        for bit in range(cls.INDEX_BITS):
+            value = 255 if (index >> bit) & 1 else 0
+            frame[:cell, bit * cell : (bit + 1) * cell] = value
+
+    @classmethod
+    def decode_index(cls, image):
+        """
+        Lê o índice gravado por `encode_index` (imagem BGR ou em cinza,
+        inclusive após equalização de histograma)
+        """
+        cell = cls.INDEX_CELL
+        row = image[cell // 2]
+        if row.ndim == 2:
+            row = row[:, 0]
+        samples = row[cell // 2 : cls.INDEX_BITS * cell : cell]
+        return int(np.dot(samples > 127, 1 << np.arange(cls.INDEX_BITS, dtype=np.int64)))
+
+
+class SyntheticFaceDetector:
+    """
+    Substituto do detector facial para frames de `SyntheticLandmarkStream`
+
+    Retorna o retângulo verdadeiro da face do frame (lido do índice codificado
+    na imagem), com a mesma interface dos backends de detecção facial.
+
+    Args:
+        stream (SyntheticLandmarkStream): Stream que gerou os frames
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def detect(self, gray):
+        box = self.stream.face_box_at(self.stream.decode_index(gray))
+        if box is None:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.array([box], dtype=np.int32)
+
+
+class SyntheticShapePredictor:
+    """
+    Substituto do `dlib.shape_predictor` para frames de `SyntheticLandmarkStream`
+
+    Retorna os marcos verdadeiros do frame (lido do índice codificado na
+    imagem), sem carregar o modelo de 100 MB.
+
+    Args:
+        stream (SyntheticLandmarkStream): Stream que gerou os frames
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, image, rect):
+        landmarks = self.stream.landmarks(self.stream.decode_index(image))
+        if landmarks is None:
+            raise ValueError("Frame sintético sem face")
+        points = dlib.points([dlib.point(int(x), int(y)) for x, y in landmarks])
+        return dlib.full_object_detection(rect, points)
 
 
 class FatigueDetector:
@@ -74,13 +3473,22 @@ class FatigueDetector:
         >>> detector.run()  # Inicia o sistema
     """
 
-    def __init__(self):
+    def __init__(self, clock=None, face_detector=None, predictor=None):
         """
         Inicializa o detector de fadiga com todos os parâmetros necessários.
 
         Configura os limiares de detecção, inicializa contadores, histórico de dados,
         detectores faciais e sistema de áudio para alertas.
 
+        Args:
+            clock: Fonte de tempo usada nas taxas e janelas temporais
+                   (padrão: `MonotonicClock`; use `StreamClock` para gravações)
+            face_detector: Backend de detecção facial com `detect(gray)`
+                           (padrão: Haar Cascade; ver `create_face_detector`)
+            predictor: Preditor de marcos compatível com `dlib.shape_predictor`
+                       (padrão: modelo de 68 pontos; dispensa o arquivo do
+                       modelo, ex.: `SyntheticShapePredictor`)
+
         Raises:
             SystemExit: Se não conseguir inicializar os detectores necessários
         """
@@ -99,36 +3507,267 @@ class FatigueDetector:
         # Estado do sistema
         self.fatigue_detected = False
         self.alert_active = False
-
-        # Histórico para análise temporal
-        self.ear_history = deque(maxlen=30)  # Últimos 30 frames
-        self.mar_history = deque(maxlen=30)
+        self.sound_alerts = True  # Desativado na análise offline
+
+        # Registro de análise reutilizado a cada frame e exportação opcional
+        self.analysis = FrameAnalysis()
+        self.analysis_log = None  # FrameAnalysisLog para exportação em lote
+        self.analysis_export_path = None  # Arquivo .npy salvo ao finalizar run()
+        self.result_bus = None  # ResultBus para consumidores locais
+        self.evidence_recorder = None  # EvidenceRecorder para clipes de alerta
+        self.profiler = None  # PipelineProfiler para perfilar o loop
+        self.stage_timer = None  # StageTimer com a latência por estágio
+        self.landmark_archive = None  # LandmarkArchive com marcos por frame
+        self.uplink = None  # FleetUplink com eventos para o backend da frota
+
+        # Face analisada no último frame (None se não houve face com marcos)
+        self.last_face = None  # Retângulo (x, y, w, h)
+        self.last_landmarks = None  # Array 68x2
+        self.last_metrics = None  # (ear_esquerdo, ear_direito, mar)
+
+        # Calibração por motorista (ver start_calibration)
+        self.driver_id = None
+        self.calibrator = None
+        self.profile_cache = None
+        self.frame_index = 0  # Frames processados neste stream
+
+        # Histórico para análise temporal (janelas deslizantes com somas
+        # acumuladas: PERCLOS, média/variância de EAR e ciclo de bocejo)
+        self.HISTORY_WINDOW = 900  # Frames na janela (~30 s a 30 FPS)
+        self.PERCLOS_MIN_FRAMES = 90  # Frames mínimos para usar a janela no score
+        self.PERCLOS_THRESHOLD = 0.15  # PERCLOS indicativo de sonolência
+        self.YAWN_DUTY_THRESHOLD = 0.10  # Fração da janela com boca aberta
+        self.set_history_window(self.HISTORY_WINDOW)
+
+        # Reutilização de buffers pré-alocados no loop de captura
+        self.reuse_buffers = False
+        self._frame_buffer = None
+        self._gray_buffer = None
+        self._equalized_buffer = None
+
+        # Execução paralela (opcional) da extração de marcos entre faces
+        self.landmark_executor = None
+
+        # Serializa o processamento deste stream quando chamado de várias threads
+        self._state_lock = threading.Lock()
+
+        # Alertas sonoros: tom gerado uma vez e no máximo uma thread tocando
+        self.alert_sound = None
+        self._alert_thread = None
+
+        # Erros por frame: contados sempre, impressos só quando a mensagem muda
+        self.error_count = 0
+        self._last_error = None
+
+        # Predição de marcos com passo, extrapolando EAR/MAR entre predições
+        self.LANDMARK_STRIDE = 1  # Prediz marcos a cada N frames (1 = sempre)
+        self.STRIDE_EAR_MARGIN = 0.05  # EAR abaixo de limiar+margem força taxa total
+        self.STRIDE_EAR_DROP_RATE = 0.5  # Queda de EAR (por segundo) que força taxa total
+        self.STRIDE_MAR_MARGIN = 0.10  # MAR acima de limiar-margem força taxa total
+        self.ear_filter = OneEuroFilter(min_cutoff=1.0, beta=0.5)
+        self.mar_filter = OneEuroFilter(min_cutoff=1.0, beta=0.5)
+        self._stride_face = None
+        self._stride_landmarks = None
+        self._stride_metrics = None
+        self._stride_time = None
+        self._frames_since_prediction = 0
+
+        # Gate de movimento: pula detecção e marcos em frames sem mudança
+        self.MOTION_GATE_THRESHOLD = 0  # Diferença máxima (níveis de cinza); 0 = desativado
+        self.MOTION_GATE_MAX_SKIP = 15  # Máximo de frames reaproveitados seguidos
+        self.gate_frames = 0  # Frames avaliados pelo gate
+        self.gate_skipped = 0  # Frames reaproveitados
+        self._gate_consecutive = 0
+        self._gate_thumb = None
+        self._gate_face_thumbs = []
+        self._gate_faces = ()
+        self._gate_metrics = []
 
         # Inicialização dos detectores
-        self.init_detectors()
+        self.init_detectors(face_detector, predictor)
 
         # Inicialização do sistema de som
         self.init_audio()
 
         # Métricas de performance
         self.fps_counter = 0
-        self.start_time = time.time()
+        self.clock = clock if clock is not None else MonotonicClock()
+        self.start_time = self.clock.now()
 
-    def init_detectors(self):
+    def set_clock(self, clock):
         """
-        Inicializa os detectores faciais e de marcos
+        Troca a fonte de tempo e reinicia a contagem das taxas
+
+        Args:
+            clock: `MonotonicClock`, `StreamClock` ou objeto com `now()`/`update()`
+        """
+        self.clock = clock
+        self.start_time = clock.now()
+        self.ear_filter.reset()
+        self.mar_filter.reset()
+
+    def reset_counters(self):
+        """
+        Zera os contadores de piscadas e bocejos e reinicia as taxas
+        """
+        self.blink_counter = 0
+        self.yawn_counter = 0
+        self.start_time = self.clock.now()
+
+    def start_calibration(self, driver_id, profile_cache=None, duration=120.0):
+        """
+        Ativa os limiares calibrados para um motorista
+
+        Se o motorista já tem perfil válido no cache, os limiares salvos são
+        aplicados imediatamente. Caso contrário (sem perfil, ou perfil
+        incompleto ou fora das faixas), inicia a calibração online: os limiares
+        padrão valem até que `duration` segundos com face sejam observados, e
+        então os limiares aprendidos são aplicados e salvos no cache.
+
+        Args:
+            driver_id (str): Identificador do motorista
+            profile_cache (DriverProfileCache): Cache de perfis (padrão: ~/.cache)
+            duration (float): Duração da calibração em segundos
+        """
+        self.driver_id = driver_id
+        self.profile_cache = profile_cache or DriverProfileCache()
+
+        profile = self.profile_cache.load(driver_id)
+        if profile is not None and not DriverCalibrator.valid_profile(profile):
+            print(f"⚠ Aviso: Perfil de '{driver_id}' inválido; recalibrando")
+            profile = None
+        if profile is not None:
+            self.EAR_THRESHOLD = profile["ear_threshold"]
+            self.MAR_THRESHOLD = profile["mar_threshold"]
+            self.calibrator = None
+            print(
+                f"✓ Perfil de '{driver_id}' carregado: EAR {self.EAR_THRESHOLD:.3f}, "
+                f"MAR {self.MAR_THRESHOLD:.3f}"
+            )
+            return
+
+        self.calibrator = DriverCalibrator(duration=duration)
+        print(f"✓ Calibrando limiares de '{driver_id}' ({duration:.0f}s com face)")
+
+    def finish_calibration(self):
         """
+        Aplica e salva os limiares aprendidos pela calibração
+        """
+        profile = self.calibrator.profile()
+        self.EAR_THRESHOLD = profile["ear_threshold"]
+        self.MAR_THRESHOLD = profile["mar_threshold"]
+        self.calibrator = None
         try:
-            # Detector de faces Haar Cascade
-            self.face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            self.profile_cache.save(self.driver_id, profile)
+        except OSError as e:
+            print(f"⚠ Aviso: Não foi possível salvar o perfil: {e}")
+        print(
+            f"✓ Calibração de '{self.driver_id}' concluída: EAR "
+            f"{self.EAR_THRESHOLD:.3f}, MAR {self.MAR_THRESHOLD:.3f}"
+        )
+
+    # Estado que determina a análise dos frames seguintes (ver checkpoint_state)
+    CHECKPOINT_STATE = (
+        "EAR_THRESHOLD",
+        "MAR_THRESHOLD",
+        "eye_frame_counter",
+        "mouth_frame_counter",
+        "blink_counter",
+        "yawn_counter",
+        "fatigue_detected",
+        "alert_active",
+        "analysis",
+        "frame_index",
+        "error_count",
+        "_last_error",
+        "driver_id",
+        "calibrator",
+        "HISTORY_WINDOW",
+        "ear_history",
+        "mar_history",
+        "eye_closed_history",
+        "yawn_history",
+        "ear_filter",
+        "mar_filter",
+        "_stride_face",
+        "_stride_landmarks",
+        "_stride_metrics",
+        "_stride_time",
+        "_frames_since_prediction",
+        "gate_frames",
+        "gate_skipped",
+        "_gate_consecutive",
+        "_gate_thumb",
+        "_gate_face_thumbs",
+        "_gate_faces",
+        "_gate_metrics",
+        "clock",
+        "start_time",
+    )
+
+    def checkpoint_state(self):
+        """
+        Cópia do estado de análise: contadores, janelas, filtros, gate e relógio
+
+        Parâmetros de configuração, detectores e recursos (áudio, barramento,
+        gravador) não fazem parte do estado; o detector restaurado deve ser
+        configurado da mesma forma que o original.
+
+        Returns:
+            dict: Estado serializável com pickle (ver `restore_state`)
+        """
+        with self._state_lock:
+            return pickle.loads(
+                pickle.dumps(
+                    {name: getattr(self, name) for name in self.CHECKPOINT_STATE},
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
             )
 
+    def restore_state(self, state):
+        """
+        Restaura um estado obtido de `checkpoint_state`
+        """
+        with self._state_lock:
+            for name in self.CHECKPOINT_STATE:
+                setattr(self, name, state[name])
+
+    def set_history_window(self, frames):
+        """
+        Define o tamanho das janelas de análise temporal, descartando o histórico
+
+        Args:
+            frames (int): Número de frames em cada janela
+        """
+        self.HISTORY_WINDOW = frames
+        self.ear_history = RollingWindow(frames)
+        self.mar_history = RollingWindow(frames)
+        self.eye_closed_history = RollingWindow(frames)  # 1 = olhos fechados
+        self.yawn_history = RollingWindow(frames)  # 1 = boca acima do limiar
+
+    def init_detectors(self, face_detector=None, predictor=None):
+        """
+        Inicializa os detectores faciais e de marcos
+
+        Args:
+            face_detector: Detector facial já construído (padrão: Haar Cascade)
+            predictor: Preditor de marcos já construído (padrão: modelo dlib)
+        """
+        try:
+            # Detector de faces (padrão: Haar Cascade)
+            if face_detector is not None:
+                self.face_detector = face_detector
+            else:
+                self.face_detector = create_face_detector("haar")
+
             # Preditor de marcos faciais dlib
             # Nota: É necessário baixar o arquivo shape_predictor_68_face_landmarks.dat
-            self.predictor = dlib.shape_predictor(
-                "shape_predictor_68_face_landmarks.dat"
-            )
+            if predictor is not None:
+                self.predictor = predictor
+            else:
+                self.predictor = load_shape_predictor(
+                    "shape_predictor_68_face_landmarks.dat"
+                )
 
             print("✓ Detectores inicializados com sucesso")
 
@@ -234,7 +3873,9 @@ class FatigueDetector:
             face_rect: Retângulo da face detectada
 
         Returns:
-            numpy.array: Array com coordenadas dos marcos faciais
+            numpy.array: Array 68x2 com coordenadas dos marcos faciais. Com o
+                         modelo reduzido de olhos e boca (32 pontos), os pontos
+                         36-67 ficam nas posições usuais e os demais zerados.
         """
         # Converte retângulo OpenCV para formato dlib
         dlib_rect = dlib.rectangle(
@@ -247,13 +3888,124 @@ class FatigueDetector:
         # Predição dos marcos faciais
         landmarks = self.predictor(frame, dlib_rect)
 
-        # Converte para array numpy
+        # Converte para array numpy, no esquema de 68 pontos
+        first = LANDMARK_MODEL_LAYOUTS.get(landmarks.num_parts)
+        if first is None:
+            raise ValueError(f"Modelo de marcos com {landmarks.num_parts} pontos não suportado")
         coords = np.zeros((68, 2), dtype=int)
-        for i in range(68):
-            coords[i] = (landmarks.part(i).x, landmarks.part(i).y)
+        for i in range(landmarks.num_parts):
+            part = landmarks.part(i)
+            coords[first + i] = (part.x, part.y)
 
         return coords
 
+    def calculate_face_metrics(self, landmarks):
+        """
+        Calcula EAR dos dois olhos e MAR a partir dos 68 marcos faciais
+
+        Args:
+            landmarks (numpy.ndarray): Array 68x2 de marcos faciais
+
+        Returns:
+            tuple: (ear_esquerdo, ear_direito, mar)
+        """
+        # Olhos (pontos 36-47) e boca (pontos 48-67)
+        ear_left = self.calculate_ear(landmarks[36:42])
+        ear_right = self.calculate_ear(landmarks[42:48])
+        mar = self.calculate_mar(landmarks[48:68])
+        return ear_left, ear_right, mar
+
+    def landmarks_due(self):
+        """
+        Indica se os marcos devem ser preditos no frame atual (modo de passo)
+
+        Retorna True a cada `LANDMARK_STRIDE` frames e, independentemente do
+        passo, enquanto há indício de piscada ou bocejo: EAR próximo do limiar
+        ou caindo, MAR próximo do limiar, ou contadores de olhos/boca ativos.
+        Assim o início de uma piscada é analisado em taxa total.
+
+        Returns:
+            bool: True se o preditor deve ser executado
+        """
+        if self._stride_metrics is None:
+            return True
+        if self._frames_since_prediction + 1 >= self.LANDMARK_STRIDE:
+            return True
+        if self.eye_frame_counter > 0 or self.mouth_frame_counter > 0:
+            return True
+
+        ear_left, ear_right, mar = self._stride_metrics
+        if (ear_left + ear_right) / 2.0 < self.EAR_THRESHOLD + self.STRIDE_EAR_MARGIN:
+            return True
+        if self.ear_filter.derivative < -self.STRIDE_EAR_DROP_RATE:
+            return True
+        return mar > self.MAR_THRESHOLD - self.STRIDE_MAR_MARGIN
+
+    def reset_landmark_stride(self):
+        """
+        Descarta o estado do modo de passo (ex.: face perdida)
+        """
+        self._stride_face = None
+        self._stride_landmarks = None
+        self._stride_metrics = None
+        self._stride_time = None
+        self._frames_since_prediction = 0
+        self.ear_filter.reset()
+        self.mar_filter.reset()
+
+    def strided_face_metrics(self, gray, face_rect):
+        """
+        Marcos e métricas de uma face no modo de passo (`LANDMARK_STRIDE` > 1)
+
+        Nos frames de predição, executa o preditor, mede EAR/MAR (valores
+        brutos, como em taxa total) e atualiza os filtros One-Euro. Entre
+        predições, reaproveita os últimos marcos reposicionados para a caixa
+        atual da face e extrapola o EAR de cada olho e o MAR medidos na última
+        predição pela derivada filtrada (`ear_filter.derivative`), em vez de
+        manter um valor fixo e atrasado pelo filtro.
+
+        Args:
+            gray: Frame em escala de cinza
+            face_rect: Retângulo (x, y, w, h) da face
+
+        Returns:
+            tuple: (landmarks, ear_esquerdo, ear_direito, mar)
+        """
+        now = self.clock.now()
+        if self.landmarks_due():
+            landmarks = self.extract_face_landmarks(gray, face_rect)
+            ear_left, ear_right, mar = self.calculate_face_metrics(landmarks)
+            self.ear_filter((ear_left + ear_right) / 2.0, now)
+            self.mar_filter(mar, now)
+            self._stride_face = tuple(face_rect)
+            self._stride_landmarks = landmarks
+            self._stride_metrics = (ear_left, ear_right, mar)
+            self._stride_time = now
+            self._frames_since_prediction = 0
+            return landmarks, ear_left, ear_right, mar
+
+        self._frames_since_prediction += 1
+
+        # Reposiciona os últimos marcos na caixa atual (translação + escala)
+        lx, ly, lw, _ = self._stride_face
+        x, y, w, _ = face_rect
+        scale = w / float(lw)
+        landmarks = (
+            (self._stride_landmarks - (lx, ly)) * scale + (x, y)
+        ).astype(int)
+
+        # Extrapolação linear a partir da última predição, por olho
+        elapsed = now - self._stride_time
+        ear_left, ear_right, mar = self._stride_metrics
+        ear_step = self.ear_filter.derivative * elapsed
+        mar_step = self.mar_filter.derivative * elapsed
+        return (
+            landmarks,
+            max(ear_left + ear_step, 0.0),
+            max(ear_right + ear_step, 0.0),
+            max(mar + mar_step, 0.0),
+        )
+
     def analyze_fatigue_indicators(self, ear_left, ear_right, mar):
         """
         Analisa os indicadores de fadiga e determina o estado de alerta.
@@ -264,7 +4016,7 @@ class FatigueDetector:
 
         Processo de Análise:
         1. Calcula EAR médio dos dois olhos
-        2. Atualiza histórico temporal das métricas
+        2. Atualiza as janelas deslizantes (EAR, MAR, olhos fechados, bocejo)
         3. Detecta piscadas com base em frames consecutivos de EAR baixo
         4. Detecta bocejos com base em frames consecutivos de MAR alto
         5. Calcula taxas de piscadas e bocejos por minuto
@@ -276,13 +4028,20 @@ class FatigueDetector:
             mar (float): MAR da boca (0.0-2.0+)
 
         Returns:
-            dict: Dicionário com análise completa contendo:
+            FrameAnalysis: Registro reutilizado do detector (`self.analysis`),
+            preenchido com:
+                - face_detected (bool): True
                 - ear (float): EAR médio dos dois olhos
                 - mar (float): MAR da boca
                 - blink_detected (bool): True se piscada foi detectada neste frame
                 - yawn_detected (bool): True se bocejo foi detectado neste frame
                 - blink_rate (float): Taxa de piscadas por minuto
                 - yawn_frequency (float): Frequência de bocejos por minuto
+                - perclos (float): Fração da janela com olhos fechados (0.0-1.0)
+                - ear_mean (float): EAR médio na janela
+                - ear_variance (float): Variância do EAR na janela
+                - mar_mean (float): MAR médio na janela
+                - yawn_duty_cycle (float): Fração da janela com MAR acima do limiar
                 - fatigue_score (float): Score de fadiga (0.0-1.0)
                 - fatigue_detected (bool): True se fadiga foi detectada (score > 0.6)
 
@@ -293,9 +4052,17 @@ class FatigueDetector:
         # EAR médio
         avg_ear = (ear_left + ear_right) / 2.0
 
-        # Adiciona ao histórico
+        # Calibração online dos limiares do motorista
+        if self.calibrator is not None and self.calibrator.observe(
+            avg_ear, mar, self.clock.now()
+        ):
+            self.finish_calibration()
+
+        # Adiciona ao histórico (atualização O(1) das janelas)
         self.ear_history.append(avg_ear)
         self.mar_history.append(mar)
+        self.eye_closed_history.append(avg_ear < self.EAR_THRESHOLD)
+        self.yawn_history.append(mar > self.MAR_THRESHOLD)
 
         # Análise de piscadas
         blink_detected = False
@@ -311,10 +4078,10 @@ class FatigueDetector:
         yawn_detected = False
         if mar > self.MAR_THRESHOLD:
             self.mouth_frame_counter += 1
-            if self.mouth_frame_counter >= self.MAR_CONSEC_FRAMES:
-                if not yawn_detected:  # Evita contagem múltipla do mesmo bocejo
-                    self.yawn_counter += 1
-                    yawn_detected = True
+            # Conta o bocejo uma única vez, ao atingir o mínimo de frames
+            if self.mouth_frame_counter == self.MAR_CONSEC_FRAMES:
+                self.yawn_counter += 1
+                yawn_detected = True
         else:
             self.mouth_frame_counter = 0
 
@@ -322,27 +4089,43 @@ class FatigueDetector:
         blink_rate = self.calculate_blink_rate()
         yawn_frequency = self.calculate_yawn_frequency()
 
+        # Indicadores da janela deslizante
+        perclos = self.eye_closed_history.mean
+        yawn_duty_cycle = self.yawn_history.mean
+        window_ready = len(self.eye_closed_history) >= self.PERCLOS_MIN_FRAMES
+
         # Determinação de fadiga
         fatigue_score = self.calculate_fatigue_score(
-            avg_ear, mar, blink_rate, yawn_frequency
+            avg_ear,
+            mar,
+            blink_rate,
+            yawn_frequency,
+            perclos=perclos if window_ready else None,
+            yawn_duty_cycle=yawn_duty_cycle if window_ready else None,
         )
 
-        return {
-            "ear": avg_ear,
-            "mar": mar,
-            "blink_detected": blink_detected,
-            "yawn_detected": yawn_detected,
-            "blink_rate": blink_rate,
-            "yawn_frequency": yawn_frequency,
-            "fatigue_score": fatigue_score,
-            "fatigue_detected": fatigue_score > 0.6,
-        }
+        analysis = self.analysis
+        analysis.face_detected = True
+        analysis.ear = avg_ear
+        analysis.mar = mar
+        analysis.blink_detected = blink_detected
+        analysis.yawn_detected = yawn_detected
+        analysis.blink_rate = blink_rate
+        analysis.yawn_frequency = yawn_frequency
+        analysis.perclos = perclos
+        analysis.ear_mean = self.ear_history.mean
+        analysis.ear_variance = self.ear_history.variance
+        analysis.mar_mean = self.mar_history.mean
+        analysis.yawn_duty_cycle = yawn_duty_cycle
+        analysis.fatigue_score = fatigue_score
+        analysis.fatigue_detected = fatigue_score > 0.6
+        return analysis
 
     def calculate_blink_rate(self):
         """
         Calcula a taxa de piscadas por minuto
         """
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = self.clock.now() - self.start_time
         if elapsed_time > 0:
             return (self.blink_counter / elapsed_time) * 60
         return 0
@@ -351,12 +4134,14 @@ class FatigueDetector:
         """
         Calcula a frequência de bocejos por minuto
         """
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = self.clock.now() - self.start_time
         if elapsed_time > 0:
             return (self.yawn_counter / elapsed_time) * 60
         return 0
 
-    def calculate_fatigue_score(self, ear, mar, blink_rate, yawn_frequency):
+    def calculate_fatigue_score(
+        self, ear, mar, blink_rate, yawn_frequency, perclos=None, yawn_duty_cycle=None
+    ):
         """
         Calcula um score de fadiga usando lógica fuzzy simplificada.
 
@@ -365,19 +4150,26 @@ class FatigueDetector:
         para cada indicador baseado em sua importância para detecção de fadiga.
 
         Indicadores e Pesos:
-        - EAR baixo (< 0.20): +0.4 pontos (olhos muito fechados)
-        - EAR médio (< 0.25): +0.2 pontos (olhos parcialmente fechados)
+        - EAR baixo (< 0.8 x EAR_THRESHOLD, 0.20 no padrão): +0.4 pontos
+          (olhos muito fechados)
+        - EAR médio (< EAR_THRESHOLD, 0.25 no padrão): +0.2 pontos
+          (olhos parcialmente fechados)
         - Taxa de piscadas baixa (< 10/min): +0.3 pontos (sonolência)
         - Taxa de piscadas muito baixa (< 15/min): +0.1 pontos
         - Frequência de bocejos alta (> 5/min): +0.4 pontos
         - Frequência de bocejos média (> 2/min): +0.2 pontos
         - Bocejo ativo (MAR > limiar): +0.3 pontos
+        - PERCLOS alto (>= PERCLOS_THRESHOLD): +0.4 pontos
+        - PERCLOS moderado (>= metade do limiar): +0.2 pontos
+        - Ciclo de bocejo alto (>= YAWN_DUTY_THRESHOLD): +0.2 pontos
 
         Args:
             ear (float): Eye Aspect Ratio médio (0.0-1.0)
             mar (float): Mouth Aspect Ratio (0.0-2.0+)
             blink_rate (float): Taxa de piscadas por minuto (0-60+)
             yawn_frequency (float): Frequência de bocejos por minuto (0-20+)
+            perclos (float, opcional): Fração da janela com olhos fechados
+            yawn_duty_cycle (float, opcional): Fração da janela com boca aberta
 
         Returns:
             float: Score de fadiga normalizado entre 0.0 e 1.0:
@@ -391,10 +4183,11 @@ class FatigueDetector:
         """
         score = 0.0
 
-        # Contribuição do EAR (olhos fechados frequentemente)
-        if ear < 0.20:
+        # Contribuição do EAR (olhos fechados frequentemente), relativa ao
+        # limiar para acompanhar a calibração por motorista
+        if ear < self.EAR_THRESHOLD * 0.8:
             score += 0.4
-        elif ear < 0.25:
+        elif ear < self.EAR_THRESHOLD:
             score += 0.2
 
         # Contribuição da taxa de piscadas (muito baixa indica sonolência)
@@ -413,11 +4206,24 @@ class FatigueDetector:
         if mar > self.MAR_THRESHOLD:
             score += 0.3
 
+        # Contribuição do PERCLOS (olhos fechados por boa parte da janela)
+        if perclos is not None:
+            if perclos >= self.PERCLOS_THRESHOLD:
+                score += 0.4
+            elif perclos >= self.PERCLOS_THRESHOLD / 2:
+                score += 0.2
+
+        # Contribuição do ciclo de bocejo (boca aberta por boa parte da janela)
+        if yawn_duty_cycle is not None and yawn_duty_cycle >= self.YAWN_DUTY_THRESHOLD:
+            score += 0.2
+
         return min(score, 1.0)  # Garante que não exceda 1.0
 
     def play_alert_sound(self):
         """
         Reproduz som de alerta
+
+        O tom é gerado na primeira chamada e reutilizado nas seguintes.
         """
         try:
             if not self.alert_sound_loaded:
@@ -426,19 +4232,47 @@ class FatigueDetector:
                 frequency = 800  # Hz
                 sample_rate = 22050
 
-                frames = int(duration * sample_rate)
-                arr = np.zeros((frames, 2))
+                time_points = np.arange(int(duration * sample_rate)) / sample_rate
+                tone = np.sin(frequency * 2 * np.pi * time_points) * 0.3
+                arr = np.column_stack((tone, tone))
 
-                for i in range(frames):
-                    time_point = float(i) / sample_rate
-                    arr[i][0] = np.sin(frequency * 2 * np.pi * time_point) * 0.3
-                    arr[i][1] = arr[i][0]
+                self.alert_sound = pygame.sndarray.make_sound(
+                    (arr * 32767).astype(np.int16)
+                )
+                self.alert_sound_loaded = True
 
-                sound = pygame.sndarray.make_sound((arr * 32767).astype(np.int16))
-                sound.play()
+            self.alert_sound.play()
 
         except Exception as e:
-            print(f"Erro ao reproduzir alerta: {e}")
+            self.report_error(f"Erro ao reproduzir alerta: {e}")
+
+    def start_alert_sound(self):
+        """
+        Toca o alerta em segundo plano, sem empilhar threads se o anterior
+        ainda estiver em andamento
+        """
+        if self._alert_thread is not None and self._alert_thread.is_alive():
+            return
+        self._alert_thread = threading.Thread(
+            target=self.play_alert_sound, name="fatigue-alert", daemon=True
+        )
+        self._alert_thread.start()
+
+    def report_error(self, message):
+        """
+        Registra um erro de processamento
+
+        Em execuções longas, o mesmo erro repetido a cada frame não inunda o
+        terminal: a mensagem é impressa apenas quando difere da anterior, e
+        `error_count` acumula todas as ocorrências.
+
+        Args:
+            message (str): Descrição do erro
+        """
+        self.error_count += 1
+        if message != self._last_error:
+            self._last_error = message
+            print(message)
 
     def draw_ui_elements(self, frame, face_analysis, fps):
         """
@@ -446,22 +4280,21 @@ class FatigueDetector:
 
         Args:
             frame: Frame de vídeo
-            face_analysis: Dicionário com análise facial
+            face_analysis (FrameAnalysis): Análise facial do frame
             fps: Frames por segundo atual
         """
         height, width = frame.shape[:2]
 
-        # Painel de informações
+        # Painel de informações (escurece a região in-place, sem cópia do frame)
         panel_height = 120
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (width, panel_height), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        panel = frame[: panel_height + 1]
+        cv2.convertScaleAbs(panel, dst=panel, alpha=0.3)
 
         # Texto de informações
         info_text = [
             f"FPS: {fps:.1f}",
-            f"EAR: {face_analysis.get('ear', 0):.3f}",
-            f"MAR: {face_analysis.get('mar', 0):.3f}",
+            f"EAR: {face_analysis.ear:.3f}",
+            f"MAR: {face_analysis.mar:.3f}",
             f"Piscadas: {self.blink_counter}",
             f"Bocejos: {self.yawn_counter}",
         ]
@@ -478,7 +4311,7 @@ class FatigueDetector:
             )
 
         # Indicador de fadiga
-        fatigue_score = face_analysis.get("fatigue_score", 0)
+        fatigue_score = face_analysis.fatigue_score
         bar_width = 200
         bar_height = 20
         bar_x = width - bar_width - 20
@@ -519,7 +4352,7 @@ class FatigueDetector:
         )
 
         # Alerta visual
-        if face_analysis.get("fatigue_detected", False):
+        if face_analysis.fatigue_detected:
             cv2.rectangle(frame, (0, 0), (width, height), (0, 0, 255), 8)
             cv2.putText(
                 frame,
@@ -559,57 +4392,134 @@ class FatigueDetector:
         for x, y in mouth:
             cv2.circle(frame, (x, y), 2, (0, 0, 255), -1)
 
-    def process_frame(self, frame):
+    def preprocess_frame(self, frame):
         """
-        Processa um frame completo para detecção de fadiga
+        Converte o frame para escala de cinza equalizada
+
+        Com `reuse_buffers` ativo, `cvtColor` e `equalizeHist` escrevem em
+        destinos pré-alocados, evitando alocações a cada frame. Os buffers são
+        (re)criados apenas quando a resolução do frame muda.
 
         Args:
-            frame: Frame de vídeo
+            frame: Frame de vídeo BGR, ou já em escala de cinza (ex.: frames
+                   de um `FrameStore`), caso em que apenas equaliza
 
         Returns:
-            tuple: (frame_processado, análise_facial)
+            numpy.ndarray: Imagem em escala de cinza equalizada
         """
-        # Converte para escala de cinza
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        is_gray = frame.ndim == 2
 
-        # Equalização de histograma
-        gray = cv2.equalizeHist(gray)
+        if not self.reuse_buffers:
+            # Converte para escala de cinza
+            gray = frame if is_gray else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        # Detecção de faces
-        faces = self.face_cascade.detectMultiScale(
-            gray, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100)
-        )
+            # Equalização de histograma
+            return cv2.equalizeHist(gray)
 
-        face_analysis = {
-            "ear": 0,
-            "mar": 0,
-            "blink_detected": False,
-            "yawn_detected": False,
-            "fatigue_detected": False,
-            "fatigue_score": 0,
-        }
+        shape = frame.shape[:2]
+        if self._gray_buffer is None or self._gray_buffer.shape != shape:
+            self._gray_buffer = np.empty(shape, dtype=np.uint8)
+            self._equalized_buffer = np.empty(shape, dtype=np.uint8)
+
+        if is_gray:
+            cv2.equalizeHist(frame, dst=self._equalized_buffer)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_buffer)
+            cv2.equalizeHist(self._gray_buffer, dst=self._equalized_buffer)
+        return self._equalized_buffer
+
+    def process_frame(self, frame, draw=True, timestamp=None, faces=None, gray=None):
+        """
+        Processa um frame completo para detecção de fadiga
+
+        Args:
+            frame: Frame de vídeo
+            draw (bool): Se False, não desenha face e marcos sobre o frame
+                         (análise offline; permite frames somente leitura)
+            timestamp (float): Instante do frame em segundos (captura ou PTS);
+                               repassado ao relógio do detector. Com um
+                               `MonotonicClock`, que ignoraria o valor, o
+                               detector passa a usar um `StreamClock`
+            faces: Retângulos (x, y, w, h) já detectados para este frame (ex.:
+                   detecção em mosaico de vários streams); dispensa a detecção
+                   facial e o gate de movimento
+            gray: Frame já convertido por `preprocess_frame`, se disponível
+
+        Returns:
+            tuple: (frame_processado, análise_facial), onde a análise é o
+                   registro `FrameAnalysis` reutilizado pelo detector
+
+        Note:
+            É seguro chamar a partir de várias threads: o estado de análise do
+            stream é protegido por um lock, e os frames são analisados um por vez.
+        """
+        with self._state_lock:
+            if timestamp is not None:
+                if isinstance(self.clock, MonotonicClock):
+                    # A fonte informa o tempo (captura ao vivo ou PTS): a
+                    # análise segue os timestamps, não o instante do processamento
+                    self.set_clock(StreamClock(timestamp))
+                self.clock.update(timestamp)
+            return self._process_frame(frame, draw, faces, gray)
+
+    def _process_frame(self, frame, draw=True, faces=None, gray=None):
+        """
+        Implementação de `process_frame`, executada com o lock do stream
+        """
+        # Latência por estágio (opcional): índices de StageTimer.STAGES
+        timer = self.stage_timer
+        if timer is not None:
+            timer.start()
+
+        # Converte para escala de cinza equalizada
+        if gray is None:
+            gray = self.preprocess_frame(frame)
+        if timer is not None:
+            timer.mark(0)
+
+        if faces is not None:
+            # Faces detectadas fora do detector (ex.: mosaico de streams)
+            face_metrics = self.extract_face_metrics(gray, faces)
+            if timer is not None:
+                timer.mark(2)
+
+        # Gate de movimento: um frame sem mudança relevante reaproveita faces e
+        # marcos do último frame processado; a análise temporal segue normalmente
+        elif self.MOTION_GATE_THRESHOLD > 0 and self.frame_unchanged(gray):
+            faces, face_metrics = self._gate_faces, self._gate_metrics
+        else:
+            faces = self.detect_faces(gray)
+            if timer is not None:
+                timer.mark(1)
+            face_metrics = self.extract_face_metrics(gray, faces)
+            if timer is not None:
+                timer.mark(2)
+            if self.MOTION_GATE_THRESHOLD > 0:
+                self.update_motion_gate(gray, faces, face_metrics)
+
+        # Registro reutilizado; permanece com valores padrão se não há face
+        face_analysis = self.analysis
+        face_analysis.reset()
+        face_analysis.timestamp = self.clock.now()
+        self.last_face = self.last_landmarks = self.last_metrics = None
 
         # Processa cada face detectada
-        for x, y, w, h in faces:
+        for (x, y, w, h), metrics in zip(faces, face_metrics):
             # Desenha retângulo da face
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            if draw:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
-            try:
-                # Extrai marcos faciais
-                landmarks = self.extract_face_landmarks(gray, (x, y, w, h))
+            if metrics is None:
+                continue
+            landmarks, ear_left, ear_right, mar = metrics
+            self.last_face = (x, y, w, h)
+            self.last_landmarks = landmarks
+            self.last_metrics = (ear_left, ear_right, mar)
 
+            try:
                 # Desenha marcos faciais
-                self.draw_facial_landmarks(frame, landmarks)
-
-                # Calcula EAR para ambos os olhos
-                left_eye = landmarks[36:42]
-                right_eye = landmarks[42:48]
-                ear_left = self.calculate_ear(left_eye)
-                ear_right = self.calculate_ear(right_eye)
-
-                # Calcula MAR para a boca
-                mouth = landmarks[48:68]
-                mar = self.calculate_mar(mouth)
+                if draw:
+                    self.draw_facial_landmarks(frame, landmarks)
 
                 # Analisa indicadores de fadiga
                 face_analysis = self.analyze_fatigue_indicators(
@@ -617,18 +4527,240 @@ class FatigueDetector:
                 )
 
                 # Ativa alerta se necessário
-                if face_analysis["fatigue_detected"] and not self.alert_active:
+                if face_analysis.fatigue_detected and not self.alert_active:
                     self.alert_active = True
-                    threading.Thread(target=self.play_alert_sound).start()
-                elif not face_analysis["fatigue_detected"]:
+                    if self.sound_alerts:
+                        self.start_alert_sound()
+                    if self.evidence_recorder is not None:
+                        self.evidence_recorder.trigger(face_analysis.timestamp)
+                elif not face_analysis.fatigue_detected:
                     self.alert_active = False
 
             except Exception as e:
-                print(f"Erro ao processar marcos faciais: {e}")
+                self.report_error(f"Erro ao processar marcos faciais: {e}")
+
+        if self.analysis_log is not None:
+            self.analysis_log.append(face_analysis)
+        if self.result_bus is not None:
+            self.result_bus.publish(face_analysis, self.frame_index)
+        if self.uplink is not None:
+            self.uplink.observe(face_analysis, self.alert_active)
+        if self.landmark_archive is not None:
+            self.landmark_archive.append(
+                face_analysis.timestamp,
+                self.last_face,
+                self.last_landmarks,
+                self.last_metrics,
+            )
+        self.frame_index += 1
+
+        if timer is not None:
+            timer.mark(3)
+            timer.finish()
 
         return frame, face_analysis
 
-    def run(self):
+    def detect_faces(self, gray):
+        """
+        Detecta faces no frame em escala de cinza com o backend configurado
+        (`face_detector`: Haar, LBP, HOG, DNN ou substituto)
+
+        Args:
+            gray: Frame em escala de cinza equalizado
+
+        Returns:
+            Sequência de retângulos (x, y, w, h)
+        """
+        return self.face_detector.detect(gray)
+
+    def extract_face_metrics(self, gray, faces):
+        """
+        Extrai marcos e calcula EAR/MAR de cada face detectada
+
+        Args:
+            gray: Frame em escala de cinza equalizado
+            faces: Retângulos (x, y, w, h) das faces
+
+        Returns:
+            list: Por face, tupla (landmarks, ear_esquerdo, ear_direito, mar),
+                  ou None se a extração falhou
+        """
+        # Extração de marcos em paralelo quando há executor e mais de uma face;
+        # a análise continua sequencial, na ordem das faces
+        landmark_jobs = None
+        if self.landmark_executor is not None and len(faces) > 1:
+            landmark_jobs = [
+                self.landmark_executor.submit(
+                    self.extract_face_landmarks, gray, tuple(face)
+                )
+                for face in faces
+            ]
+
+        # O modo de passo acompanha uma única face; com zero ou várias faces
+        # os marcos são preditos em todo frame
+        strided = self.LANDMARK_STRIDE > 1 and len(faces) == 1
+        if not strided and self._stride_metrics is not None:
+            self.reset_landmark_stride()
+
+        results = []
+        for i, face in enumerate(faces):
+            try:
+                if strided:
+                    results.append(self.strided_face_metrics(gray, face))
+                    continue
+
+                if landmark_jobs is not None:
+                    landmarks = landmark_jobs[i].result()
+                else:
+                    landmarks = self.extract_face_landmarks(gray, face)
+                results.append((landmarks, *self.calculate_face_metrics(landmarks)))
+
+            except Exception as e:
+                self.report_error(f"Erro ao processar marcos faciais: {e}")
+                results.append(None)
+
+        return results
+
+    def _gate_thumbnails(self, gray, faces):
+        """
+        Miniaturas usadas pelo gate de movimento
+
+        A redução com INTER_AREA faz de cada pixel a média de um bloco, então a
+        diferença máxima entre miniaturas é sensível a mudanças localizadas
+        (ex.: pálpebras fechando) e pouco sensível a ruído do sensor.
+        """
+        thumb = cv2.resize(gray, (32, 24), interpolation=cv2.INTER_AREA)
+        face_thumbs = [
+            cv2.resize(
+                gray[y : y + h, x : x + w], (16, 16), interpolation=cv2.INTER_AREA
+            )
+            for x, y, w, h in faces
+        ]
+        return thumb, face_thumbs
+
+    def frame_unchanged(self, gray):
+        """
+        Verifica se o frame é igual (ou quase) ao último frame processado
+
+        Compara miniaturas do frame inteiro e das regiões das faces com as do
+        último frame efetivamente processado. Frames duplicados pelo driver da
+        câmera têm diferença zero e são sempre reaproveitados. Após
+        `MOTION_GATE_MAX_SKIP` frames reaproveitados seguidos, o pipeline é
+        executado novamente.
+
+        Args:
+            gray: Frame em escala de cinza equalizado
+
+        Returns:
+            bool: True se as faces e marcos anteriores podem ser reaproveitados
+        """
+        self.gate_frames += 1
+        if (
+            self._gate_thumb is None
+            or self._gate_consecutive >= self.MOTION_GATE_MAX_SKIP
+        ):
+            return False
+
+        thumb, face_thumbs = self._gate_thumbnails(gray, self._gate_faces)
+        threshold = self.MOTION_GATE_THRESHOLD
+        if cv2.absdiff(thumb, self._gate_thumb).max() > threshold:
+            return False
+        for current, previous in zip(face_thumbs, self._gate_face_thumbs):
+            if cv2.absdiff(current, previous).max() > threshold:
+                return False
+
+        self.gate_skipped += 1
+        self._gate_consecutive += 1
+        return True
+
+    def update_motion_gate(self, gray, faces, face_metrics):
+        """
+        Guarda o frame processado como referência do gate de movimento
+
+        Args:
+            gray: Frame em escala de cinza equalizado
+            faces: Faces detectadas no frame
+            face_metrics: Resultado de `extract_face_metrics` para as faces
+        """
+        self._gate_thumb, self._gate_face_thumbs = self._gate_thumbnails(gray, faces)
+        self._gate_faces = faces
+        self._gate_metrics = face_metrics
+        self._gate_consecutive = 0
+
+    @property
+    def gate_skip_rate(self):
+        """
+        Fração dos frames avaliados pelo gate que reaproveitaram resultados
+        """
+        if self.gate_frames == 0:
+            return 0.0
+        return self.gate_skipped / self.gate_frames
+
+    def analyze_offline(self, frames, log=None, timestamps=None, fps=30.0, checkpoint=None):
+        """
+        Analisa uma sequência de frames gravados, sem janela nem alertas sonoros
+
+        O tempo segue os timestamps do stream (`StreamClock`), e não o relógio
+        de parede: a gravação é processada tão rápido quanto a CPU permitir e
+        as taxas temporais saem iguais às de uma execução em tempo real.
+
+        Args:
+            frames: Sequência de frames BGR ou em escala de cinza, por exemplo
+                    um `FrameStore` (lido por índice, sem cópia) ou um
+                    `VideoFrames` (lido em sequência até o fim real do
+                    vídeo, mesmo além de `len()`)
+            log (FrameAnalysisLog): Destino das análises (padrão: novo log)
+            timestamps: PTS de cada frame em segundos (padrão: `frames.timestamps`
+                        se existir, senão índice / fps)
+            fps (float): Taxa usada quando não há timestamps
+            checkpoint (AnalysisCheckpoint): Retoma do último checkpoint e grava
+                                             novos periodicamente (log deve
+                                             começar vazio)
+
+        Returns:
+            FrameAnalysisLog: Análise de cada frame
+        """
+        total = len(frames)
+        if log is None:
+            log = FrameAnalysisLog(capacity=max(total, 1))
+        if timestamps is None:
+            timestamps = getattr(frames, "timestamps", None)
+        if not isinstance(self.clock, StreamClock):
+            self.set_clock(StreamClock())
+        start = checkpoint.resume(self, log, total) if checkpoint is not None else 0
+
+        self.sound_alerts = False
+        if self.profiler is not None:
+            self.profiler.start()
+        # Com `open_ended` (VideoFrames), a contagem é só a do contêiner: a
+        # leitura segue até o fim real do vídeo, que levanta IndexError
+        open_ended = getattr(frames, "open_ended", False)
+        index = start
+        try:
+            while index < total or open_ended:
+                try:
+                    frame = frames[index]
+                except IndexError:
+                    break  # Contagem de frames do contêiner maior que a real
+                timestamp = (
+                    float(timestamps[index]) if timestamps is not None else index / fps
+                )
+                _, analysis = self.process_frame(frame, draw=False, timestamp=timestamp)
+                log.append(analysis)
+                if checkpoint is not None and checkpoint.due(index):
+                    checkpoint.save(self, log, index + 1, total)
+                if self.profiler is not None:
+                    self.profiler.tick()
+                index += 1
+        finally:
+            # Perfil gravado mesmo se a análise for interrompida
+            if self.profiler is not None:
+                self.profiler.stop()
+        if index > total:
+            print(f"⚠ Aviso: {index} frames lidos; o contêiner informava {total}")
+        return log
+
+    def run(self, source=0):
         """
         Executa o sistema de detecção de fadiga em tempo real.
 
@@ -636,6 +4768,11 @@ class FatigueDetector:
         de vídeo. Inicializa a câmera, processa frames continuamente, analisa
         indicadores de fadiga e exibe a interface gráfica com alertas.
 
+        Args:
+            source: Índice da câmera (ao vivo) ou caminho de um arquivo de vídeo.
+                    Com arquivo, o tempo segue o PTS do stream (`StreamClock`)
+                    e o vídeo é processado tão rápido quanto possível.
+
         Fluxo de Execução:
         1. Inicializa captura de vídeo (webcam)
         2. Configura resolução e FPS da câmera
@@ -643,6 +4780,8 @@ class FatigueDetector:
            a. Captura frame da câmera
            b. Espelha horizontalmente (melhor UX)
            c. Processa frame para detecção de fadiga
+              (com `reuse_buffers`, o espelhamento é feito in-place após o
+              processamento, apenas para exibição)
            d. Calcula FPS em tempo real
            e. Desenha interface com métricas
            f. Exibe frame processado
@@ -666,67 +4805,489 @@ class FatigueDetector:
         print("Pressione 'q' para sair, 'r' para resetar contadores")
 
         # Inicializa captura de vídeo
-        cap = cv2.VideoCapture(0)
+        live = isinstance(source, int)
+        cap = cv2.VideoCapture(source)
 
         if not cap.isOpened():
-            print("✗ Erro: Não foi possível acessar a câmera")
+            if live:
+                print("✗ Erro: Não foi possível acessar a câmera")
+            else:
+                print(f"✗ Erro: Não foi possível abrir o vídeo {source}")
             return
 
-        # Configura resolução
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        if live:
+            # Configura resolução
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            cap.set(cv2.CAP_PROP_FPS, 30)
+        if not isinstance(self.clock, StreamClock):
+            # O tempo da análise segue o instante de captura (ao vivo) ou o
+            # PTS dos frames (arquivo)
+            start = time.monotonic() if live else 0.0
+            self.set_clock(StreamClock(start))
 
         print("✓ Sistema iniciado com sucesso!")
-        print("✓ Câmera ativada")
+        print("✓ Câmera ativada" if live else f"✓ Reproduzindo {source}")
 
         # Loop principal
         frame_count = 0
         fps_start_time = time.time()
+        if self.profiler is not None:
+            self.profiler.start()
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("✗ Erro ao capturar frame")
-                break
+        try:
+            while True:
+                if self.reuse_buffers:
+                    # Lê diretamente no buffer pré-alocado (criado na 1ª leitura)
+                    ret, frame = cap.read(self._frame_buffer)
+                    self._frame_buffer = frame
+                else:
+                    ret, frame = cap.read()
+                if not ret:
+                    print("✗ Erro ao capturar frame" if live else "✓ Fim do vídeo")
+                    break
+
+                # Timestamp do frame: instante monotônico da captura (ao vivo) ou
+                # PTS do stream (arquivo)
+                if live:
+                    timestamp = time.monotonic()
+                else:
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+                if not live:
+                    # Gravações não são espelhadas
+                    processed_frame, face_analysis = self.process_frame(
+                        frame, timestamp=timestamp
+                    )
+                elif self.reuse_buffers:
+                    # Processa o frame original; os contornos desenhados acompanham
+                    # o espelhamento in-place feito apenas para exibição
+                    processed_frame, face_analysis = self.process_frame(
+                        frame, timestamp=timestamp
+                    )
+                    cv2.flip(processed_frame, 1, dst=processed_frame)
+                else:
+                    # Espelha horizontalmente para melhor usabilidade
+                    frame = cv2.flip(frame, 1)
+
+                    # Processa frame
+                    processed_frame, face_analysis = self.process_frame(
+                        frame, timestamp=timestamp
+                    )
+
+                # Calcula FPS
+                frame_count += 1
+                if frame_count % 30 == 0:
+                    fps_end_time = time.time()
+                    fps = 30 / (fps_end_time - fps_start_time)
+                    fps_start_time = fps_end_time
+                else:
+                    fps = 30  # Valor padrão
+
+                # Desenha interface
+                self.draw_ui_elements(processed_frame, face_analysis, fps)
+
+                # Guarda o frame no buffer de evidências (clipes de alerta)
+                if self.evidence_recorder is not None:
+                    self.evidence_recorder.push(processed_frame, timestamp)
+
+                # Mostra frame
+                cv2.imshow("Sistema de Detecção de Fadiga", processed_frame)
+
+                # Verifica teclas pressionadas
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord("q"):
+                    break
+                elif key == ord("r"):
+                    # Reset dos contadores
+                    self.reset_counters()
+                    print("✓ Contadores resetados")
+
+                if self.profiler is not None:
+                    self.profiler.tick()
+        finally:
+            # Perfil gravado mesmo se o loop terminar com exceção
+            if self.profiler is not None:
+                self.profiler.stop()
+
+        if self.MOTION_GATE_THRESHOLD > 0:
+            print(f"✓ Frames reaproveitados pelo gate: {self.gate_skip_rate:.1%}")
+
+        if self.analysis_log is not None and self.analysis_export_path:
+            self.analysis_log.save(self.analysis_export_path)
+            print(f"✓ Análises exportadas para {self.analysis_export_path}")
+
+        if self.evidence_recorder is not None:
+            print(
+                f"✓ Buffer de evidências: {self.evidence_recorder.memory_bytes / 1e6:.1f} MB, "
+                f"{self.evidence_recorder.clips_saved} clipe(s) gravado(s)"
+            )
+            if self.evidence_recorder.frames_dropped:
+                print(
+                    f"⚠ Frames fora do buffer de evidências (compressão atrasada): "
+                    f"{self.evidence_recorder.frames_dropped}"
+                )
 
-            # Espelha horizontalmente para melhor usabilidade
-            frame = cv2.flip(frame, 1)
+        # Limpeza
+        if self.evidence_recorder is not None:
+            self.evidence_recorder.close()
+        if self.result_bus is not None:
+            self.result_bus.close()
+            self.result_bus = None
+        cap.release()
+        cv2.destroyAllWindows()
+        pygame.mixer.quit()
+        print("✓ Sistema finalizado")
 
-            # Processa frame
-            processed_frame, face_analysis = self.process_frame(frame)
 
-            # Calcula FPS
-            frame_count += 1
-            if frame_count % 30 == 0:
-                fps_end_time = time.time()
-                fps = 30 / (fps_end_time - fps_start_time)
-                fps_start_time = fps_end_time
-            else:
-                fps = 30  # Valor padrão
+class AsyncFatigueDetector:
+    """
+    Fachada assíncrona do `FatigueDetector` para aplicações asyncio.
+
+    A detecção facial e a predição de marcos rodam em um executor (por padrão
+    uma única thread dedicada), de modo que o event loop não fica bloqueado
+    pelas dezenas de milissegundos de processamento de cada frame. Com uma
+    thread, os frames são analisados estritamente na ordem de envio.
+
+    Recursos:
+        - `await process_frame(frame)`: análise de um frame (awaitable)
+        - `async for analysis in stream(frames)`: iterador assíncrono sobre
+          uma fonte de frames, com pipeline limitado
+        - Backpressure: no máximo `max_pending` frames em processamento; novas
+          chamadas aguardam, e `stream()` deixa de consumir a fonte
+        - Cancelamento: cancelar a tarefa que aguarda um frame descarta o
+          resultado; frames ainda não iniciados nem chegam a ser processados
+
+    Os resultados são cópias (`FrameAnalysis.copy()`), seguras para guardar
+    ou enviar a outras tarefas. Frames com timestamp (tuplas em `stream()`,
+    como as de `camera_frames()`) fazem o detector seguir o instante de
+    captura ou o PTS do vídeo (`StreamClock`), e não o do processamento.
+
+    Args:
+        detector (FatigueDetector): Detector a ser usado (padrão: novo detector)
+        max_pending (int): Máximo de frames em processamento simultâneo
+        executor: Executor para o processamento (padrão: uma thread dedicada)
+
+    Exemplo:
+        >>> async with AsyncFatigueDetector() as detector:
+        ...     async for analysis in detector.stream(camera_frames()):
+        ...         await telemetry.send(analysis.as_dict())
+    """
+
+    def __init__(self, detector=None, max_pending=2, executor=None):
+        self.detector = detector if detector is not None else FatigueDetector()
+        self.max_pending = max_pending
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="fatigue-async"
+        )
+        self._slots = None
+
+    def _analyze(self, frame, timestamp, draw):
+        _, analysis = self.detector.process_frame(
+            frame, draw=draw, timestamp=timestamp
+        )
+        return analysis.copy()
+
+    async def process_frame(self, frame, timestamp=None, draw=False):
+        """
+        Analisa um frame sem bloquear o event loop
+
+        Aguarda enquanto houver `max_pending` frames em processamento.
+
+        Args:
+            frame: Frame de vídeo (não deve ser alterado até o retorno)
+            timestamp (float): Instante do frame em segundos
+            draw (bool): Se True, desenha face e marcos sobre o frame
+
+        Returns:
+            FrameAnalysis: Cópia da análise do frame
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self._analyze, frame, timestamp, draw
+            )
+
+    async def stream(self, frames):
+        """
+        Iterador assíncrono de análises para uma fonte de frames
+
+        Mantém até `max_pending` frames em processamento enquanto consome a
+        fonte; as análises são entregues na ordem dos frames.
+
+        Args:
+            frames: Iterável assíncrono de frames ou de tuplas (frame, timestamp)
+
+        Yields:
+            FrameAnalysis: Análise de cada frame
+        """
+        pending = deque()
+        try:
+            async for item in frames:
+                frame, timestamp = item if isinstance(item, tuple) else (item, None)
+                pending.append(
+                    asyncio.ensure_future(self.process_frame(frame, timestamp))
+                )
+                if len(pending) >= self.max_pending:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def camera_frames(self, source=0):
+        """
+        Fonte assíncrona de frames de uma câmera ou arquivo de vídeo
+
+        A leitura (`cap.read()`) também roda fora do event loop.
+
+        Args:
+            source: Índice da câmera ou caminho do vídeo
+
+        Yields:
+            tuple: (frame, timestamp)
+        """
+        loop = asyncio.get_running_loop()
+        cap = cv2.VideoCapture(source)
+        live = isinstance(source, int)
+        try:
+            while True:
+                ret, frame = await loop.run_in_executor(None, cap.read)
+                if not ret:
+                    break
+                if live:
+                    timestamp = time.monotonic()
+                else:
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                yield frame, timestamp
+        finally:
+            cap.release()
+
+    async def aclose(self):
+        """
+        Aguarda o processamento em andamento e libera o executor próprio
+        """
+        if self._own_executor:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._executor.shutdown, True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+class MultiStreamProcessor:
+    """
+    Processa vários streams de câmera em paralelo dentro de um único processo.
+
+    Cada stream possui seu próprio `FatigueDetector`, de modo que contadores,
+    históricos e alertas permanecem independentes. A cada chamada de
+    `process()`, um frame de cada stream é enviado ao pool de threads e o
+    método só retorna após todos terminarem; assim, um stream nunca tem dois
+    frames em processamento e a ordem temporal de cada um é preservada.
+
+    O dlib e o OpenCV liberam o GIL durante a maior parte do trabalho de
+    detecção e predição de marcos, o que permite usar vários núcleos.
+
+    Modo mosaico (`mosaic_detector`): os frames em cinza de todos os streams
+    são reduzidos por `mosaic_scale` e dispostos lado a lado, separados por
+    faixas neutras (`mosaic_gutter`), e uma única chamada de detecção cobre
+    todos os streams, pagando uma só vez o custo fixo por chamada. Cada
+    retângulo é atribuído ao ladrilho que contém seu centro, recortado aos
+    limites do ladrilho (descartado se menos de `MOSAIC_MIN_OVERLAP` da área
+    estiver dentro dele) e convertido para coordenadas do frame original.
+    Marcos e análise continuam por stream, em paralelo, na resolução original.
+    O `min_size` do detector do mosaico deve considerar a escala (ex.: 50x50
+    com escala 0.5 equivale aos 100x100 do detector padrão).
+
+    Exemplo:
+        >>> detectors = [FatigueDetector() for _ in range(4)]
+        >>> streams = MultiStreamProcessor(detectors)
+        >>> results = streams.process([frame0, frame1, frame2, frame3])
+        >>> streams.shutdown()
+
+        >>> mosaic = HogFaceDetector(min_size=(50, 50))
+        >>> streams = MultiStreamProcessor(detectors, mosaic_detector=mosaic)
+
+    Note:
+        Não reutilize o mesmo pool como `landmark_executor` dos detectores:
+        tarefas de stream aguardando tarefas de marcos no mesmo pool podem
+        esgotar os workers.
+    """
+
+    MOSAIC_MIN_OVERLAP = 0.6  # Fração mínima da face dentro do ladrilho
+
+    def __init__(
+        self,
+        detectors,
+        max_workers=None,
+        mosaic_detector=None,
+        mosaic_scale=0.5,
+        mosaic_gutter=16,
+    ):
+        """
+        Args:
+            detectors (list): Um `FatigueDetector` por stream
+            max_workers (int): Número de threads (padrão: um por stream)
+            mosaic_detector: Backend de detecção facial para o modo mosaico
+                             (padrão: None, cada stream detecta separadamente)
+            mosaic_scale (float): Fator de redução dos frames no mosaico
+            mosaic_gutter (int): Largura em pixels das faixas entre ladrilhos
+        """
+        self.detectors = list(detectors)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(self.detectors),
+            thread_name_prefix="fatigue-stream",
+        )
+        self.mosaic_detector = mosaic_detector
+        self.mosaic_scale = mosaic_scale
+        self.mosaic_gutter = mosaic_gutter
+        self.mosaic = None
+        self._tiles = None
+        self._tile_shapes = None
+
+    def process(self, frames, timestamps=None, draw=True):
+        """
+        Processa um frame de cada stream em paralelo
+
+        Args:
+            frames (list): Frames na mesma ordem de `detectors`
+            timestamps (list): Instante de cada frame em segundos (opcional)
+            draw (bool): Se False, não desenha face e marcos sobre os frames
+
+        Returns:
+            list: Tuplas (frame_processado, análise_facial) por stream; cada
+                  análise é o registro reutilizado do detector do stream
+        """
+        if timestamps is None:
+            timestamps = [None] * len(frames)
+        if self.mosaic_detector is not None:
+            return self._process_mosaic(frames, timestamps, draw)
+
+        jobs = [
+            self.executor.submit(
+                detector.process_frame, frame, draw=draw, timestamp=timestamp
+            )
+            for detector, frame, timestamp in zip(self.detectors, frames, timestamps)
+        ]
+        return [job.result() for job in jobs]
+
+    def _layout(self, shapes):
+        """
+        (Re)cria o mosaico quando as resoluções dos streams mudam
+
+        Os ladrilhos ficam em uma grade de colunas = ceil(sqrt(n)), com células
+        do tamanho do maior frame reduzido; o fundo e as faixas entre ladrilhos
+        têm cinza neutro, sem bordas que formem falsas faces entre streams.
+        """
+        if shapes == self._tile_shapes:
+            return
+        scale = self.mosaic_scale
+        gutter = self.mosaic_gutter
+        sizes = [(max(1, int(h * scale)), max(1, int(w * scale))) for h, w in shapes]
+        cell_h = max(h for h, _ in sizes)
+        cell_w = max(w for _, w in sizes)
+        cols = int(np.ceil(np.sqrt(len(sizes))))
+        rows = int(np.ceil(len(sizes) / cols))
+
+        self.mosaic = np.full(
+            (rows * cell_h + (rows + 1) * gutter, cols * cell_w + (cols + 1) * gutter),
+            128,
+            dtype=np.uint8,
+        )
+        self._tiles = []
+        for i, (h, w) in enumerate(sizes):
+            row, col = divmod(i, cols)
+            x = gutter + col * (cell_w + gutter)
+            y = gutter + row * (cell_h + gutter)
+            self._tiles.append((x, y, w, h))
+        self._tile_shapes = shapes
+
+    def _preprocess_tile(self, index, frame):
+        # Cinza equalizado em resolução original (para os marcos) e reduzido
+        # no ladrilho do stream (para a detecção)
+        gray = self.detectors[index].preprocess_frame(frame)
+        x, y, w, h = self._tiles[index]
+        self.mosaic[y : y + h, x : x + w] = cv2.resize(
+            gray, (w, h), interpolation=cv2.INTER_AREA
+        )
+        return gray
 
-            # Desenha interface
-            self.draw_ui_elements(processed_frame, face_analysis, fps)
+    def map_mosaic_faces(self, boxes, shapes):
+        """
+        Distribui os retângulos detectados no mosaico entre os streams
 
-            # Mostra frame
-            cv2.imshow("Sistema de Detecção de Fadiga", processed_frame)
+        Args:
+            boxes: Retângulos (x, y, w, h) em coordenadas do mosaico
+            shapes: (altura, largura) do frame original de cada stream
 
-            # Verifica teclas pressionadas
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord("q"):
+        Returns:
+            list: Por stream, array (N, 4) de retângulos no frame original
+        """
+        faces = [[] for _ in self._tiles]
+        for bx, by, bw, bh in boxes:
+            cx, cy = bx + bw / 2.0, by + bh / 2.0
+            for index, (x, y, w, h) in enumerate(self._tiles):
+                if not (x <= cx < x + w and y <= cy < y + h):
+                    continue
+                # Recorta ao ladrilho; retângulos que atravessam a faixa entre
+                # streams com pouca área dentro do ladrilho são descartados
+                x0, y0 = max(bx, x), max(by, y)
+                x1, y1 = min(bx + bw, x + w), min(by + bh, y + h)
+                if (x1 - x0) * (y1 - y0) < self.MOSAIC_MIN_OVERLAP * bw * bh:
+                    break
+                frame_h, frame_w = shapes[index]
+                sx, sy = frame_w / w, frame_h / h
+                faces[index].append(
+                    (
+                        int(round((x0 - x) * sx)),
+                        int(round((y0 - y) * sy)),
+                        int(round((x1 - x0) * sx)),
+                        int(round((y1 - y0) * sy)),
+                    )
+                )
                 break
-            elif key == ord("r"):
-                # Reset dos contadores
-                self.blink_counter = 0
-                self.yawn_counter = 0
-                self.start_time = time.time()
-                print("✓ Contadores resetados")
+        return [np.array(f, dtype=np.int32).reshape(-1, 4) for f in faces]
 
-        # Limpeza
-        cap.release()
-        cv2.destroyAllWindows()
-        pygame.mixer.quit()
-        print("✓ Sistema finalizado")
+    def _process_mosaic(self, frames, timestamps, draw):
+        shapes = tuple(frame.shape[:2] for frame in frames)
+        self._layout(shapes)
+
+        # 1. Pré-processamento e redução para o mosaico, em paralelo
+        grays = list(self.executor.map(self._preprocess_tile, range(len(frames)), frames))
+
+        # 2. Uma única detecção para todos os streams
+        boxes = self.mosaic_detector.detect(self.mosaic)
+        faces = self.map_mosaic_faces(boxes, shapes)
+
+        # 3. Marcos e análise por stream, em paralelo
+        jobs = [
+            self.executor.submit(
+                detector.process_frame,
+                frame,
+                draw=draw,
+                timestamp=timestamp,
+                faces=stream_faces,
+                gray=gray,
+            )
+            for detector, frame, timestamp, stream_faces, gray in zip(
+                self.detectors, frames, timestamps, faces, grays
+            )
+        ]
+        return [job.result() for job in jobs]
+
+    def shutdown(self):
+        """
+        Finaliza o pool de threads
+        """
+        self.executor.shutdown(wait=True)
 
 
 def main():
@@ -746,20 +5307,282 @@ def main():
         default=0.65,
         help="Limiar MAR para detecção de bocejo",
     )
+    parser.add_argument(
+        "--driver-id",
+        default=None,
+        help="Calibra os limiares para este motorista (ou usa o perfil salvo)",
+    )
+    parser.add_argument(
+        "--calibration-seconds",
+        type=float,
+        default=120,
+        help="Duração da calibração de um motorista novo, em segundos com face",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Diretório dos perfis de motoristas (padrão: ~/.cache/fatigue-sensor/profiles)",
+    )
+    parser.add_argument(
+        "--perclos-window",
+        type=float,
+        default=30,
+        help="Janela em segundos (a 30 FPS) para PERCLOS e estatísticas de EAR/MAR",
+    )
+    parser.add_argument(
+        "--motion-gate",
+        type=float,
+        default=0,
+        help="Reaproveita faces/marcos se o frame mudou menos que este valor (0 = desativado)",
+    )
+    parser.add_argument(
+        "--landmark-stride",
+        type=int,
+        default=1,
+        help="Prediz marcos a cada N frames, extrapolando EAR/MAR entre predições",
+    )
+    parser.add_argument(
+        "--landmark-model",
+        default=None,
+        metavar="ARQUIVO",
+        help="Modelo de marcos do dlib: 68 pontos ou reduzido de olhos e boca (32 pontos)",
+    )
+    parser.add_argument(
+        "--landmark-workers",
+        type=int,
+        default=0,
+        help="Threads para extrair marcos de várias faces em paralelo (0 = desativado)",
+    )
+    parser.add_argument(
+        "--export-analysis",
+        default=None,
+        help="Salva a análise de cada frame em um arquivo .npy ao finalizar",
+    )
+    parser.add_argument(
+        "--landmark-archive",
+        default=None,
+        metavar="ARQUIVO",
+        help="Grava marcos, face e EAR/MAR de cada frame em um arquivo compacto (.lmk)",
+    )
+    parser.add_argument(
+        "--uplink",
+        default=None,
+        metavar="URL",
+        help="Envia eventos e resumos por minuto ao coletor da frota (ver tools/fleet_collector.py)",
+    )
+    parser.add_argument(
+        "--uplink-spool",
+        default="spool",
+        metavar="DIR",
+        help="Diretório onde os lotes aguardam envio (mantidos sem conexão)",
+    )
+    parser.add_argument(
+        "--device-id",
+        default=None,
+        help="Identificador do sensor nos eventos (padrão: nome da máquina)",
+    )
+    parser.add_argument(
+        "--result-bus",
+        default=None,
+        metavar="NOME",
+        help="Publica cada análise em memória compartilhada (/dev/shm/NOME)",
+    )
+    parser.add_argument(
+        "--evidence-dir",
+        default=None,
+        help="Grava clipes de evidência dos alertas neste diretório",
+    )
+    parser.add_argument(
+        "--evidence-pre",
+        type=float,
+        default=10,
+        help="Segundos de vídeo mantidos antes do alerta",
+    )
+    parser.add_argument(
+        "--evidence-post",
+        type=float,
+        default=5,
+        help="Segundos de vídeo gravados após o alerta",
+    )
+    parser.add_argument(
+        "--evidence-quality",
+        type=int,
+        default=70,
+        help="Qualidade JPEG (0-100) dos frames no buffer de evidências",
+    )
+    parser.add_argument(
+        "--face-detector",
+        choices=FACE_DETECTOR_BACKENDS + ("auto",),
+        default="haar",
+        help="Backend de detecção facial; 'auto' escolhe por benchmark (cache por máquina)",
+    )
+    parser.add_argument(
+        "--face-model-dir",
+        default="models",
+        help="Diretório dos modelos locais de detecção (cascata LBP, rede DNN)",
+    )
+    parser.add_argument(
+        "--face-detector-refresh",
+        action="store_true",
+        help="Com --face-detector auto, refaz o benchmark mesmo com escolha em cache",
+    )
+    parser.add_argument(
+        "--video",
+        default=None,
+        help="Analisa um arquivo de vídeo em vez da câmera (tempo pelo PTS)",
+    )
+    parser.add_argument(
+        "--frame-store",
+        default=None,
+        metavar="DIR",
+        help="Analisa offline os frames de um FrameStore (ver tools/cache_frames.py)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        metavar="FRAMES",
+        help="Com --frame-store, grava checkpoint a cada N frames e retoma dele (0 = desativado)",
+    )
+    parser.add_argument(
+        "--reuse-buffers",
+        action="store_true",
+        help="Reutiliza buffers pré-alocados no loop de captura (memória estável)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=float,
+        default=0,
+        metavar="SEGUNDOS",
+        help="Perfila o loop de detecção durante os primeiros N segundos (0 = desativado)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=("sampling", "cprofile"),
+        default="sampling",
+        help="Profiler por amostragem (baixo overhead) ou cProfile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default="perfil",
+        metavar="PREFIXO",
+        help="Prefixo dos arquivos de perfil (.collapsed/.prof e .txt)",
+    )
 
     args = parser.parse_args()
+    if args.landmark_archive and args.checkpoint_every > 0:
+        parser.error("--landmark-archive não pode ser combinado com --checkpoint-every")
+
+    # Backend de detecção facial (com 'auto', benchmark nas primeiras imagens)
+    backend = args.face_detector
+    if backend == "auto":
+        selector = FaceDetectorSelector(model_dir=args.face_model_dir)
+        backend = None if args.face_detector_refresh else selector.cached()
+        if backend is None:
+            print("Avaliando detectores faciais...")
+            backend = selector.select(sample_frames(args.frame_store or args.video or 0))
+            print(selector.summary())
+        if backend is None:
+            print("⚠ Nenhum detector atingiu os pisos de acerto nas amostras; usando 'haar'")
+            backend = "haar"
+        print(f"✓ Detector facial: {backend}")
+    try:
+        face_detector = create_face_detector(backend, args.face_model_dir)
+    except (IOError, cv2.error) as e:
+        print(f"✗ Detector facial '{backend}' indisponível: {e}")
+        sys.exit(1)
+
+    # Modelo de marcos alternativo (ex.: reduzido de olhos e boca)
+    predictor = None
+    if args.landmark_model:
+        try:
+            predictor = load_shape_predictor(args.landmark_model)
+        except RuntimeError as e:
+            print(f"✗ Não foi possível carregar o modelo de marcos: {e}")
+            sys.exit(1)
 
     # Cria e executa o detector
-    detector = FatigueDetector()
+    detector = FatigueDetector(face_detector=face_detector, predictor=predictor)
     detector.EAR_THRESHOLD = args.ear_threshold
     detector.MAR_THRESHOLD = args.mar_threshold
+    detector.reuse_buffers = args.reuse_buffers
+    detector.LANDMARK_STRIDE = max(1, args.landmark_stride)
+    detector.MOTION_GATE_THRESHOLD = args.motion_gate
+    detector.set_history_window(max(1, int(args.perclos_window * 30)))
+    if args.driver_id:
+        cache = DriverProfileCache(args.profile_dir) if args.profile_dir else None
+        detector.start_calibration(
+            args.driver_id, cache, duration=args.calibration_seconds
+        )
+    if args.evidence_dir:
+        detector.evidence_recorder = EvidenceRecorder(
+            args.evidence_dir,
+            pre_seconds=args.evidence_pre,
+            post_seconds=args.evidence_post,
+            quality=args.evidence_quality,
+        )
+    if args.result_bus:
+        try:
+            detector.result_bus = ResultBus(args.result_bus)
+        except FileExistsError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+    if args.landmark_archive:
+        detector.landmark_archive = LandmarkArchive(args.landmark_archive)
+    if args.uplink:
+        detector.uplink = FleetUplink(
+            args.uplink,
+            spool_dir=args.uplink_spool,
+            device_id=args.device_id,
+            driver_id=args.driver_id,
+        )
+    if args.export_analysis and not args.frame_store:
+        detector.analysis_log = FrameAnalysisLog()
+        detector.analysis_export_path = args.export_analysis
+    if args.profile > 0:
+        detector.profiler = PipelineProfiler(
+            args.profile, args.profile_output, mode=args.profile_mode
+        )
+    if args.landmark_workers > 0:
+        detector.landmark_executor = ThreadPoolExecutor(
+            max_workers=args.landmark_workers, thread_name_prefix="fatigue-landmarks"
+        )
 
     try:
-        detector.run()
+        if args.frame_store:
+            store = FrameStore(args.frame_store)
+            print(f"✓ {len(store)} frames em {args.frame_store}")
+            output = args.export_analysis or "analise.npy"
+            checkpoint = None
+            if args.checkpoint_every > 0:
+                checkpoint = AnalysisCheckpoint(
+                    output + ".ckpt",
+                    every=args.checkpoint_every,
+                    source_id=f"{store.source}:{len(store)}",
+                )
+            log = detector.analyze_offline(store, checkpoint=checkpoint)
+            log.save(output)
+            if checkpoint is not None:
+                checkpoint.remove()
+            print(f"✓ Análises exportadas para {output}")
+        else:
+            detector.run(args.video if args.video else 0)
     except KeyboardInterrupt:
         print("\n✓ Sistema interrompido pelo usuário")
     except Exception as e:
         print(f"✗ Erro crítico: {e}")
+    finally:
+        if detector.landmark_executor is not None:
+            detector.landmark_executor.shutdown(wait=False)
+        if detector.landmark_archive is not None:
+            detector.landmark_archive.close()
+            print(f"✓ Marcos gravados em {args.landmark_archive}")
+        if detector.uplink is not None:
+            pending = detector.uplink.close()
+            print(
+                f"✓ Uplink: {detector.uplink.batches_sent} lotes enviados, "
+                f"{pending} no spool"
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração comum dos testes: importa `main` da raiz do repositório e
+desativa a saída de áudio do pygame (execução sem placa de som)
+"""
+
+import os
+import sys
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Testes de retomada do `AnalysisCheckpoint` em `analyze_offline` e da
+leitura de vídeos com `VideoFrames`
+"""
+
+import cv2
+import pytest
+
+from main import (
+    FRAME_ANALYSIS_DTYPE,
+    AnalysisCheckpoint,
+    FatigueDetector,
+    FrameAnalysisLog,
+    StreamClock,
+    SyntheticFaceDetector,
+    SyntheticLandmarkStream,
+    SyntheticShapePredictor,
+    VideoFrames,
+)
+
+
+class Queda(Exception):
+    pass
+
+
+class FramesComQueda:
+    """
+    Fonte que interrompe a análise ao chegar ao frame `crash_at`
+    """
+
+    def __init__(self, stream, crash_at):
+        self.stream = stream
+        self.crash_at = crash_at
+        self.timestamps = stream.timestamps
+
+    def __len__(self):
+        return len(self.stream)
+
+    def __getitem__(self, index):
+        if index == self.crash_at:
+            raise Queda()
+        return self.stream[index]
+
+
+def novo_detector():
+    stream = SyntheticLandmarkStream(
+        duration=30,
+        seed=3,
+        motion=10,
+        events=[("closure", 5.0, 2.0), ("yawn", 15.0, None), ("absent", 20.0, 3.0)],
+    )
+    detector = FatigueDetector(
+        clock=StreamClock(),
+        face_detector=SyntheticFaceDetector(stream),
+        predictor=SyntheticShapePredictor(stream),
+    )
+    detector.LANDMARK_STRIDE = 2
+    detector.MOTION_GATE_THRESHOLD = 3
+    return stream, detector
+
+
+@pytest.fixture(scope="module")
+def referencia():
+    stream, detector = novo_detector()
+    log = detector.analyze_offline(stream)
+    return log.to_array().tobytes(), (detector.blink_counter, detector.yawn_counter)
+
+
+def test_retomada_identica(referencia, tmp_path):
+    path = str(tmp_path / "analise.ckpt")
+
+    # Duas quedas, em pontos diferentes de intervalos de checkpoint
+    for crash_at in (400, 650):
+        stream, detector = novo_detector()
+        checkpoint = AnalysisCheckpoint(path, every=150, source_id="a")
+        with pytest.raises(Queda):
+            detector.analyze_offline(FramesComQueda(stream, crash_at), checkpoint=checkpoint)
+
+    stream, detector = novo_detector()
+    checkpoint = AnalysisCheckpoint(path, every=150, source_id="a")
+    assert checkpoint.resume(novo_detector()[1], FrameAnalysisLog(), len(stream)) == 600
+
+    log = detector.analyze_offline(stream, checkpoint=checkpoint)
+    rows, counters = referencia
+    assert log.to_array().tobytes() == rows
+    assert (detector.blink_counter, detector.yawn_counter) == counters
+
+    checkpoint.remove()
+    assert not (tmp_path / "analise.ckpt").exists()
+    assert not (tmp_path / "analise.ckpt.rows").exists()
+
+
+def test_registros_excedentes_descartados(referencia, tmp_path):
+    path = str(tmp_path / "analise.ckpt")
+    stream, detector = novo_detector()
+    checkpoint = AnalysisCheckpoint(path, every=150, source_id="a")
+    with pytest.raises(Queda):
+        detector.analyze_offline(FramesComQueda(stream, 200), checkpoint=checkpoint)
+
+    # Queda entre a gravação dos registros e a do estado
+    with open(path + ".rows", "ab") as f:
+        f.write(b"\0" * FRAME_ANALYSIS_DTYPE.itemsize * 7)
+
+    stream, detector = novo_detector()
+    log = detector.analyze_offline(
+        stream, checkpoint=AnalysisCheckpoint(path, every=150, source_id="a")
+    )
+    assert log.to_array().tobytes() == referencia[0]
+
+
+@pytest.mark.parametrize("conteudo", ["outra fonte", "corrompido"])
+def test_checkpoint_invalido_recomeca(referencia, tmp_path, conteudo):
+    path = str(tmp_path / "analise.ckpt")
+    stream, detector = novo_detector()
+    checkpoint = AnalysisCheckpoint(path, every=150, source_id="a")
+    with pytest.raises(Queda):
+        detector.analyze_offline(FramesComQueda(stream, 200), checkpoint=checkpoint)
+
+    source_id = "a"
+    if conteudo == "outra fonte":
+        source_id = "b"
+    else:
+        with open(path, "r+b") as f:
+            f.truncate(10)
+
+    stream, detector = novo_detector()
+    checkpoint = AnalysisCheckpoint(path, every=150, source_id=source_id)
+    assert checkpoint.resume(detector, FrameAnalysisLog(), len(stream)) == 0
+    log = detector.analyze_offline(stream, checkpoint=checkpoint)
+    assert log.to_array().tobytes() == referencia[0]
+
+
+def test_video_com_contagem_subestimada(tmp_path):
+    stream, detector = novo_detector()
+    path = str(tmp_path / "video.avi")
+    first = stream.render(0, detailed=False)
+    height, width = first.shape[:2]
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*"MJPG"), stream.fps, (width, height)
+    )
+    for index in range(20):
+        writer.write(stream.render(index, detailed=False))
+    writer.release()
+
+    frames = VideoFrames(path)
+    frames._count = 12  # Contêiner que informa menos frames que os reais
+    log = detector.analyze_offline(frames)
+    frames.release()
+    assert len(log) == 20
+    assert len(frames.timestamps) == 20
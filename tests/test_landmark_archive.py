@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Testes de ida e volta do `LandmarkArchive` / `LandmarkArchiveReader`
+"""
+
+import numpy as np
+import pytest
+
+from main import (
+    LANDMARK_ARCHIVE_FOOTER_DTYPE,
+    LANDMARK_RECORD_DTYPE,
+    LandmarkArchive,
+    LandmarkArchiveReader,
+    SyntheticLandmarkStream,
+)
+
+BLOCK_FRAMES = 64
+
+
+@pytest.fixture(scope="module")
+def stream():
+    # Movimento da cabeça, piscada, bocejo e ausência da face cruzando
+    # fronteiras de bloco
+    return SyntheticLandmarkStream(
+        duration=20,
+        fps=30,
+        seed=1,
+        motion=10,
+        events=[("closure", 2.0, 1.5), ("yawn", 6.0, None), ("absent", 4.1, 1.0)],
+    )
+
+
+def gravar(stream, path, frames=None):
+    with LandmarkArchive(path, block_frames=BLOCK_FRAMES) as archive:
+        for index in range(len(stream) if frames is None else frames):
+            landmarks = stream.landmarks(index)
+            if landmarks is None:
+                archive.append(stream.timestamps[index])
+            else:
+                archive.append(
+                    stream.timestamps[index],
+                    stream.face_box_at(index),
+                    landmarks,
+                    stream.metrics(index),
+                )
+    return archive
+
+
+def conferir(stream, records):
+    for index, record in enumerate(records):
+        assert record["timestamp"] == stream.timestamps[index]
+        landmarks = stream.landmarks(index)
+        if landmarks is None:
+            assert not record["face_detected"]
+            assert not record["landmarks"].any()
+        else:
+            assert record["face_detected"]
+            assert tuple(record["face_box"]) == tuple(stream.face_box_at(index))
+            np.testing.assert_array_equal(record["landmarks"], landmarks)
+            np.testing.assert_allclose(
+                record["metrics"], stream.metrics(index), rtol=1e-6
+            )
+
+
+def test_ida_e_volta(stream, tmp_path):
+    path = tmp_path / "marcos.lmk"
+    archive = gravar(stream, str(path))
+    assert archive.clipped == 0
+
+    reader = LandmarkArchiveReader(str(path))
+    assert not reader.recovered
+    assert len(reader) == len(stream)
+    assert len(reader.index) == -(-len(stream) // BLOCK_FRAMES)
+    records = reader.read()
+    assert len(records) == len(stream)
+    assert not records["face_detected"].all()
+    conferir(stream, records)
+    reader.close()
+
+
+def test_fronteiras_de_bloco(stream, tmp_path):
+    path = tmp_path / "marcos.lmk"
+    gravar(stream, str(path))
+    reader = LandmarkArchiveReader(str(path))
+    times = stream.timestamps
+
+    # Último frame de um bloco e primeiro do seguinte
+    for index in (BLOCK_FRAMES - 1, BLOCK_FRAMES, 2 * BLOCK_FRAMES):
+        record = reader.at(times[index])
+        assert record["timestamp"] == times[index]
+        # Entre dois frames: o anterior
+        assert reader.at(times[index] + 1e-6)["timestamp"] == times[index]
+    assert reader.at(times[0] - 1.0) is None
+    assert reader.at(times[-1] + 1.0)["timestamp"] == times[-1]
+
+    # Intervalo que atravessa blocos
+    start, end = times[BLOCK_FRAMES - 3], times[2 * BLOCK_FRAMES + 2]
+    records = reader.read(start, end)
+    assert len(records) == 2 * BLOCK_FRAMES - (BLOCK_FRAMES - 3) + 3
+    assert records["timestamp"][0] == start and records["timestamp"][-1] == end
+    reader.close()
+
+
+def test_arquivo_truncado(stream, tmp_path):
+    path = tmp_path / "marcos.lmk"
+    gravar(stream, str(path))
+    data = path.read_bytes()
+
+    # Queda no meio da gravação: sem índice e com o último bloco incompleto
+    truncated = tmp_path / "truncado.lmk"
+    truncated.write_bytes(data[: len(data) // 2])
+    reader = LandmarkArchiveReader(str(truncated))
+    assert reader.recovered
+    assert 0 < len(reader) < len(stream)
+    assert len(reader) % BLOCK_FRAMES == 0
+    conferir(stream, reader.read())
+    reader.close()
+
+    # Só o rodapé perdido: todos os blocos recuperados
+    no_footer = tmp_path / "sem_rodape.lmk"
+    no_footer.write_bytes(data[: -LANDMARK_ARCHIVE_FOOTER_DTYPE.itemsize])
+    reader = LandmarkArchiveReader(str(no_footer))
+    assert reader.recovered
+    assert len(reader) == len(stream)
+    reader.close()
+
+
+def test_arquivo_vazio(tmp_path):
+    path = tmp_path / "vazio.lmk"
+    LandmarkArchive(str(path)).close()
+    reader = LandmarkArchiveReader(str(path))
+    assert len(reader) == 0
+    assert reader.duration == (0.0, 0.0)
+    assert reader.at(10.0) is None
+    records = reader.read()
+    assert len(records) == 0 and records.dtype == LANDMARK_RECORD_DTYPE
+    reader.close()
+
+    # Arquivo sem cabeçalho não é aceito
+    (tmp_path / "nada.lmk").write_bytes(b"")
+    with pytest.raises(ValueError):
+        LandmarkArchiveReader(str(tmp_path / "nada.lmk"))
+
+
+def test_coordenadas_fora_do_int16(tmp_path):
+    path = tmp_path / "grande.lmk"
+    landmarks = np.full((68, 2), 100)
+    landmarks[0] = (50000, 40)
+    with LandmarkArchive(str(path)) as archive:
+        archive.append(0.0, (10, 20, 200, 200), landmarks, (0.3, 0.3, 0.4))
+        archive.append(1 / 30, (40000, 20, 200, 200), np.full((68, 2), 40100))
+    assert archive.clipped == 2
+
+    records = LandmarkArchiveReader(str(path)).read()
+    assert records["landmarks"][0, 0, 0] == 10 + 32767
+    np.testing.assert_array_equal(records["landmarks"][0, 1:], landmarks[1:])
+    assert records["face_box"][1, 0] == 32767
+
+
+def test_metricas_ausentes_nao_herdam_bloco_anterior(tmp_path):
+    path = tmp_path / "metricas.lmk"
+    landmarks = np.full((68, 2), 100)
+    with LandmarkArchive(str(path), block_frames=2) as archive:
+        # As linhas do bloco são reutilizadas entre blocos
+        archive.append(0.0, (10, 20, 200, 200), landmarks, (0.3, 0.3, 0.4))
+        archive.append(0.1, (10, 20, 200, 200), landmarks, (0.3, 0.3, 0.4))
+        archive.append(0.2, (10, 20, 200, 200), landmarks)
+        with pytest.raises(ValueError):
+            archive.append(0.3, None, landmarks)
+
+    records = LandmarkArchiveReader(str(path)).read()
+    assert len(records) == 3
+    assert np.isnan(records["metrics"][2]).all()
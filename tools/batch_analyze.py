@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análise Offline em Lote - FatigueSensor
+=======================================
+
+Analisa todos os vídeos e FrameStores de um diretório com o pipeline do
+`FatigueDetector`, gravando um arquivo .npy (`FRAME_ANALYSIS_DTYPE`) por
+gravação. A análise é retomável:
+
+    - Cada gravação grava checkpoints periódicos (`AnalysisCheckpoint`);
+      após uma queda, a nova execução continua do último checkpoint, com
+      resultado idêntico ao de uma execução sem interrupção
+    - Gravações com o .npy final já gravado são puladas
+
+O .npy final é gravado de forma atômica e o checkpoint só é removido depois
+dele; rodar o mesmo comando de novo é sempre seguro. Os parâmetros de
+detecção devem ser os mesmos entre a execução interrompida e a retomada.
+
+Uso:
+    python batch_analyze.py GRAVACOES SAIDA [--checkpoint-every 1800]
+                            [--face-detector hog] [--landmark-model MODELO]
+                            [--landmark-stride 1] [--motion-gate 0]
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import (
+    FACE_DETECTOR_BACKENDS,
+    AnalysisCheckpoint,
+    FatigueDetector,
+    FrameStore,
+    StreamClock,
+    VideoFrames,
+    create_face_detector,
+    load_shape_predictor,
+)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".h264")
+
+
+def listar_gravacoes(directory):
+    """
+    Vídeos e diretórios de FrameStore de `directory`, em ordem de nome
+    """
+    gravacoes = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, FrameStore.META_FILE)):
+                gravacoes.append((name, path))
+        elif name.lower().endswith(VIDEO_EXTENSIONS):
+            gravacoes.append((os.path.splitext(name)[0], path))
+    return gravacoes
+
+
+def identificar(path):
+    """
+    Identificação da fonte para o checkpoint: caminho, tamanho e data
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, FrameStore.FRAMES_FILE)
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def analisar(path, output, args):
+    """
+    Analisa uma gravação, retomando do checkpoint se existir
+
+    Returns:
+        int: Frames analisados na gravação inteira
+    """
+    detector = FatigueDetector(
+        clock=StreamClock(),
+        face_detector=create_face_detector(args.face_detector, args.face_model_dir),
+        predictor=load_shape_predictor(args.landmark_model) if args.landmark_model else None,
+    )
+    detector.LANDMARK_STRIDE = max(1, args.landmark_stride)
+    detector.MOTION_GATE_THRESHOLD = args.motion_gate
+
+    frames = FrameStore(path) if os.path.isdir(path) else VideoFrames(path)
+    checkpoint = AnalysisCheckpoint(
+        output + ".ckpt", every=args.checkpoint_every, source_id=identificar(path)
+    )
+    log = detector.analyze_offline(
+        frames, fps=getattr(frames, "fps", 30.0), checkpoint=checkpoint
+    )
+    if isinstance(frames, VideoFrames):
+        frames.release()
+
+    # np.save acrescenta .npy a nomes sem a extensão
+    tmp_path = output + ".tmp.npy"
+    log.save(tmp_path)
+    os.replace(tmp_path, output)
+    checkpoint.remove()
+    return len(log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise offline retomável de gravações")
+    parser.add_argument("input", help="Diretório com vídeos e/ou FrameStores")
+    parser.add_argument("output", help="Diretório dos arquivos .npy e checkpoints")
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=1800, help="Frames entre checkpoints"
+    )
+    parser.add_argument("--face-detector", choices=FACE_DETECTOR_BACKENDS, default="haar")
+    parser.add_argument("--face-model-dir", default="models")
+    parser.add_argument("--landmark-model", default=None)
+    parser.add_argument("--landmark-stride", type=int, default=1)
+    parser.add_argument("--motion-gate", type=float, default=0)
+    args = parser.parse_args()
+
+    gravacoes = listar_gravacoes(args.input)
+    if not gravacoes:
+        print(f"✗ Nenhum vídeo ou FrameStore em {args.input}")
+        sys.exit(1)
+    os.makedirs(args.output, exist_ok=True)
+
+    falhas = 0
+    for name, path in gravacoes:
+        output = os.path.join(args.output, name + ".npy")
+        if os.path.exists(output):
+            print(f"✓ {name}: já analisado, pulando")
+            continue
+
+        start = time.perf_counter()
+        try:
+            count = analisar(path, output, args)
+        except (IOError, RuntimeError) as e:
+            print(f"✗ {name}: {e}")
+            falhas += 1
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"✓ {name}: {count} frames em {elapsed:.0f}s -> {output}")
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
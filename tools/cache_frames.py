@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de Frames Decodificados - FatigueSensor
+=============================================
+
+Decodifica um vídeo uma única vez para um `FrameStore`: frames em escala de
+cinza (opcionalmente reduzidos) em um arquivo mapeado em memória, com índice
+de timestamps. Experimentos offline passam a ler os frames por índice, sem
+decodificar o vídeo novamente.
+
+Uso:
+    python cache_frames.py VIDEO DIRETORIO [--scale 0.5]
+    python ../main.py --frame-store DIRETORIO --export-analysis analise.npy
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import FrameStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decodifica um vídeo para um FrameStore")
+    parser.add_argument("video", help="Vídeo de origem")
+    parser.add_argument("output", help="Diretório do FrameStore")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Fator de redução dos frames (ex.: 0.5 = metade da resolução)",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        store = FrameStore.build(args.video, args.output, scale=args.scale)
+    except IOError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    height, width = store.frames.shape[1:]
+    size_mb = store.frames.nbytes / 1e6
+    print(f"✓ {len(store)} frames {width}x{height} decodificados em {elapsed:.1f}s")
+    print(f"✓ {size_mb:.1f} MB em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibração do Detector Facial - FatigueSensor
+=============================================
+
+Mede os backends de detecção facial disponíveis (Haar, LBP, HOG do dlib e
+DNN do OpenCV) nesta máquina, sobre frames de amostra de uma gravação,
+FrameStore ou câmera, e grava no cache o mais rápido que atinge os pisos de
+acerto e de falsos positivos. As caixas de referência vêm do backend mais
+preciso disponível (DNN, depois HOG). Depois, `python main.py
+--face-detector auto` usa a escolha sem repetir o benchmark.
+
+Uso:
+    python calibrate_face_detector.py FONTE [--frames 100]
+                                      [--model-dir ../models]
+                                      [--min-detection-rate 0.9]
+                                      [--max-false-positive-rate 0.05]
+
+FONTE pode ser um vídeo, um diretório de FrameStore ou o índice da câmera.
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import FaceDetectorSelector, sample_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escolhe o detector facial por benchmark")
+    parser.add_argument("source", help="Vídeo, diretório de FrameStore ou índice da câmera")
+    parser.add_argument("--frames", type=int, default=100, help="Frames de amostra")
+    parser.add_argument("--model-dir", default="models", help="Diretório dos modelos locais")
+    parser.add_argument(
+        "--min-detection-rate",
+        type=float,
+        default=0.9,
+        help="Fração mínima das faces de referência encontradas (absoluta)",
+    )
+    parser.add_argument(
+        "--max-false-positive-rate",
+        type=float,
+        default=0.05,
+        help="Fração máxima de frames com caixa fora da face de referência",
+    )
+    parser.add_argument("--cache", default=None, help="Arquivo de cache (padrão: ~/.cache)")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    frames = sample_frames(source, args.frames)
+    if not frames:
+        print(f"✗ Não foi possível ler frames de {args.source}")
+        sys.exit(1)
+
+    options = {
+        "model_dir": args.model_dir,
+        "min_detection_rate": args.min_detection_rate,
+        "max_false_positive_rate": args.max_false_positive_rate,
+    }
+    if args.cache:
+        options["cache_path"] = args.cache
+    selector = FaceDetectorSelector(**options)
+
+    print(f"✓ {len(frames)} frames de amostra")
+    choice = selector.select(frames)
+    print(selector.summary())
+    if choice is None:
+        print("✗ Nenhum detector atingiu os pisos (ou não há face de referência)")
+        sys.exit(1)
+    print(f"✓ Detector escolhido: {choice} (salvo em {selector.cache_path})")
+
+
+if __name__ == "__main__":
+    main()
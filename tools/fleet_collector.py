@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coletor Local de Eventos da Frota - FatigueSensor
+=================================================
+
+Serviço HTTP que substitui o backend da frota em testes: recebe os lotes
+comprimidos enviados pelo `FleetUplink` (`python main.py --uplink URL`),
+descarta lotes repetidos (reenvios após falha da confirmação) e grava cada
+evento em um arquivo JSON Lines, com sensor, motorista e sessão.
+
+    POST /eventos   Lote gzip do uplink (200 = aceito, 400 = inválido)
+    GET  /stats     Contagens em JSON (lotes, duplicados, eventos por tipo)
+
+Com `--fail-rate`, parte dos lotes recebe 503, para exercitar o spool e as
+novas tentativas do uplink.
+
+Uso:
+    python fleet_collector.py [--port 8750] [--output eventos.jsonl]
+                              [--fail-rate 0.2]
+    python ../main.py --uplink http://127.0.0.1:8750/eventos
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Coletor:
+    """
+    Estado do coletor compartilhado entre as threads do servidor
+    """
+
+    def __init__(self, output, fail_rate=0.0):
+        self.output = open(output, "a", encoding="utf-8") if output else None
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.batches = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.bytes = 0
+        self.events = Counter()
+
+    def receber(self, data):
+        """
+        Processa um lote; retorna o código HTTP da resposta
+        """
+        if random.random() < self.fail_rate:
+            with self.lock:
+                self.failed += 1
+            return 503
+        try:
+            batch = json.loads(gzip.decompress(data))
+            key = (batch["device"], batch["session"], batch["seq"])
+            events = batch["events"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 400
+
+        with self.lock:
+            self.bytes += len(data)
+            if key in self.seen:
+                self.duplicates += 1
+                return 200
+            self.seen.add(key)
+            self.batches += 1
+            for event in events:
+                self.events[event.get("type")] += 1
+                if self.output is not None:
+                    event = dict(
+                        event,
+                        device=batch["device"],
+                        driver=batch.get("driver"),
+                        session=batch["session"],
+                    )
+                    self.output.write(json.dumps(event) + "\n")
+            if self.output is not None:
+                self.output.flush()
+        return 200
+
+    def stats(self):
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "duplicates": self.duplicates,
+                "failed": self.failed,
+                "bytes": self.bytes,
+                "events": sum(self.events.values()),
+                "by_type": dict(self.events),
+            }
+
+
+def criar_handler(coletor):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/eventos":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            code = coletor.receber(self.rfile.read(length))
+            self.send_response(code)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            if self.path != "/stats":
+                self.send_error(404)
+                return
+            body = json.dumps(coletor.stats()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Sem log por requisição
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coletor local de eventos da frota")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8750)
+    parser.add_argument("--output", default="eventos.jsonl", help="Arquivo JSON Lines")
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="Fração de lotes respondidos com 503"
+    )
+    args = parser.parse_args()
+
+    coletor = Coletor(args.output, args.fail_rate)
+    server = ThreadingHTTPServer((args.host, args.port), criar_handler(coletor))
+    print(f"✓ Coletor em http://{args.host}:{args.port}/eventos -> {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = coletor.stats()
+        print(
+            f"\n✓ {stats['batches']} lotes, {stats['events']} eventos, "
+            f"{stats['duplicates']} duplicados, {stats['failed']} falhas simuladas"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de Longa Duração (Soak) - FatigueSensor
+=============================================
+
+Executa o pipeline do `FatigueDetector` sobre horas de vídeo, em velocidade
+acelerada: o tempo da análise segue o relógio do stream (`StreamClock`), então
+um turno de 10 horas é simulado tão rápido quanto a CPU permitir.
+
+Periodicamente (a cada `--sample-every` segundos de stream) registra:
+    - RSS do processo e número de threads
+    - Objetos rastreados e coletas do garbage collector
+    - Latência por estágio de `process_frame` (p50/p95/p99, via `StageTimer`)
+    - Erros de processamento e alertas disparados
+
+Ao final, ajusta uma reta (mínimos quadrados) a cada série após o aquecimento
+e falha (código de saída 1) se a tendência de crescimento por hora de stream
+ultrapassar os limites configurados com margem de dois erros-padrão (ruído
+de execuções curtas não reprova o teste).
+
+Uso:
+    python soak_test.py [--hours 10] [--video cabine.mp4 | --frame-store DIR]
+                        [--report soak.csv] [--draw] [--alert-sound]
+
+Sem `--video`/`--frame-store`, os frames vêm de um `SyntheticLandmarkStream`
+(piscadas, olhos fechados, bocejos e ausências da face roteirizados), com
+detector facial e preditor de marcos substitutos: o pipeline completo é
+exercitado sem câmera nem o arquivo do modelo.
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import csv
+import gc
+import os
+import resource
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import (
+    FatigueDetector,
+    FrameStore,
+    StageTimer,
+    StreamClock,
+    SyntheticFaceDetector,
+    SyntheticLandmarkStream,
+    SyntheticShapePredictor,
+)
+
+COLUNAS = [
+    "stream_h",
+    "wall_s",
+    "frames",
+    "rss_mb",
+    "threads",
+    "gc_objects",
+    "gc_collections",
+    "gc_uncollectable",
+    "total_p50_ms",
+    "total_p95_ms",
+    "total_p99_ms",
+    "preprocess_p95_ms",
+    "detect_p95_ms",
+    "landmarks_p95_ms",
+    "analysis_p95_ms",
+    "errors",
+    "alerts",
+]
+
+
+def ler_rss_mb():
+    """
+    RSS atual do processo em MB (/proc no Linux; senão, o pico via getrusage)
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em bytes no macOS e em KB no Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024.0
+
+
+def contar_threads():
+    """
+    Threads do processo, incluindo as nativas (OpenCV, áudio) quando possível
+    """
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return threading.active_count()
+
+
+def stream_sintetico(hours, fps):
+    """
+    Turno sintético: piscadas sorteadas, olhos fechados a cada 5 min, bocejo
+    a cada 7 min e face ausente por alguns segundos a cada 30 min
+    """
+    duration = hours * 3600
+    stream = SyntheticLandmarkStream(duration=duration, fps=fps, motion=8.0)
+    for kind, period, offset in (
+        ("closure", 300, 150),
+        ("yawn", 420, 200),
+        ("absent", 1800, 900),
+    ):
+        for start in np.arange(offset, duration, period):
+            stream.add_event(kind, float(start))
+    return stream
+
+
+def frames_sinteticos(stream):
+    """
+    Renderiza os frames do stream sintético em sequência
+    """
+    for index in range(len(stream)):
+        yield stream.render(index)
+
+
+def frames_video(path):
+    """
+    Lê um vídeo em loop, reabrindo ao chegar no fim
+    """
+    while True:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Não foi possível abrir o vídeo: {path}")
+        count = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+        cap.release()
+        if count == 0:
+            raise IOError(f"Vídeo sem frames: {path}")
+
+
+def frames_store(path):
+    """
+    Percorre um FrameStore em loop (leitura por índice, sem cópia)
+    """
+    store = FrameStore(path)
+    if len(store) == 0:
+        raise IOError(f"FrameStore vazio: {path}")
+    while True:
+        for i in range(len(store)):
+            yield store[i]
+
+
+def coletar_amostra(detector, stream_h, wall_s, frames, alerts, periodo):
+    """
+    Registra uma amostra de memória, threads, GC e latência
+    """
+    latencias = detector.stage_timer.percentiles(frames=periodo)
+    total = latencias.get("total", [0.0, 0.0, 0.0])
+    stats = gc.get_stats()
+    return {
+        "stream_h": stream_h,
+        "wall_s": wall_s,
+        "frames": frames,
+        "rss_mb": ler_rss_mb(),
+        "threads": contar_threads(),
+        "gc_objects": len(gc.get_objects()),
+        "gc_collections": sum(s["collections"] for s in stats),
+        "gc_uncollectable": sum(s["uncollectable"] for s in stats),
+        "total_p50_ms": total[0],
+        "total_p95_ms": total[1],
+        "total_p99_ms": total[2],
+        "preprocess_p95_ms": latencias.get("preprocess", [0.0, 0.0])[1],
+        "detect_p95_ms": latencias.get("detect", [0.0, 0.0])[1],
+        "landmarks_p95_ms": latencias.get("landmarks", [0.0, 0.0])[1],
+        "analysis_p95_ms": latencias.get("analysis", [0.0, 0.0])[1],
+        "errors": detector.error_count,
+        "alerts": alerts,
+    }
+
+
+def tendencia(amostras, coluna):
+    """
+    Inclinação (por hora de stream) da reta ajustada a uma coluna
+
+    Returns:
+        tuple: (inclinação, erro-padrão da inclinação)
+    """
+    x = np.array([a["stream_h"] for a in amostras])
+    y = np.array([a[coluna] for a in amostras], dtype=float)
+    if len(x) < 3 or np.ptp(x) == 0:
+        return 0.0, 0.0
+    slope, intercept = np.polyfit(x, y, 1)
+    residuos = y - (slope * x + intercept)
+    variancia = np.sum(residuos**2) / (len(x) - 2)
+    erro = np.sqrt(variancia / np.sum((x - x.mean()) ** 2))
+    return float(slope), float(erro)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de longa duração do pipeline")
+    parser.add_argument("--hours", type=float, default=10, help="Horas de stream simuladas")
+    parser.add_argument("--fps", type=float, default=30, help="Taxa do stream simulado")
+    parser.add_argument("--video", default=None, help="Vídeo reproduzido em loop")
+    parser.add_argument("--frame-store", default=None, help="FrameStore reproduzido em loop")
+    parser.add_argument(
+        "--sample-every",
+        type=float,
+        default=60,
+        help="Intervalo entre amostras, em segundos de stream",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=0.1,
+        help="Fração inicial das amostras ignorada nas tendências",
+    )
+    parser.add_argument(
+        "--draw",
+        action="store_true",
+        help="Desenha marcos e interface em cada frame, como em run()",
+    )
+    parser.add_argument(
+        "--alert-sound",
+        action="store_true",
+        help="Toca os alertas sonoros (exercita as threads de alerta)",
+    )
+    parser.add_argument("--report", default=None, help="Salva as amostras em CSV")
+    parser.add_argument(
+        "--max-rss-growth", type=float, default=2.0, help="Limite de MB/h de RSS"
+    )
+    parser.add_argument(
+        "--max-thread-growth", type=float, default=0.5, help="Limite de threads/h"
+    )
+    parser.add_argument(
+        "--max-object-growth",
+        type=float,
+        default=5000,
+        help="Limite de objetos rastreados pelo GC por hora",
+    )
+    parser.add_argument(
+        "--max-latency-drift",
+        type=float,
+        default=1.0,
+        help="Limite de ms/h no p95 da latência total",
+    )
+    args = parser.parse_args()
+
+    substitutos = {}
+    if args.frame_store:
+        fonte = frames_store(args.frame_store)
+    elif args.video:
+        fonte = frames_video(args.video)
+    else:
+        stream = stream_sintetico(args.hours, args.fps)
+        fonte = frames_sinteticos(stream)
+        substitutos = {
+            "face_detector": SyntheticFaceDetector(stream),
+            "predictor": SyntheticShapePredictor(stream),
+        }
+
+    periodo = max(1, int(args.sample_every * args.fps))
+    total_frames = int(args.hours * 3600 * args.fps)
+
+    detector = FatigueDetector(clock=StreamClock(), **substitutos)
+    detector.sound_alerts = args.alert_sound
+    detector.stage_timer = StageTimer(capacity=periodo)
+
+    print(f"✓ Simulando {args.hours:.1f} h de stream ({total_frames} frames)")
+
+    amostras = []
+    alerts = 0
+    alerta_anterior = False
+    draw_buffer = None
+    wall_start = time.perf_counter()
+
+    try:
+        for index in range(total_frames):
+            frame = next(fonte)
+            if args.draw:
+                # Frames do FrameStore são somente leitura; desenha em uma cópia
+                if draw_buffer is None or draw_buffer.shape != frame.shape:
+                    draw_buffer = np.empty_like(frame)
+                np.copyto(draw_buffer, frame)
+                frame = draw_buffer
+
+            processed, analysis = detector.process_frame(
+                frame, draw=args.draw, timestamp=index / args.fps
+            )
+            if args.draw:
+                detector.draw_ui_elements(processed, analysis, args.fps)
+
+            if detector.alert_active and not alerta_anterior:
+                alerts += 1
+            alerta_anterior = detector.alert_active
+
+            if (index + 1) % periodo == 0:
+                amostra = coletar_amostra(
+                    detector,
+                    (index + 1) / args.fps / 3600.0,
+                    time.perf_counter() - wall_start,
+                    index + 1,
+                    alerts,
+                    periodo,
+                )
+                amostras.append(amostra)
+                print(
+                    f"{amostra['stream_h']:6.2f} h | RSS {amostra['rss_mb']:7.1f} MB | "
+                    f"threads {amostra['threads']:3d} | "
+                    f"objetos {amostra['gc_objects']:8d} | "
+                    f"p95 {amostra['total_p95_ms']:6.2f} ms | "
+                    f"erros {amostra['errors']} | alertas {alerts}"
+                )
+    except KeyboardInterrupt:
+        print("\n⚠ Interrompido; avaliando as amostras coletadas")
+
+    elapsed = time.perf_counter() - wall_start
+    if amostras:
+        stream_s = amostras[-1]["frames"] / args.fps
+        print(f"\n✓ {stream_s / 3600:.2f} h de stream em {elapsed:.0f} s "
+              f"(x{stream_s / max(elapsed, 1e-9):.1f} o tempo real)")
+
+    if args.report:
+        with open(args.report, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUNAS)
+            writer.writeheader()
+            writer.writerows(amostras)
+        print(f"✓ Amostras salvas em {args.report}")
+
+    avaliadas = amostras[int(len(amostras) * args.warmup) :]
+    if len(avaliadas) < 3:
+        print("✗ Amostras insuficientes para avaliar tendências")
+        sys.exit(1)
+
+    limites = [
+        ("rss_mb", args.max_rss_growth, "MB/h"),
+        ("threads", args.max_thread_growth, "threads/h"),
+        ("gc_objects", args.max_object_growth, "objetos/h"),
+        ("total_p95_ms", args.max_latency_drift, "ms/h no p95"),
+    ]
+    falhou = False
+    print("\n=== Tendências após aquecimento ===")
+    for coluna, limite, unidade in limites:
+        slope, erro = tendencia(avaliadas, coluna)
+        ok = slope - 2 * erro <= limite
+        falhou |= not ok
+        print(
+            f"{'✓' if ok else '✗'} {coluna:<14} {slope:+10.2f} ± {2 * erro:.2f} "
+            f"{unidade} (limite {limite})"
+        )
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
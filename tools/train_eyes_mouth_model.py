@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Treino do Modelo Reduzido de Olhos e Boca - FatigueSensor
+=========================================================
+
+Treina um `shape_predictor` do dlib com apenas os 32 pontos usados no EAR e no
+MAR (pontos 36-67 do esquema de 68 pontos). O modelo resultante é bem menor e
+mais rápido de carregar que o `shape_predictor_68_face_landmarks.dat`, e o
+`FatigueDetector` o usa de forma transparente (`--landmark-model`).
+
+Duas fontes de rótulos:
+    - Conjunto rotulado no formato XML do dlib (imglab) com 68 pontos, como o
+      iBUG 300-W: os pontos 36-67 são extraídos e renumerados 00-31
+    - Destilação: imagens locais sem rótulos são anotadas pelo modelo de 68
+      pontos (professor), com faces detectadas pelo HOG do dlib
+
+Uso:
+    python train_eyes_mouth_model.py --train labels_train.xml \\
+        [--test labels_test.xml] --output eyes_mouth_32.dat
+
+    python train_eyes_mouth_model.py --distill-images fotos/ \\
+        --teacher ../shape_predictor_68_face_landmarks.dat --output eyes_mouth_32.dat
+
+Autor: Aluisio Martins Junior
+Data: Junho 2025
+"""
+
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import dlib
+
+FIRST_POINT = 36
+NUM_POINTS = 32
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def filtrar_xml(source, output):
+    """
+    Mantém apenas os pontos 36-67 de um XML de 68 pontos, renumerados 00-31
+
+    O XML gerado fica no mesmo diretório do original, preservando os caminhos
+    relativos das imagens. Faces sem algum dos 32 pontos são descartadas.
+
+    Returns:
+        int: Número de faces mantidas
+    """
+    tree = ET.parse(source)
+    kept = 0
+    for image in tree.getroot().iter("image"):
+        for box in list(image.findall("box")):
+            parts = {int(part.get("name")): part for part in box.findall("part")}
+            wanted = range(FIRST_POINT, FIRST_POINT + NUM_POINTS)
+            for part in box.findall("part"):
+                box.remove(part)
+            if not all(index in parts for index in wanted):
+                image.remove(box)
+                continue
+            for new_index, index in enumerate(wanted):
+                part = parts[index]
+                part.set("name", f"{new_index:02d}")
+                box.append(part)
+            kept += 1
+    tree.write(output)
+    return kept
+
+
+def preparar_xml(source):
+    """
+    Retorna um XML de 32 pontos para `source` (filtrando se tiver 68 pontos)
+    """
+    box = ET.parse(source).getroot().find(".//box")
+    if box is not None and len(box.findall("part")) == NUM_POINTS:
+        return source
+    base, ext = os.path.splitext(source)
+    output = f"{base}_olhos_boca{ext}"
+    kept = filtrar_xml(source, output)
+    print(f"✓ {kept} faces com olhos e boca em {output}")
+    return output
+
+
+def destilar(images_dir, teacher_path, output, upsample=1):
+    """
+    Anota imagens com o modelo de 68 pontos e grava um XML de 32 pontos
+
+    Returns:
+        int: Número de faces anotadas
+    """
+    detector = dlib.get_frontal_face_detector()
+    teacher = dlib.shape_predictor(teacher_path)
+
+    root = ET.Element("dataset")
+    images = ET.SubElement(root, "images")
+    faces = 0
+    names = sorted(
+        name for name in os.listdir(images_dir) if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    for name in names:
+        path = os.path.abspath(os.path.join(images_dir, name))
+        img = dlib.load_rgb_image(path)
+        rects = detector(img, upsample)
+        if not rects:
+            continue
+
+        element = ET.SubElement(images, "image", file=path)
+        for rect in rects:
+            shape = teacher(img, rect)
+            box = ET.SubElement(
+                element,
+                "box",
+                top=str(rect.top()),
+                left=str(rect.left()),
+                width=str(rect.width()),
+                height=str(rect.height()),
+            )
+            for new_index in range(NUM_POINTS):
+                point = shape.part(FIRST_POINT + new_index)
+                ET.SubElement(
+                    box, "part", name=f"{new_index:02d}", x=str(point.x), y=str(point.y)
+                )
+            faces += 1
+
+    ET.ElementTree(root).write(output)
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o modelo de marcos de olhos e boca")
+    parser.add_argument("--train", default=None, help="XML de treino (dlib/imglab)")
+    parser.add_argument("--test", default=None, help="XML de teste (opcional)")
+    parser.add_argument("--distill-images", default=None, help="Imagens sem rótulo")
+    parser.add_argument(
+        "--teacher",
+        default="shape_predictor_68_face_landmarks.dat",
+        help="Modelo de 68 pontos usado na destilação",
+    )
+    parser.add_argument("--output", default="eyes_mouth_32.dat", help="Modelo gerado")
+    parser.add_argument("--tree-depth", type=int, default=4)
+    parser.add_argument("--cascade-depth", type=int, default=15)
+    parser.add_argument("--nu", type=float, default=0.1)
+    parser.add_argument("--oversampling", type=int, default=20)
+    parser.add_argument("--feature-pool-size", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.distill_images:
+        train_xml = os.path.join(args.distill_images, "destilado_olhos_boca.xml")
+        faces = destilar(args.distill_images, args.teacher, train_xml)
+        if faces == 0:
+            print(f"✗ Nenhuma face encontrada em {args.distill_images}")
+            sys.exit(1)
+        print(f"✓ {faces} faces anotadas pelo modelo de 68 pontos em {train_xml}")
+    elif args.train:
+        train_xml = preparar_xml(args.train)
+    else:
+        parser.error("informe --train ou --distill-images")
+
+    options = dlib.shape_predictor_training_options()
+    options.tree_depth = args.tree_depth
+    options.cascade_depth = args.cascade_depth
+    options.nu = args.nu
+    options.oversampling_amount = args.oversampling
+    options.feature_pool_size = args.feature_pool_size
+    options.num_threads = args.threads
+    options.be_verbose = True
+
+    start = time.perf_counter()
+    dlib.train_shape_predictor(train_xml, args.output, options)
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"✓ Modelo salvo em {args.output} ({size_mb:.1f} MB, {elapsed:.0f} s)")
+
+    print(f"Erro médio no treino: {dlib.test_shape_predictor(train_xml, args.output):.2f} px")
+    if args.test:
+        test_xml = preparar_xml(args.test)
+        print(f"Erro médio no teste: {dlib.test_shape_predictor(test_xml, args.output):.2f} px")
+
+
+if __name__ == "__main__":
+    main()